@@ -19,4 +19,90 @@ else:
     logger.warning("百度地图API密钥未找到")
 
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-DEEPSEEK_API_BASE = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com/v1")
\ No newline at end of file
+DEEPSEEK_API_BASE = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com/v1")
+
+def _env_flag(name, default="false"):
+    """读取布尔型环境变量"""
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+# 写入合并（group commit）：默认关闭，SQLite 高并发写入时可开启
+WRITE_COALESCE_ENABLED = _env_flag("WRITE_COALESCE_ENABLED")
+WRITE_COALESCE_WINDOW_MS = float(os.getenv("WRITE_COALESCE_WINDOW_MS", "5"))
+WRITE_COALESCE_MAX_BATCH = int(os.getenv("WRITE_COALESCE_MAX_BATCH", "64"))
+
+# 启动时自动执行数据库结构迁移（数据回填只通过命令行执行）；设为 false 时需在部署前手动执行 python -m app.migrations upgrade
+AUTO_MIGRATE = _env_flag("AUTO_MIGRATE", "true")
+
+# 外部 HTTP 调用（百度地图 / DeepSeek）共享连接池
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_MAX_KEEPALIVE_PER_HOST = int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# 需要安装 h2（pip install "httpx[http2]"），未安装时自动退回 HTTP/1.1
+HTTP2_ENABLED = _env_flag("HTTP2_ENABLED")
+# 外部流量录制 / 回放：off / record / replay；回放时按录制耗时 × DELAY_SCALE 延迟返回（0 为立即返回）
+HTTP_CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", "off").strip().lower()
+HTTP_CASSETTE_PATH = os.getenv("HTTP_CASSETTE_PATH", "./http_cassette.jsonl.gz")
+HTTP_CASSETTE_DELAY_SCALE = float(os.getenv("HTTP_CASSETTE_DELAY_SCALE", "1"))
+
+# 百度 POI 搜索结果缓存：中心点按 geohash 格子量化（7 位约 150m），过期后在 stale 时间内先返回旧值并后台刷新
+PLACE_CACHE_TTL = float(os.getenv("PLACE_CACHE_TTL", "600"))
+PLACE_CACHE_STALE_TTL = float(os.getenv("PLACE_CACHE_STALE_TTL", "3600"))
+PLACE_CACHE_MAX_ENTRIES = int(os.getenv("PLACE_CACHE_MAX_ENTRIES", "1024"))
+PLACE_CACHE_GEOHASH_PRECISION = int(os.getenv("PLACE_CACHE_GEOHASH_PRECISION", "7"))
+
+# 本地 POI 库：实时搜索结果按网格（GRID_DEG 度，0.01 约 1km）和分类建索引，覆盖且未过期的范围直接本地返回
+POI_STORE_ENABLED = _env_flag("POI_STORE_ENABLED", "true")
+POI_STORE_PATH = os.getenv("POI_STORE_PATH", "./poi_store.db")
+POI_STORE_TTL_HOURS = float(os.getenv("POI_STORE_TTL_HOURS", "24"))
+POI_STORE_GRID_DEG = float(os.getenv("POI_STORE_GRID_DEG", "0.01"))
+# 未覆盖的格子不超过这个数时只搜索这些格子，否则对整个范围做一次实时搜索
+POI_STORE_MAX_CELL_SEARCHES = int(os.getenv("POI_STORE_MAX_CELL_SEARCHES", "3"))
+# 后台刷新即将过期范围的间隔（秒）
+POI_STORE_REFRESH_INTERVAL = float(os.getenv("POI_STORE_REFRESH_INTERVAL", "300"))
+
+# 起点→终点出行时长缓存（本地 SQLite 文件 + 内存 LRU）
+TRAVEL_CACHE_PATH = os.getenv("TRAVEL_CACHE_PATH", "./travel_cache.db")
+TRAVEL_CACHE_TTL_DAYS = float(os.getenv("TRAVEL_CACHE_TTL_DAYS", "7"))
+TRAVEL_CACHE_MEMORY_ENTRIES = int(os.getenv("TRAVEL_CACHE_MEMORY_ENTRIES", "50000"))
+
+# 百度接口全局限流：各接口每秒请求数和同时在途请求数上限
+RATE_LIMIT_PLACE_SEARCH_QPS = float(os.getenv("RATE_LIMIT_PLACE_SEARCH_QPS", "20"))
+RATE_LIMIT_ROUTEMATRIX_QPS = float(os.getenv("RATE_LIMIT_ROUTEMATRIX_QPS", "20"))
+RATE_LIMIT_DIRECTIONLITE_QPS = float(os.getenv("RATE_LIMIT_DIRECTIONLITE_QPS", "20"))
+RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "10"))
+
+# 外部接口熔断：窗口内请求数达到下限且错误率超过阈值时断开，断开若干秒后放行一个探测请求
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "30"))
+CIRCUIT_MIN_REQUESTS = int(os.getenv("CIRCUIT_MIN_REQUESTS", "5"))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+# 推荐接口公交时间查询：同一请求内同时在途的公交lite请求数上限
+TRANSIT_MAX_CONCURRENCY = int(os.getenv("TRANSIT_MAX_CONCURRENCY", "16"))
+
+# 百度路网矩阵单次请求的起点数 × 终点数上限，超过时分块并发请求
+BAIDU_ROUTEMATRIX_MAX_ELEMENTS = int(os.getenv("BAIDU_ROUTEMATRIX_MAX_ELEMENTS", "50"))
+
+# 推荐候选池大小：按直线下界排序后分批请求步行矩阵，只有可能进入前6的候选才会被精确计算
+CANDIDATE_POOL_SIZE = int(os.getenv("CANDIDATE_POOL_SIZE", "20"))
+# 每次推荐最多请求步行矩阵的候选数：默认与候选池相同，评估多少个由直线下界决定，只在这里设硬上限
+# （设为 12 时第 7~12 名的直线距离很少超过第 6 名的 1.5 倍，下界几乎排除不了任何候选）
+CANDIDATE_MATRIX_BUDGET = int(os.getenv("CANDIDATE_MATRIX_BUDGET", "20"))
+
+# 推荐搜索中心点：centroid（经纬度平均）/ median（几何中位点，到各校距离之和最小）/ minimax（到最远学校的距离最小）
+CENTER_STRATEGY = os.getenv("CENTER_STRATEGY", "median").strip().lower()
+# 是否同时从 median / minimax / centroid 几个中心点搜索并合并候选（搜索次数随之增加）
+CENTER_MULTI_SEED = _env_flag("CENTER_MULTI_SEED")
+# 相距不超过这个距离（公里）的起点合并为一个带权重的起点（例如同校的多名队员），减少路网矩阵行数
+ORIGIN_MERGE_KM = float(os.getenv("ORIGIN_MERGE_KM", "0.2"))
+
+# 地图数据提供方：baidu（默认，调用百度地图 API）或 local（本地 POI 文件 + 速度模型估算时长，可离线压测）
+ROUTING_PROVIDER = os.getenv("ROUTING_PROVIDER", "baidu").strip().lower()
+# local 提供方：POI 文件（.json / .jsonl / .csv）、各出行方式速度（km/h）、绕行系数、公交候车分钟数
+LOCAL_POI_FILE = os.getenv("LOCAL_POI_FILE", "./local_pois.json")
+LOCAL_WALKING_KMH = float(os.getenv("LOCAL_WALKING_KMH", "5"))
+LOCAL_DRIVING_KMH = float(os.getenv("LOCAL_DRIVING_KMH", "30"))
+LOCAL_TRANSIT_KMH = float(os.getenv("LOCAL_TRANSIT_KMH", "20"))
+LOCAL_DETOUR_FACTOR = float(os.getenv("LOCAL_DETOUR_FACTOR", "1.3"))
+LOCAL_TRANSIT_WAIT_MIN = float(os.getenv("LOCAL_TRANSIT_WAIT_MIN", "5"))
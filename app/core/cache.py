@@ -0,0 +1,108 @@
+"""
+带过期时间的 LRU 缓存（支持 stale-while-revalidate）
+
+条目在 ttl 秒内视为新鲜，直接返回；
+过期后 stale_ttl 秒内仍可返回旧值，同时在后台刷新一次（同一个键同时只有一个刷新任务）；
+超过 ttl + stale_ttl 视为未命中，同步调用 fetch。
+条目数超过 maxsize 时淘汰最久未使用的条目。
+
+用法：
+    value = await cache.get_or_fetch(key, fetch)   # fetch 为无参协程函数
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """进程内 TTL + LRU 缓存，供异步接口缓存外部 API 的结果"""
+
+    def __init__(self, maxsize=1024, ttl=600.0, stale_ttl=3600.0, should_cache=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # 判断结果是否可以缓存（例如只缓存成功的响应），默认全部缓存
+        self.should_cache = should_cache or (lambda value: True)
+        self.clock = clock
+        self._data = OrderedDict()  # key -> (value, stored_at)
+        self._refreshing = {}  # key -> 后台刷新任务
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0,
+                       "refresh_errors": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """返回 (值, 是否新鲜)；不存在或已彻底过期时返回 (None, False)"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None, False
+        value, stored_at = entry
+        age = self.clock() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            del self._data[key]
+            return None, False
+        self._data.move_to_end(key)
+        return value, age <= self.ttl
+
+    def set(self, key, value):
+        if not self.should_cache(value):
+            return
+        self._data[key] = (value, self.clock())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        self._data.clear()
+
+    async def get_or_fetch(self, key, fetch):
+        """命中新鲜条目直接返回；命中旧条目先返回旧值并在后台刷新；未命中则调用 fetch"""
+        value, fresh = self.get(key)
+        if key in self._data:
+            if fresh:
+                self._stats["hits"] += 1
+            else:
+                self._stats["stale_hits"] += 1
+                self._schedule_refresh(key, fetch)
+            return value
+
+        self._stats["misses"] += 1
+        value = await fetch()
+        self.set(key, value)
+        return value
+
+    def _schedule_refresh(self, key, fetch):
+        task = self._refreshing.get(key)
+        if task is not None and not task.done():
+            return
+
+        async def refresh():
+            try:
+                self.set(key, await fetch())
+                self._stats["refreshes"] += 1
+            except Exception as e:
+                # 刷新失败时保留旧值，等下一次访问再试
+                self._stats["refresh_errors"] += 1
+                logger.warning(f"缓存后台刷新失败 {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.get_running_loop().create_task(refresh())
+
+    def stats(self):
+        """命中率和节省的外部调用次数（命中次数减去后台刷新发出的调用）"""
+        hits = self._stats["hits"] + self._stats["stale_hits"]
+        total = hits + self._stats["misses"]
+        background_calls = self._stats["refreshes"] + self._stats["refresh_errors"] + len(self._refreshing)
+        return {
+            **self._stats,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hit_rate": round(hits / total, 3) if total else None,
+            "saved_calls": max(0, hits - background_calls),
+        }
@@ -0,0 +1,192 @@
+"""
+外部 HTTP 流量录制 / 回放（cassette）
+
+HTTP_CASSETTE_MODE：
+  - record：共享客户端发出的每个请求照常访问网络，同时把请求键、响应和耗时追加写入 cassette 文件；
+  - replay：不访问网络，按请求键从 cassette 文件取出录制的响应返回，
+    可按 HTTP_CASSETTE_DELAY_SCALE 重现录制时的耗时（0 表示立即返回）；
+  - off（默认）：不录制也不回放。
+
+用于在没有网络的情况下，用同一批百度 / DeepSeek 响应比较不同提交的推荐、截图识别性能。
+文件为 JSON Lines，路径以 .gz 结尾时 gzip 压缩；每行一个响应：
+    {"k": 请求键, "s": 状态码, "h": {响应头}, "b": 响应体, "ms": 耗时}
+请求键由方法、URL（去掉 ak 参数，查询参数排序）和请求体摘要组成，密钥不会写入文件。
+同一请求键录制了多次时按录制顺序依次返回，用完后一直返回最后一次的响应。
+回放时找不到请求键会抛出 httpx.ConnectError，调用方按网络错误处理（走兜底逻辑）。
+录制时条目先写入内存缓冲，由后台线程批量写入文件，不在事件循环中做磁盘 I/O；关闭时写完剩余条目。
+"""
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlencode
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 不参与请求键、也不写入文件的查询参数（密钥）
+SECRET_PARAMS = {"ak"}
+# 回放时需要保留的响应头
+KEPT_HEADERS = ("content-type", "content-encoding")
+
+
+def request_key(request):
+    """方法 + 去掉密钥并排序查询参数的 URL + 请求体摘要"""
+    params = sorted((k, v) for k, v in request.url.params.multi_items() if k not in SECRET_PARAMS)
+    url = request.url.copy_with(query=urlencode(params).encode("ascii") if params else None)
+    key = f"{request.method} {url}"
+    body = request.content
+    if body:
+        key += " " + hashlib.sha256(body).hexdigest()[:16]
+    return key
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """cassette 文件：录制时追加写入，回放时按请求键建立队列"""
+
+    def __init__(self, path, mode, delay_scale=1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"未知的 cassette 模式: {mode}（可选 record / replay）")
+        self.path = path
+        self.mode = mode
+        self.delay_scale = delay_scale
+        self._file = None
+        self._pending = []  # 待写入文件的行
+        self._lock = threading.Lock()  # 保护 _pending
+        self._write_lock = threading.Lock()  # 保护文件
+        self._flush_task = None
+        self._truncated = False  # 录制时首次打开清空旧文件，之后（例如应用重启客户端后）继续追加
+        self._entries = {}  # 请求键 -> deque[录制的响应]
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"cassette 文件不存在: {self.path}")
+        with _open(self.path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["k"], deque()).append(entry)
+        count = sum(len(q) for q in self._entries.values())
+        logger.info(f"已加载 cassette {self.path}: {count} 个响应, {len(self._entries)} 个请求键")
+
+    def record(self, request, response, content, elapsed_ms):
+        """把一个响应加入写入缓冲（只做序列化，不写文件）"""
+        try:
+            body = {"t": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            body = {"b64": base64.b64encode(content).decode("ascii")}
+        entry = {
+            "k": request_key(request),
+            "s": response.status_code,
+            "h": {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            "b": body,
+            "ms": round(elapsed_ms, 1),
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._pending.append(line)
+        self._stats["recorded"] += 1
+
+    def flush(self):
+        """把缓冲的条目写入文件（阻塞，在线程中或关闭时调用）"""
+        with self._write_lock:
+            while True:
+                with self._lock:
+                    lines, self._pending = self._pending, []
+                if not lines:
+                    return
+                if self._file is None:
+                    self._file = _open(self.path, "a" if self._truncated else "w")
+                    self._truncated = True
+                self._file.write("".join(lines))
+                self._file.flush()
+
+    def schedule_flush(self):
+        """在事件循环中调用：没有正在进行的写入时，启动后台线程写入缓冲"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(asyncio.to_thread(self.flush))
+
+    def next_entry(self, request):
+        """按录制顺序取出请求对应的响应，最后一个保留下来重复返回；没有录制过返回 None"""
+        queue = self._entries.get(request_key(request))
+        if not queue:
+            self._stats["misses"] += 1
+            return None
+        self._stats["replayed"] += 1
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def stats(self):
+        return {**self._stats, "mode": self.mode, "path": self.path}
+
+    def close(self):
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """包装真实的传输层：正常发出请求，读完响应体后写入 cassette"""
+
+    def __init__(self, cassette, transport):
+        self.cassette = cassette
+        self.transport = transport
+
+    async def handle_async_request(self, request):
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        if response.is_stream_consumed:
+            # 传输层已读完响应体（例如测试用的 MockTransport）
+            content = response.content
+        else:
+            try:
+                # 保存原始字节（可能仍是 gzip 压缩的），由客户端按 content-encoding 解码
+                content = b"".join([chunk async for chunk in response.aiter_raw()])
+            finally:
+                await response.aclose()
+        self.cassette.record(request, response, content, (time.perf_counter() - start) * 1000)
+        self.cassette.schedule_flush()
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            content=content,
+            extensions=response.extensions,
+            request=request,
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """不访问网络，从 cassette 返回录制的响应"""
+
+    def __init__(self, cassette):
+        self.cassette = cassette
+
+    async def handle_async_request(self, request):
+        entry = self.cassette.next_entry(request)
+        if entry is None:
+            raise httpx.ConnectError(f"cassette 中没有该请求: {request_key(request)}", request=request)
+        if self.cassette.delay_scale > 0:
+            await asyncio.sleep(entry["ms"] / 1000 * self.cassette.delay_scale)
+        body = entry["b"]
+        content = body["t"].encode("utf-8") if "t" in body else base64.b64decode(body["b64"])
+        return httpx.Response(entry["s"], headers=entry["h"], content=content, request=request)
@@ -0,0 +1,125 @@
+"""
+外部接口熔断器
+
+每个接口一个熔断器，统计最近 CIRCUIT_WINDOW_SECONDS 秒内的请求结果：
+  - closed：正常放行；窗口内请求数达到 min_requests 且错误率超过阈值时断开（open）；
+  - open：直接拒绝（抛出 CircuitOpenError），调用方立即走直线距离估算等兜底逻辑，
+    不再等待一次次超时；open_seconds 秒后进入 half_open；
+  - half_open：只放行一个探测请求，成功则恢复 closed，失败则重新 open。
+
+错误指网络异常 / 超时、HTTP 5xx / 404，以及百度返回的服务端错误、AK / IP 校验失败等状态码；
+限流响应由 app.core.rate_limit 处理，不计入错误。
+由 app.core.http_client 在发请求时按 endpoint 自动套用。
+"""
+import time
+from collections import deque
+
+from app.config import (
+    CIRCUIT_WINDOW_SECONDS,
+    CIRCUIT_MIN_REQUESTS,
+    CIRCUIT_ERROR_RATE,
+    CIRCUIT_OPEN_SECONDS,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于断开状态，请求未发出"""
+
+    def __init__(self, endpoint):
+        super().__init__(f"{endpoint} 熔断中，暂停调用")
+        self.endpoint = endpoint
+
+
+class CircuitBreaker:
+    """单个接口的熔断器（滚动窗口错误率）"""
+
+    def __init__(self, name, window_seconds=30.0, min_requests=5, error_rate=0.5,
+                 open_seconds=30.0, clock=time.monotonic):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self._results = deque()  # (时间, 是否成功)
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def _trim(self, now):
+        while self._results and now - self._results[0][0] > self.window_seconds:
+            self._results.popleft()
+
+    def allow(self):
+        """是否放行本次请求"""
+        now = self.clock()
+        if self.state == OPEN:
+            if now - self._opened_at < self.open_seconds:
+                self._stats["rejected"] += 1
+                return False
+            self.state = HALF_OPEN
+            self._probe_started = None
+        if self.state == HALF_OPEN:
+            # 只放行一个探测请求；探测请求迟迟没有结果（例如被取消）时允许重新探测
+            if self._probe_started is not None and now - self._probe_started < self.open_seconds:
+                self._stats["rejected"] += 1
+                return False
+            self._probe_started = now
+        return True
+
+    def record_success(self):
+        now = self.clock()
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self._results.clear()
+        self._results.append((now, True))
+        self._trim(now)
+
+    def record_failure(self):
+        now = self.clock()
+        if self.state == HALF_OPEN:
+            self._open(now)
+            return
+        self._results.append((now, False))
+        self._trim(now)
+        if self.state == CLOSED and len(self._results) >= self.min_requests:
+            failures = sum(1 for _, ok in self._results if not ok)
+            if failures / len(self._results) >= self.error_rate:
+                self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self._probe_started = None
+        self._results.clear()
+        self._stats["opened"] += 1
+
+    def stats(self):
+        failures = sum(1 for _, ok in self._results if not ok)
+        return {
+            **self._stats,
+            "state": self.state,
+            "window_requests": len(self._results),
+            "window_error_rate": round(failures / len(self._results), 3) if self._results else None,
+        }
+
+
+def _breaker(name):
+    return CircuitBreaker(
+        name,
+        window_seconds=CIRCUIT_WINDOW_SECONDS,
+        min_requests=CIRCUIT_MIN_REQUESTS,
+        error_rate=CIRCUIT_ERROR_RATE,
+        open_seconds=CIRCUIT_OPEN_SECONDS,
+    )
+
+
+circuit_breakers = {
+    name: _breaker(name)
+    for name in ("place_search", "routematrix", "directionlite", "deepseek_chat")
+}
@@ -0,0 +1,226 @@
+"""
+共享 HTTP 客户端（连接池）
+
+所有对百度地图、DeepSeek 的调用都通过这里发出：每个上游一个长期存在的 httpx.AsyncClient，
+保持 keep-alive 连接复用，省去每次请求重新做 DNS / TCP / TLS 握手。
+每个上游单独限制连接数，按接口类型设置超时；可选开启 HTTP/2。
+应用退出时由 lifespan 调用 aclose() 关闭。
+
+用法：
+    resp = await http_clients.get("baidu", url, endpoint="routematrix", params=...)
+    resp = await http_clients.post("deepseek", url, endpoint="deepseek_chat", json=...)
+
+网络异常（httpx.RequestError）原样抛给调用方，由调用方决定重试或兜底。
+按 endpoint 套用 app.core.rate_limit 中的全局限流器和 app.core.circuit_breaker 中的熔断器；
+熔断期间直接抛出 CircuitOpenError，请求不会发出。
+HTTP_CASSETTE_MODE=record / replay 时在传输层录制或回放外部流量，见 app.core.cassette。
+"""
+import asyncio
+import importlib.util
+import logging
+
+from app.core.rate_limit import rate_limiters
+from app.core.circuit_breaker import circuit_breakers, CircuitOpenError
+from app.config import (
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP_MAX_KEEPALIVE_PER_HOST,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP2_ENABLED,
+    HTTP_CASSETTE_MODE,
+    HTTP_CASSETTE_PATH,
+    HTTP_CASSETTE_DELAY_SCALE,
+)
+
+logger = logging.getLogger(__name__)
+
+# 各接口的超时时间（秒）：(连接超时, 读取超时)
+ENDPOINT_TIMEOUTS = {
+    "place_search": (5.0, 20.0),
+    "routematrix": (5.0, 30.0),
+    "directionlite": (5.0, 10.0),
+    "deepseek_chat": (10.0, 60.0),
+}
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+# 百度返回 HTTP 200 但 status 为并发超限（401）或 429 时，同样视为被限流
+THROTTLED_API_STATUS = {401, 429}
+
+
+def _api_status(resp):
+    """短 JSON 响应中的 status 字段；百度的错误响应都很短，只解析短响应，避免重复解析大的矩阵结果"""
+    if resp.status_code != 200 or len(resp.content) > 512:
+        return None
+    try:
+        data = resp.json()
+        return int(data.get("status"))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _is_throttled(resp, api_status):
+    return resp.status_code == 429 or api_status in THROTTLED_API_STATUS
+
+
+def _is_failure(resp, api_status):
+    """计入熔断错误率：5xx、404、鉴权失败，以及百度服务端错误（1）和 AK / IP / 配额类错误（>=101）"""
+    if resp.status_code >= 500 or resp.status_code in (401, 403, 404):
+        return True
+    if api_status is None or api_status in THROTTLED_API_STATUS:
+        return False
+    return api_status == 1 or api_status >= 101
+
+
+class HttpClientRegistry:
+    """按上游名称（baidu / deepseek）管理共享的 AsyncClient，并统计连接复用情况"""
+
+    def __init__(self, max_connections=20, max_keepalive=10, keepalive_expiry=30.0, http2=False,
+                 cassette_mode="off", cassette_path=None, cassette_delay_scale=1.0):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.warning("HTTP2_ENABLED=true 但未安装 h2，退回 HTTP/1.1")
+        self.cassette_mode = cassette_mode
+        self.cassette_path = cassette_path
+        self.cassette_delay_scale = cassette_delay_scale
+        self._cassette = None
+        self._clients = {}
+        self._loop = None
+        self._stats = {}
+
+    @property
+    def cassette(self):
+        """录制 / 回放用的 cassette，未开启时为 None（首次使用时加载）"""
+        if self._cassette is None and self.cassette_mode in ("record", "replay"):
+            from app.core.cassette import Cassette
+            self._cassette = Cassette(self.cassette_path, self.cassette_mode, self.cassette_delay_scale)
+            logger.info(f"外部 HTTP 流量{'录制' if self.cassette_mode == 'record' else '回放'}: {self.cassette_path}")
+        return self._cassette
+
+    def _transport(self, httpx):
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        cassette = self.cassette
+        if cassette is not None and cassette.mode == "replay":
+            from app.core.cassette import ReplayTransport
+            return ReplayTransport(cassette)
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=self.http2)
+        if cassette is not None:
+            from app.core.cassette import RecordingTransport
+            return RecordingTransport(cassette, transport)
+        return transport
+
+    def client(self, name):
+        """返回上游 name 对应的共享客户端，首次使用时创建"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 客户端的连接池绑定在事件循环上，换了循环（例如测试里多次启动应用）就重新创建
+            self._clients = {}
+            self._loop = loop
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            import httpx
+            client = httpx.AsyncClient(
+                transport=self._transport(httpx),
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT[1], connect=DEFAULT_TIMEOUT[0]),
+            )
+            self._clients[name] = client
+        return client
+
+    def _timeout(self, endpoint):
+        import httpx
+        connect, read = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+        return httpx.Timeout(read, connect=connect)
+
+    def _stat(self, name):
+        return self._stats.setdefault(name, {"requests": 0, "new_connections": 0, "errors": 0})
+
+    async def request(self, name, method, url, endpoint=None, **kwargs):
+        """通过上游 name 的共享客户端发出请求；未显式传 timeout 时按 endpoint 取超时"""
+        stat = self._stat(name)
+
+        async def trace(event_name, info):
+            # 只有新建连接时才会出现 connect_tcp 事件，复用已有连接时不会
+            if event_name == "connection.connect_tcp.complete":
+                stat["new_connections"] += 1
+
+        kwargs.setdefault("timeout", self._timeout(endpoint))
+        extensions = dict(kwargs.pop("extensions", None) or {})
+        extensions["trace"] = trace
+
+        breaker = circuit_breakers.get(endpoint)
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(endpoint)
+        limiter = rate_limiters.get(endpoint)
+        if limiter is not None:
+            await limiter.acquire()
+        stat["requests"] += 1
+        try:
+            resp = await self.client(name).request(method, url, extensions=extensions, **kwargs)
+        except Exception:
+            stat["errors"] += 1
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        finally:
+            if limiter is not None:
+                limiter.release()
+
+        api_status = _api_status(resp) if (limiter or breaker) else None
+        if limiter is not None:
+            if _is_throttled(resp, api_status):
+                limiter.record_throttled()
+            else:
+                limiter.record_success()
+        if breaker is not None:
+            if _is_failure(resp, api_status):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        return resp
+
+    async def get(self, name, url, endpoint=None, **kwargs):
+        return await self.request(name, "GET", url, endpoint=endpoint, **kwargs)
+
+    async def post(self, name, url, endpoint=None, **kwargs):
+        return await self.request(name, "POST", url, endpoint=endpoint, **kwargs)
+
+    def stats(self):
+        """各上游的请求数、新建连接数和连接复用率"""
+        result = {}
+        for name, stat in self._stats.items():
+            reused = max(0, stat["requests"] - stat["errors"] - stat["new_connections"])
+            completed = stat["requests"] - stat["errors"]
+            result[name] = {
+                **stat,
+                "reused_connections": reused,
+                "reuse_ratio": round(reused / completed, 3) if completed else None,
+            }
+        cassette = self._cassette.stats() if self._cassette is not None else None
+        return {"http2": self.http2, "upstreams": result, "cassette": cassette}
+
+    async def aclose(self):
+        """关闭所有客户端（应用退出时调用）"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 客户端失败: {e}")
+        if self._cassette is not None:
+            self._cassette.close()
+
+
+http_clients = HttpClientRegistry(
+    max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+    max_keepalive=HTTP_MAX_KEEPALIVE_PER_HOST,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    http2=HTTP2_ENABLED,
+    cassette_mode=HTTP_CASSETTE_MODE,
+    cassette_path=HTTP_CASSETTE_PATH,
+    cassette_delay_scale=HTTP_CASSETTE_DELAY_SCALE,
+)
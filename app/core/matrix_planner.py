@@ -0,0 +1,79 @@
+"""
+路网矩阵分块
+
+百度路网矩阵单次请求的起点数 × 终点数有上限（默认 50）。队伍人数多时一次请求会超限，
+整个请求退回直线估算。这里把 origins × destinations 切成不超过上限的块，
+各块并发请求（节奏由 app.core.http_client 的共享限流器控制），再拼回一个完整的时长矩阵。
+某一块失败或超时只影响这一块的格子（保持 None），其余格子照常使用。
+
+用法：
+    matrix, error = await fetch_matrix_tiles(provider.route_matrix, "walking", origins, destinations,
+                                             max_elements=50, timeout=3.0)
+"""
+import asyncio
+import math
+
+
+def plan_tiles(n_rows, n_cols, max_elements=None):
+    """
+    把 n_rows × n_cols 切成每块元素数不超过 max_elements 的块，块数尽量少（相同块数时取更方正的切法）
+    返回 [(行下标 range, 列下标 range), ...]；max_elements 为空表示不限制
+    """
+    if n_rows == 0 or n_cols == 0:
+        return []
+    if not max_elements or n_rows * n_cols <= max_elements:
+        return [(range(n_rows), range(n_cols))]
+
+    best = None
+    for cols_per_tile in range(1, min(n_cols, max_elements) + 1):
+        rows_per_tile = min(n_rows, max_elements // cols_per_tile)
+        count = math.ceil(n_rows / rows_per_tile) * math.ceil(n_cols / cols_per_tile)
+        key = (count, abs(rows_per_tile - cols_per_tile))
+        if best is None or key < best[0]:
+            best = (key, rows_per_tile, cols_per_tile)
+    _, rows_per_tile, cols_per_tile = best
+    return [
+        (range(r, min(r + rows_per_tile, n_rows)), range(c, min(c + cols_per_tile, n_cols)))
+        for r in range(0, n_rows, rows_per_tile)
+        for c in range(0, n_cols, cols_per_tile)
+    ]
+
+
+async def fetch_matrix_tiles(route_matrix, mode, origins, destinations, max_elements=None, timeout=None):
+    """
+    分块并发请求 route_matrix(mode, 起点, 终点) -> (矩阵, 错误)，拼回完整矩阵
+    返回 (矩阵, 错误)：矩阵取不到的格子为 None；错误为第一个失败块的错误，超时为 ("…", "deadline")
+    """
+    matrix = [[None] * len(destinations) for _ in origins]
+    tiles = plan_tiles(len(origins), len(destinations), max_elements)
+    if not tiles:
+        return matrix, None
+    if len(tiles) > 1:
+        print(f"{mode}路网矩阵 {len(origins)}×{len(destinations)} 拆分为 {len(tiles)} 块")
+
+    tasks = [
+        asyncio.create_task(route_matrix(mode, [origins[i] for i in rows], [destinations[j] for j in cols]))
+        for rows, cols in tiles
+    ]
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+    error = None
+    for (rows, cols), task in zip(tiles, tasks):
+        if task in pending:
+            error = error or ("路网矩阵超过截止时间", "deadline")
+            continue
+        try:
+            sub, sub_error = task.result()
+        except Exception as e:
+            # 单个块抛出异常时按失败块处理，其余块的结果照常使用
+            print(f"{mode}路网矩阵分块请求异常: {e}")
+            sub, sub_error = None, ("路网矩阵请求异常", "tile_exception")
+        if sub is None:
+            error = error or sub_error
+            continue
+        for a, i in enumerate(rows):
+            for b, j in enumerate(cols):
+                matrix[i][j] = sub[a][b]
+    return matrix, error
@@ -0,0 +1,116 @@
+"""
+百度接口限流（令牌桶 + 自适应退避）
+
+每个接口（place_search / routematrix / directionlite）一个全局限流器，所有请求共享：
+  - 令牌桶控制 QPS，并用信号量限制同时在途的请求数；
+  - 等待令牌的请求按到达顺序排队（先到先得）；
+  - 观察到限流响应（HTTP 429 或百度并发超限状态码）时，速率减半并暂停一段时间
+    （连续被限流时暂停时间翻倍），之后每次成功请求逐步恢复到配置的 QPS。
+
+由 app.core.http_client 在发请求时按 endpoint 自动套用，调用方无需关心。
+"""
+import asyncio
+import time
+
+from app.config import (
+    RATE_LIMIT_PLACE_SEARCH_QPS,
+    RATE_LIMIT_ROUTEMATRIX_QPS,
+    RATE_LIMIT_DIRECTIONLITE_QPS,
+    RATE_LIMIT_MAX_CONCURRENCY,
+)
+
+MIN_RATE_RATIO = 0.1  # 自适应降速的下限：配置 QPS 的 10%
+BASE_BACKOFF = 0.5  # 首次被限流后的暂停时间（秒）
+MAX_BACKOFF = 30.0
+
+
+class EndpointLimiter:
+    """单个接口的令牌桶限流器"""
+
+    def __init__(self, name, qps, max_concurrency=10, burst=None, clock=time.monotonic):
+        self.name = name
+        self.qps = float(qps)
+        self.rate = self.qps  # 当前生效的速率，被限流后下调
+        self.burst = float(burst if burst is not None else max(1.0, qps))
+        self.max_concurrency = max_concurrency
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self._order = None  # asyncio.Lock：按到达顺序逐个发放令牌
+        self._slots = None  # asyncio.Semaphore：限制在途请求数
+        self._loop = None
+        self._waiting = 0
+        self._stats = {"acquired": 0, "throttled": 0, "waited_seconds": 0.0}
+
+    def _primitives(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._order = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._order, self._slots
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    async def acquire(self):
+        """等待一个令牌和一个并发名额；返回后必须调用 release()"""
+        order, slots = self._primitives()
+        start = self.clock()
+        self._waiting += 1
+        try:
+            async with order:
+                while True:
+                    now = self._refill()
+                    if now < self._paused_until:
+                        await asyncio.sleep(self._paused_until - now)
+                        continue
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+            await slots.acquire()
+        finally:
+            self._waiting -= 1
+        self._stats["acquired"] += 1
+        self._stats["waited_seconds"] += self.clock() - start
+
+    def release(self):
+        self._slots.release()
+
+    def record_throttled(self):
+        """收到限流响应：速率减半，并暂停发放令牌（连续限流时暂停时间翻倍）"""
+        self._stats["throttled"] += 1
+        self._refill()
+        self.rate = max(self.qps * MIN_RATE_RATIO, self.rate / 2)
+        self._backoff = min(MAX_BACKOFF, self._backoff * 2 if self._backoff else BASE_BACKOFF)
+        self._paused_until = self.clock() + self._backoff
+        self._tokens = 0.0
+
+    def record_success(self):
+        """请求成功：清除退避，速率每次恢复配置 QPS 的 5%"""
+        self._backoff = 0.0
+        if self.rate < self.qps:
+            self._refill()
+            self.rate = min(self.qps, self.rate + self.qps * 0.05)
+
+    def stats(self):
+        return {
+            **self._stats,
+            "waited_seconds": round(self._stats["waited_seconds"], 3),
+            "qps": self.qps,
+            "current_rate": round(self.rate, 2),
+            "queued": self._waiting,
+        }
+
+
+rate_limiters = {
+    "place_search": EndpointLimiter("place_search", RATE_LIMIT_PLACE_SEARCH_QPS, RATE_LIMIT_MAX_CONCURRENCY),
+    "routematrix": EndpointLimiter("routematrix", RATE_LIMIT_ROUTEMATRIX_QPS, RATE_LIMIT_MAX_CONCURRENCY),
+    "directionlite": EndpointLimiter("directionlite", RATE_LIMIT_DIRECTIONLITE_QPS, RATE_LIMIT_MAX_CONCURRENCY),
+}
@@ -0,0 +1,50 @@
+"""
+相同请求合并执行（single-flight）
+
+同一个键上已有计算在进行时，后到的调用不再重复计算，而是等待同一个结果（或同一个异常）。
+计算完成后立即移除，不做缓存；需要缓存请配合 app.core.cache。
+
+用法：
+    result = await recommend_flight.do(key, lambda: compute(...))
+
+计算在独立任务中运行：发起计算的请求被取消（例如客户端断开）时，其他等待者不受影响。
+"""
+import asyncio
+
+
+class SingleFlight:
+    """按键合并并发中的相同异步计算"""
+
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}
+        self._stats = {"calls": 0, "executions": 0, "shared": 0}
+
+    async def do(self, key, fn):
+        """fn 为无参协程函数；同一时刻同一个 key 只会执行一次 fn"""
+        self._stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["shared"] += 1
+        else:
+            self._stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都被取消时，避免出现 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {**self._stats, "inflight": len(self._inflight)}
+
+
+# 推荐接口：相同的 PlaceRequest 合并为一次计算
+recommend_flight = SingleFlight("recommend")
+# DeepSeek 截图解析：相同的图片和提示词合并为一次调用
+deepseek_flight = SingleFlight("deepseek")
@@ -0,0 +1,195 @@
+"""
+起点→终点出行时长缓存
+
+校区到餐厅的步行 / 驾车 / 公交时长几乎不变，没必要每次推荐都重新请求百度。
+键为 (起点 geohash, 终点 geohash, 出行方式)，坐标按 geohash 量化（8 位约 38m × 19m），
+值为时长（秒）。数据持久化在本地 SQLite 文件中，前面加一层进程内 LRU；
+超过 TRAVEL_CACHE_TTL_DAYS 天的记录视为过期。
+
+用法：
+    found = await travel_cache.aget_many([(orig, dest), ...], "walking")   # {(orig, dest): 秒}
+    await travel_cache.aput_many({(orig, dest): 秒, ...}, "walking")
+异步接口先查内存 LRU，只有未命中的查询和写入才放到线程中访问 SQLite，不阻塞事件循环；
+同步的 get_many / put_many 供脚本使用。
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import TRAVEL_CACHE_PATH, TRAVEL_CACHE_TTL_DAYS, TRAVEL_CACHE_MEMORY_ENTRIES
+from app.core.utils import geohash_encode
+
+logger = logging.getLogger(__name__)
+
+GEOHASH_PRECISION = 8
+
+
+def _cell(coord):
+    return geohash_encode(float(coord[0]), float(coord[1]), GEOHASH_PRECISION)
+
+
+class TravelTimeCache:
+    """SQLite 持久化 + 内存 LRU 的出行时长缓存"""
+
+    def __init__(self, path, ttl_seconds, memory_entries=50000):
+        self.path = path
+        self.ttl = ttl_seconds
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()  # (orig_cell, dest_cell, mode) -> (秒, 写入时间)
+        self._lock = threading.Lock()  # 保护内存 LRU 和统计，只做内存操作
+        self._db_lock = threading.Lock()  # 保护 SQLite 连接
+        self._conn = None
+        self._stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stored": 0}
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS travel_times ("
+                " origin TEXT NOT NULL, destination TEXT NOT NULL, mode TEXT NOT NULL,"
+                " seconds REAL NOT NULL, updated_at REAL NOT NULL,"
+                " PRIMARY KEY (origin, destination, mode))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key, seconds, updated_at):
+        self._memory[key] = (seconds, updated_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup_memory(self, pairs, mode, now):
+        """查内存 LRU，返回 (命中的 {(起点, 终点): 秒}, 未命中的 {键: [坐标对, ...]})"""
+        found = {}
+        pending = {}  # 内存未命中的键 -> 对应的原始坐标对
+        with self._lock:
+            for pair in pairs:
+                key = (_cell(pair[0]), _cell(pair[1]), mode)
+                entry = self._memory.get(key)
+                if entry is not None and now - entry[1] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    found[pair] = entry[0]
+                    self._stats["memory_hits"] += 1
+                else:
+                    pending.setdefault(key, []).append(pair)
+        return found, pending
+
+    def _load(self, pending, mode, now):
+        """从 SQLite 查询内存未命中的键，写回内存 LRU，返回命中的 {(起点, 终点): 秒}"""
+        found = {}
+        try:
+            with self._db_lock:
+                rows = self._query(list(pending), mode, now)
+        except sqlite3.Error as e:
+            logger.warning(f"读取出行时长缓存失败: {e}")
+            rows = []
+        with self._lock:
+            for origin, destination, seconds, updated_at in rows:
+                key = (origin, destination, mode)
+                self._remember(key, seconds, updated_at)
+                for pair in pending.pop(key, []):
+                    found[pair] = seconds
+                    self._stats["db_hits"] += 1
+            self._stats["misses"] += sum(len(v) for v in pending.values())
+        return found
+
+    def get_many(self, pairs, mode):
+        """查询 [(起点, 终点), ...]，返回命中的 {(起点, 终点): 秒}"""
+        now = time.time()
+        found, pending = self._lookup_memory(pairs, mode, now)
+        if pending:
+            found.update(self._load(pending, mode, now))
+        return found
+
+    async def aget_many(self, pairs, mode):
+        """get_many 的异步版本：内存未命中时在线程中查询 SQLite"""
+        now = time.time()
+        found, pending = self._lookup_memory(pairs, mode, now)
+        if pending:
+            found.update(await asyncio.to_thread(self._load, pending, mode, now))
+        return found
+
+    def _query(self, keys, mode, now):
+        conn = self._connection()
+        rows = []
+        # SQLite 单条语句的参数个数有限，按批查询
+        for start in range(0, len(keys), 400):
+            batch = keys[start:start + 400]
+            placeholders = ",".join("(?, ?)" for _ in batch)
+            params = [v for key in batch for v in key[:2]]
+            rows.extend(conn.execute(
+                f"SELECT origin, destination, seconds, updated_at FROM travel_times"
+                f" WHERE (origin, destination) IN (VALUES {placeholders}) AND mode = ? AND updated_at >= ?",
+                params + [mode, now - self.ttl],
+            ))
+        return rows
+
+    def _remember_many(self, durations, mode, now):
+        """把 {(起点, 终点): 秒} 写入内存 LRU（None 值忽略），返回待持久化的 {键: 秒}"""
+        records = {}
+        for (orig, dest), seconds in durations.items():
+            if seconds is None:
+                continue
+            records[(_cell(orig), _cell(dest), mode)] = float(seconds)
+        with self._lock:
+            for key, seconds in records.items():
+                self._remember(key, seconds, now)
+        return records
+
+    def _write(self, records, now):
+        try:
+            with self._db_lock:
+                conn = self._connection()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO travel_times (origin, destination, mode, seconds, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(o, d, m, s, now) for (o, d, m), s in records.items()],
+                )
+                conn.commit()
+            with self._lock:
+                self._stats["stored"] += len(records)
+        except sqlite3.Error as e:
+            logger.warning(f"写入出行时长缓存失败: {e}")
+
+    def put_many(self, durations, mode):
+        """写入 {(起点, 终点): 秒}，None 值忽略"""
+        now = time.time()
+        records = self._remember_many(durations, mode, now)
+        if records:
+            self._write(records, now)
+
+    async def aput_many(self, durations, mode):
+        """put_many 的异步版本：立即写入内存 LRU，在线程中写入 SQLite"""
+        now = time.time()
+        records = self._remember_many(durations, mode, now)
+        if records:
+            await asyncio.to_thread(self._write, records, now)
+
+    def stats(self):
+        lookups = self._stats["memory_hits"] + self._stats["db_hits"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        return {
+            **self._stats,
+            "memory_size": len(self._memory),
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
+
+    def close(self):
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+travel_cache = TravelTimeCache(
+    TRAVEL_CACHE_PATH,
+    ttl_seconds=TRAVEL_CACHE_TTL_DAYS * 86400,
+    memory_entries=TRAVEL_CACHE_MEMORY_ENTRIES,
+)
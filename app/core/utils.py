@@ -10,8 +10,171 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     c = 2 * math.asin(math.sqrt(a))
     return R * c
 
-def compute_center(coords: list[list[float]]) -> tuple[float, float]:
-    """计算简单地理中心"""
-    lat = sum(c[0] for c in coords) / len(coords)
-    lon = sum(c[1] for c in coords) / len(coords)
+def haversine_matrix(origins, destinations):
+    """
+    批量计算距离矩阵（公里）：返回形状为 (起点数, 终点数) 的 numpy 数组
+    origins / destinations 为 [(lat, lon), ...]，几百个候选点也只需一次向量化计算
+    """
+    import numpy as np
+
+    o = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    d = np.radians(np.asarray(destinations, dtype=float).reshape(-1, 2))
+    lat1 = o[:, 0:1]
+    lon1 = o[:, 1:2]
+    lat2 = d[:, 0][None, :]
+    lon2 = d[:, 1][None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def compute_center(coords: list[list[float]], strategy: str = "centroid", weights=None) -> tuple[float, float]:
+    """
+    计算会面中心：
+      centroid：经纬度平均（简单地理中心）
+      median：几何中位点，到各点直线距离之和最小（Weiszfeld 迭代）
+      minimax：最小覆盖圆圆心，到最远一点的距离最小
+    weights：各点的权重（例如合并后每个起点代表的人数），默认都为 1；minimax 只看最远点，与权重无关
+    """
+    if weights is None:
+        weights = [1] * len(coords)
+    if strategy == "median":
+        return geometric_median(coords, weights)
+    if strategy == "minimax":
+        return minimax_center(coords)
+    if strategy != "centroid":
+        raise ValueError(f"未知的中心点策略: {strategy}（可选 centroid / median / minimax）")
+    total = sum(weights)
+    lat = sum(c[0] * w for c, w in zip(coords, weights)) / total
+    lon = sum(c[1] * w for c, w in zip(coords, weights)) / total
     return lat, lon
+
+def merge_origins(coords, max_km=0.2):
+    """
+    把相距不超过 max_km 的起点合并为一个带权重的起点（保留先出现的坐标）
+    返回 (起点列表, 权重列表)，权重为合并进来的点数
+    """
+    merged = []
+    weights = []
+    for c in coords:
+        for i, m in enumerate(merged):
+            if haversine_distance(c[0], c[1], m[0], m[1]) <= max_km:
+                weights[i] += 1
+                break
+        else:
+            merged.append((c[0], c[1]))
+            weights.append(1)
+    return merged, weights
+
+# 城市范围内用等距圆柱投影把经纬度换成平面坐标（公里），误差可以忽略
+_KM_PER_DEG_LAT = 111.32
+
+def _projection(coords):
+    lat0 = sum(c[0] for c in coords) / len(coords)
+    lon0 = sum(c[1] for c in coords) / len(coords)
+    kx = _KM_PER_DEG_LAT * math.cos(math.radians(lat0))
+    points = [((c[1] - lon0) * kx, (c[0] - lat0) * _KM_PER_DEG_LAT) for c in coords]
+    unproject = lambda x, y: (lat0 + y / _KM_PER_DEG_LAT, lon0 + x / kx)
+    return points, unproject
+
+def geometric_median(coords, weights=None, iterations=100, tolerance_km=0.001):
+    """加权几何中位点（Weiszfeld 迭代），从加权平均点出发；weights 默认都为 1"""
+    if weights is None:
+        weights = [1] * len(coords)
+    points, unproject = _projection(coords)
+    total = sum(weights)
+    x = sum(p[0] * w for p, w in zip(points, weights)) / total
+    y = sum(p[1] * w for p, w in zip(points, weights)) / total
+    for _ in range(iterations):
+        num_x = num_y = denom = 0.0
+        for (px, py), w in zip(points, weights):
+            d = math.hypot(px - x, py - y)
+            if d < 1e-9:
+                # 迭代点与某个输入点重合时该点权重无穷大，直接停在这里
+                return unproject(px, py)
+            num_x += w * px / d
+            num_y += w * py / d
+            denom += w / d
+        nx, ny = num_x / denom, num_y / denom
+        moved = math.hypot(nx - x, ny - y)
+        x, y = nx, ny
+        if moved < tolerance_km:
+            break
+    return unproject(x, y)
+
+def _circle_two(a, b):
+    cx, cy = (a[0] + b[0]) / 2, (a[1] + b[1]) / 2
+    return cx, cy, math.hypot(a[0] - cx, a[1] - cy)
+
+def _circle_three(a, b, c):
+    d = 2 * (a[0] * (b[1] - c[1]) + b[0] * (c[1] - a[1]) + c[0] * (a[1] - b[1]))
+    if abs(d) < 1e-12:
+        # 三点共线：取最远两点为直径
+        return max((_circle_two(p, q) for p, q in ((a, b), (a, c), (b, c))), key=lambda circle: circle[2])
+    sa, sb, sc = a[0] ** 2 + a[1] ** 2, b[0] ** 2 + b[1] ** 2, c[0] ** 2 + c[1] ** 2
+    cx = (sa * (b[1] - c[1]) + sb * (c[1] - a[1]) + sc * (a[1] - b[1])) / d
+    cy = (sa * (c[0] - b[0]) + sb * (a[0] - c[0]) + sc * (b[0] - a[0])) / d
+    return cx, cy, math.hypot(a[0] - cx, a[1] - cy)
+
+def minimax_center(coords):
+    """最小覆盖圆圆心（增量算法），即到最远一点距离最小的点"""
+    points, unproject = _projection(coords)
+    inside = lambda circle, p: math.hypot(p[0] - circle[0], p[1] - circle[1]) <= circle[2] + 1e-9
+    circle = (points[0][0], points[0][1], 0.0)
+    for i, p in enumerate(points):
+        if inside(circle, p):
+            continue
+        circle = (p[0], p[1], 0.0)
+        for j in range(i):
+            q = points[j]
+            if inside(circle, q):
+                continue
+            circle = _circle_two(p, q)
+            for k in range(j):
+                if not inside(circle, points[k]):
+                    circle = _circle_three(p, q, points[k])
+    return unproject(circle[0], circle[1])
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 7) -> str:
+    """把经纬度编码为 geohash 字符串（precision=7 约 150m × 150m 一格）"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash 从经度开始交替取位
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_center(code: str) -> tuple[float, float]:
+    """返回 geohash 格子的中心点 (lat, lon)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for ch in code:
+        value = _GEOHASH_BASE32.index(ch)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
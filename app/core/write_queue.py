@@ -0,0 +1,176 @@
+"""
+写入合并队列（group commit）
+
+SQLite 只有一把写锁，上传课表、保存课表、接受邀请在开学高峰期会各自提交事务并排队等锁。
+开启 WRITE_COALESCE_ENABLED 后，几毫秒窗口内到达的写操作会合并到同一个事务中提交，
+每个调用方仍然拿到自己的返回值或异常。
+
+用法：
+    def op(session):
+        session.add(...)
+        return {...}          # 返回普通数据，不要返回绑定到 session 的 ORM 对象
+    result = await write_queue.submit(op, db=db)
+同步路由（在线程池中运行）通过 anyio.from_thread.run(write_queue.submit, op, db) 调用。
+所有数据库操作都在线程中执行，不会阻塞事件循环。
+
+约定：op 只能通过传入的 session 读写数据库，并且可以安全地重复执行
+（批次中其他操作失败时，剩余操作会在新事务中重放）。
+"""
+import asyncio
+import logging
+
+from app.config import WRITE_COALESCE_ENABLED, WRITE_COALESCE_WINDOW_MS, WRITE_COALESCE_MAX_BATCH
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class WriteCoalescer:
+    """把并发请求的写操作按时间窗口合并为单个事务"""
+
+    def __init__(self, session_factory, enabled=False, window_ms=5.0, max_batch=64):
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = None
+        self._worker = None
+        self._loop = None
+        self.stats = {"batches": 0, "ops": 0, "failed_ops": 0, "replays": 0, "max_batch_size": 0}
+
+    async def submit(self, op, db=None):
+        """提交一个写操作，返回 op 的返回值；op 抛出的异常原样抛给调用方"""
+        if not self.enabled:
+            return await self._run_direct(op, db)
+
+        if db is not None:
+            # 提交调用方会话里已有的改动并归还连接，避免排队期间占满连接池
+            await asyncio.to_thread(db.commit)
+
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((op, future))
+        return await future
+
+    async def _run_direct(self, op, db):
+        """未开启合并时，直接在调用方的 session（或新 session）中执行并提交"""
+        if db is None:
+            return await asyncio.to_thread(self._apply_single, op)
+        return await asyncio.to_thread(self._apply_in_session, op, db)
+
+    @staticmethod
+    def _apply_in_session(op, db):
+        try:
+            result = op(db)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        """后台协程：收集一个窗口内的写操作，批量应用后逐个回填结果"""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                outcomes = await asyncio.to_thread(self._apply_batch, [op for op, _ in batch])
+            except Exception as e:
+                logger.exception("写入合并批次执行失败")
+                outcomes = [(False, e)] * len(batch)
+
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _apply_batch(self, ops):
+        """
+        在一个事务中依次执行 ops，返回 [(成功与否, 返回值或异常), ...]
+        某个 op 失败时回滚整个事务，剔除失败项后重放其余操作；
+        若提交本身失败且无法定位到具体操作，则退化为逐个单独提交。
+        """
+        outcomes = [None] * len(ops)
+        pending = list(range(len(ops)))
+        self.stats["batches"] += 1
+        self.stats["ops"] += len(ops)
+        self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(ops))
+
+        while pending:
+            session = self.session_factory()
+            failed = None
+            try:
+                for i in pending:
+                    try:
+                        outcomes[i] = (True, ops[i](session))
+                        session.flush()
+                    except Exception as e:
+                        failed = i
+                        outcomes[i] = (False, e)
+                        break
+
+                if failed is None:
+                    try:
+                        session.commit()
+                        return outcomes
+                    except Exception as e:
+                        session.rollback()
+                        logger.warning(f"合并提交失败，改为逐个提交: {e}")
+                        for i in pending:
+                            outcomes[i] = self._apply_one(ops[i])
+                        return outcomes
+
+                session.rollback()
+                pending.remove(failed)
+                self.stats["failed_ops"] += 1
+                if pending:
+                    self.stats["replays"] += 1
+            finally:
+                session.close()
+        return outcomes
+
+    def _apply_one(self, op):
+        try:
+            return True, self._apply_single(op)
+        except Exception as e:
+            self.stats["failed_ops"] += 1
+            return False, e
+
+    def _apply_single(self, op):
+        session = self.session_factory()
+        try:
+            result = op(session)
+            session.commit()
+            return result
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+write_queue = WriteCoalescer(
+    SessionLocal,
+    enabled=WRITE_COALESCE_ENABLED,
+    window_ms=WRITE_COALESCE_WINDOW_MS,
+    max_batch=WRITE_COALESCE_MAX_BATCH,
+)
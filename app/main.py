@@ -1,20 +1,48 @@
 """
 应用启动文件
 """
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers.place import router as place_router
+from app.routers.place import router as place_router, place_search_cache
 from app.routers.schedule import router as schedule_router
 from app.routers.auth import router as auth_router
 from app.routers.team import router as team_router
 from app.routers.school import router as school_router
-from app.database import Base, engine
-from app.models import user, schedule, team, school
+from app.config import AUTO_MIGRATE
+from app.utils.school_catalog import init_school_catalog
+from app.core.http_client import http_clients
+from app.core.travel_cache import travel_cache
+from app.utils.poi_store import poi_store
+from app.providers import get_provider
+from app.core.singleflight import recommend_flight, deepseek_flight
+from app.core.rate_limit import rate_limiters
+from app.core.circuit_breaker import circuit_breakers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 数据库表结构在启动阶段通过迁移建立，而不是在导入时执行 DDL
+    # 生产环境可设置 AUTO_MIGRATE=false，改为部署前执行 python -m app.migrations upgrade
+    # 启动时只执行结构迁移，改写数据的迁移（回填）只能通过命令行执行
+    if AUTO_MIGRATE:
+        from app.migrations import upgrade
+        upgrade(include_data=False)
+    # 加载学校目录到内存（学校表为空时先写入默认学校）
+    init_school_catalog()
+    # 创建地图数据提供方（local 提供方在这里读入 POI 文件，而不是在第一个请求中）
+    get_provider()
+    # 本地 POI 库后台刷新
+    await poi_store.start()
+    yield
+    await poi_store.stop()
+    # 关闭外部 HTTP 调用的共享连接池
+    await http_clients.aclose()
+    travel_cache.close()
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="智能跨校约饭系统 API")
+app = FastAPI(title="智能跨校约饭系统 API", lifespan=lifespan)
 
 # CORS配置
 app.add_middleware(
@@ -30,6 +58,20 @@ app.add_middleware(
 def health_check():
     return {"status": "ok"}
 
+
+@app.get("/metrics")
+def metrics():
+    """运行指标：外部 HTTP 连接复用情况、POI 搜索和出行时长缓存命中率等"""
+    return {
+        "http": http_clients.stats(),
+        "place_search_cache": place_search_cache.stats(),
+        "travel_cache": travel_cache.stats(),
+        "poi_store": poi_store.stats(),
+        "singleflight": {"recommend": recommend_flight.stats(), "deepseek": deepseek_flight.stats()},
+        "rate_limit": {name: limiter.stats() for name, limiter in rate_limiters.items()},
+        "circuit_breakers": {name: breaker.stats() for name, breaker in circuit_breakers.items()},
+    }
+
 # 注册路由
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(place_router, prefix="/api/places", tags=["Place Recommendation"])
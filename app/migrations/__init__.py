@@ -0,0 +1,85 @@
+"""
+数据库版本化迁移
+
+每个迁移是本包下的一个模块，包含 VERSION、NAME 和 upgrade(engine)。
+已执行的版本记录在 schema_migrations 表中，按版本号顺序只执行一次。
+改写已有数据的迁移（DATA = True）不随应用启动执行，只能通过命令行执行，
+避免重启时误改上线后新写入的数据。
+大表数据修复通过 backfill.run_backfill 分批执行，每批单独提交，可中断后续跑。
+
+命令行：
+    python -m app.migrations upgrade      # 执行所有未应用的迁移
+    python -m app.migrations status       # 查看迁移和回填进度
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.database import engine as default_engine
+from app.migrations import m0001_initial_schema, m0002_schedule_columns, m0003_backfill_schedule_weeks
+
+# 按版本号排列的迁移列表，新增迁移时追加到末尾
+MIGRATIONS = [
+    m0001_initial_schema,
+    m0002_schedule_columns,
+    m0003_backfill_schedule_weeks,
+]
+
+
+def _ensure_version_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, "
+            "name VARCHAR(100) NOT NULL, "
+            "applied_at DATETIME NOT NULL)"
+        ))
+
+
+def applied_versions(engine=default_engine):
+    """返回已应用的迁移版本号集合"""
+    _ensure_version_table(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def current_version(engine=default_engine):
+    """当前数据库的迁移版本（未执行过任何迁移时为0）"""
+    versions = applied_versions(engine)
+    return max(versions) if versions else 0
+
+
+def is_data_migration(migration):
+    return getattr(migration, "DATA", False)
+
+
+def upgrade(engine=default_engine, target=None, include_data=True):
+    """
+    依次执行未应用的迁移，返回本次执行的版本号列表
+    include_data=False 时跳过数据迁移（应用启动时使用），它们保持待执行状态
+    """
+    done = applied_versions(engine)
+    executed = []
+    for migration in MIGRATIONS:
+        if target is not None and migration.VERSION > target:
+            break
+        if migration.VERSION in done:
+            continue
+        if not include_data and is_data_migration(migration):
+            print(f"跳过数据迁移 {migration.VERSION:04d}_{migration.NAME}（请执行 python -m app.migrations upgrade）")
+            continue
+        print(f"执行迁移 {migration.VERSION:04d}_{migration.NAME} ...")
+        migration.upgrade(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": migration.VERSION, "n": migration.NAME, "t": datetime.utcnow()}
+            )
+        executed.append(migration.VERSION)
+    return executed
+
+
+def pending_migrations(engine=default_engine):
+    """返回尚未应用的迁移模块列表"""
+    done = applied_versions(engine)
+    return [m for m in MIGRATIONS if m.VERSION not in done]
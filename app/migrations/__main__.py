@@ -0,0 +1,39 @@
+"""
+迁移命令行入口
+    python -m app.migrations upgrade [--target N]
+    python -m app.migrations status
+"""
+import argparse
+
+from app.migrations import MIGRATIONS, applied_versions, current_version, upgrade
+from app.migrations.backfill import get_progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="数据库迁移工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    up = sub.add_parser("upgrade", help="执行所有未应用的迁移")
+    up.add_argument("--target", type=int, default=None, help="只迁移到指定版本")
+    sub.add_parser("status", help="查看迁移状态")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        executed = upgrade(target=args.target)
+        if executed:
+            print(f"已执行迁移: {executed}，当前版本 {current_version()}")
+        else:
+            print(f"没有待执行的迁移，当前版本 {current_version()}")
+    elif args.command == "status":
+        done = applied_versions()
+        for migration in MIGRATIONS:
+            mark = "已应用" if migration.VERSION in done else "待执行"
+            line = f"{migration.VERSION:04d}_{migration.NAME}: {mark}"
+            progress = get_progress(migration.NAME)
+            if progress:
+                state = "完成" if progress["done"] else f"进行中，last_key={progress['last_key']}"
+                line += f"（回填{state}，累计更新 {progress['updated_rows']} 行）"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+分批回填（online backfill）
+
+按主键区间分批更新：每批只锁定 batch_size 行的主键范围并单独提交，
+不会在整表扫描期间一直持有写锁。每批提交后记录进度到 backfill_progress 表，
+中断后再次执行会从上次的主键位置继续。
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.database import engine as default_engine
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _ensure_progress_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS backfill_progress ("
+            "name VARCHAR(100) PRIMARY KEY, "
+            "last_key INTEGER NOT NULL DEFAULT 0, "
+            "updated_rows INTEGER NOT NULL DEFAULT 0, "
+            "done INTEGER NOT NULL DEFAULT 0, "
+            "updated_at DATETIME)"
+        ))
+
+
+def get_progress(name, engine=default_engine):
+    """返回回填进度 {"last_key", "updated_rows", "done"}，从未执行过返回 None"""
+    _ensure_progress_table(engine)
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT last_key, updated_rows, done FROM backfill_progress WHERE name = :name"),
+            {"name": name}
+        ).first()
+    if row is None:
+        return None
+    return {"last_key": row[0], "updated_rows": row[1], "done": bool(row[2])}
+
+
+def _save_progress(conn, name, last_key, updated_rows, done):
+    params = {"name": name, "last_key": last_key, "updated_rows": updated_rows,
+              "done": 1 if done else 0, "updated_at": datetime.utcnow()}
+    result = conn.execute(text(
+        "UPDATE backfill_progress SET last_key = :last_key, updated_rows = :updated_rows, "
+        "done = :done, updated_at = :updated_at WHERE name = :name"
+    ), params)
+    if result.rowcount == 0:
+        conn.execute(text(
+            "INSERT INTO backfill_progress (name, last_key, updated_rows, done, updated_at) "
+            "VALUES (:name, :last_key, :updated_rows, :done, :updated_at)"
+        ), params)
+
+
+def run_backfill(name, table, set_clause, where_clause, params=None, key="id",
+                 batch_size=DEFAULT_BATCH_SIZE, pause_seconds=0.0, restart=False,
+                 engine=default_engine):
+    """
+    分批执行 UPDATE {table} SET {set_clause} WHERE ({where_clause})
+    name: 回填任务名，用于记录进度
+    key: 整数主键列，按其升序分批
+    pause_seconds: 每批之间的休眠时间，给在线写请求让出写锁
+    restart: 忽略已有进度从头开始
+    返回本次及历史累计更新的行数
+    """
+    params = dict(params or {})
+    _ensure_progress_table(engine)
+
+    progress = None if restart else get_progress(name, engine)
+    if progress and progress["done"]:
+        print(f"回填 {name} 已完成，跳过（累计更新 {progress['updated_rows']} 行）")
+        return progress["updated_rows"]
+
+    last_key = progress["last_key"] if progress else 0
+    updated_rows = progress["updated_rows"] if progress else 0
+
+    # 只处理开始执行时已存在的行，执行期间新写入的行不会被改写
+    with engine.connect() as conn:
+        max_key = conn.execute(text(f"SELECT MAX({key}) FROM {table}")).scalar() or 0
+    if last_key:
+        print(f"回填 {name} 从 {key} > {last_key} 继续，已累计更新 {updated_rows} 行")
+
+    started = time.time()
+    while True:
+        with engine.begin() as conn:
+            # 先确定本批的主键上界，保证 UPDATE 只扫描一个有界区间
+            upper = conn.execute(text(
+                f"SELECT MAX({key}) FROM (SELECT {key} FROM {table} WHERE {key} > :last_key AND {key} <= :max_key "
+                f"ORDER BY {key} LIMIT :batch_size) AS batch"
+            ), {"last_key": last_key, "max_key": max_key, "batch_size": batch_size}).scalar()
+
+            if upper is None:
+                _save_progress(conn, name, last_key, updated_rows, done=True)
+                break
+
+            result = conn.execute(text(
+                f"UPDATE {table} SET {set_clause} "
+                f"WHERE {key} > :last_key AND {key} <= :upper AND ({where_clause})"
+            ), {**params, "last_key": last_key, "upper": upper})
+            updated_rows += max(result.rowcount or 0, 0)
+            last_key = upper
+            _save_progress(conn, name, last_key, updated_rows, done=False)
+
+        percent = min(100.0, last_key / max_key * 100) if max_key else 100.0
+        print(f"回填 {name}: {key} <= {last_key} ({percent:.1f}%)，累计更新 {updated_rows} 行")
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    print(f"回填 {name} 完成，累计更新 {updated_rows} 行，耗时 {time.time() - started:.2f}秒")
+    return updated_rows
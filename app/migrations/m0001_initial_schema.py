@@ -0,0 +1,10 @@
+"""初始表结构：按 ORM 模型创建所有缺失的表"""
+VERSION = 1
+NAME = "initial_schema"
+
+
+def upgrade(engine):
+    from app.database import Base
+    from app.models import user, schedule, team, school  # noqa: F401  注册所有模型
+
+    Base.metadata.create_all(bind=engine)
@@ -0,0 +1,19 @@
+"""为旧版本创建的 schedules 表补充 weeks、course 列（原 add_weeks_column_to_schedule.py）"""
+from sqlalchemy import inspect, text
+
+VERSION = 2
+NAME = "schedule_columns"
+
+COLUMNS = {
+    "weeks": "VARCHAR(100) DEFAULT ''",
+    "course": "VARCHAR(50) DEFAULT ''",
+}
+
+
+def upgrade(engine):
+    existing = {column["name"] for column in inspect(engine).get_columns("schedules")}
+    with engine.begin() as conn:
+        for name, ddl in COLUMNS.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE schedules ADD COLUMN {name} {ddl}"))
+                print(f"已为schedules表添加{name}列")
@@ -0,0 +1,23 @@
+"""
+没有教学周信息的旧课程默认设置为每周都有（1-16周，原 cleanup_old_schedule_data.py）
+save_schedule 用空字符串表示“不限教学周”，因此这是一次性的数据迁移：不随应用启动执行，
+只在部署时通过 python -m app.migrations upgrade 执行一次
+"""
+from app.migrations.backfill import run_backfill
+
+VERSION = 3
+NAME = "backfill_schedule_weeks"
+DATA = True
+
+DEFAULT_WEEKS = ",".join(str(w) for w in range(1, 17))
+
+
+def upgrade(engine):
+    run_backfill(
+        name=NAME,
+        table="schedules",
+        set_clause="weeks = :default_weeks",
+        where_clause="weeks IS NULL OR weeks = ''",
+        params={"default_weeks": DEFAULT_WEEKS},
+        engine=engine,
+    )
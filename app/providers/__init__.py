@@ -0,0 +1,42 @@
+"""
+地图数据提供方
+
+通过 ROUTING_PROVIDER 选择：baidu（默认，调用百度地图 API）或 local（读取本地 POI 文件并按速度模型估算时长）。
+
+用法：
+    from app.providers import get_provider
+    provider = get_provider()
+    ps_json = await provider.search_places((lat, lon), "火锅", 3000)
+"""
+from app.config import ROUTING_PROVIDER
+from app.providers.base import ProviderError, RoutingProvider
+
+_provider = None
+
+
+def create_provider(name):
+    if name == "local":
+        from app.providers.local import LocalProvider
+        return LocalProvider()
+    if name == "baidu":
+        from app.providers.baidu import BaiduProvider
+        return BaiduProvider()
+    raise ValueError(f"未知的 ROUTING_PROVIDER: {name}（可选 baidu / local）")
+
+
+def get_provider():
+    """当前使用的提供方（首次调用时按配置创建）"""
+    global _provider
+    if _provider is None:
+        _provider = create_provider(ROUTING_PROVIDER)
+    return _provider
+
+
+def set_provider(provider):
+    """替换当前提供方（基准测试 / 联调时使用），返回原来的提供方"""
+    global _provider
+    previous, _provider = _provider, provider
+    return previous
+
+
+__all__ = ["ProviderError", "RoutingProvider", "create_provider", "get_provider", "set_provider"]
@@ -0,0 +1,154 @@
+"""
+百度地图提供方
+
+所有请求通过共享连接池 app.core.http_client 发出（已套用限流和熔断）。
+"""
+import asyncio
+
+from app.config import BAIDU_MAPS_API_KEY, BAIDU_ROUTEMATRIX_MAX_ELEMENTS
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.http_client import http_clients
+from app.providers.base import ProviderError, RoutingProvider
+
+# 百度地图API URL配置
+ROUTEMATRIX_DRIVING = "http://api.map.baidu.com/routematrix/v2/driving"
+ROUTEMATRIX_WALKING = "http://api.map.baidu.com/routematrix/v2/walking"
+# 注意：百度地图routematrix/v2 API不支持transit（公共交通）模式
+# 尝试使用routematrix/v2/transit会返回404错误
+ROUTEMATRIX_TRANSIT = "http://api.map.baidu.com/routematrix/v2/transit"  # 此API不存在
+
+# 百度地图方向lite API（支持公共交通）
+DIRECTIONLITE_BASE = "http://api.map.baidu.com/directionlite/v1"
+DIRECTIONLITE_WALKING = f"{DIRECTIONLITE_BASE}/walking"
+DIRECTIONLITE_TRANSIT = f"{DIRECTIONLITE_BASE}/transit"
+
+PLACE_SEARCH = "http://api.map.baidu.com/place/v2/search"
+
+
+class BaiduProvider(RoutingProvider):
+    name = "baidu"
+    max_matrix_elements = BAIDU_ROUTEMATRIX_MAX_ELEMENTS
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key if api_key is not None else BAIDU_MAPS_API_KEY
+
+    def is_configured(self):
+        return bool(self.api_key)
+
+    async def search_places(self, location, query, radius, scope=2):
+        params = {
+            "query": query,
+            "location": f"{location[0]},{location[1]}",
+            "radius": radius,
+            "output": "json",
+            "ak": self.api_key,
+            "scope": scope,
+            "page_size": 20,  # 单页最多 20 条，作为推荐的候选池
+        }
+        try:
+            ps_resp = await http_clients.get("baidu", PLACE_SEARCH, endpoint="place_search", params=params)
+        except Exception as e:
+            raise ProviderError(f"调用百度 POI 搜索网络错误: {e}")
+
+        if ps_resp.status_code != 200:
+            raise ProviderError(f"调用百度 POI 搜索失败: HTTP {ps_resp.status_code}")
+
+        try:
+            return ps_resp.json()
+        except Exception:
+            raise ProviderError("百度 POI 搜索返回非 JSON")
+
+    async def route_matrix(self, mode, origins, destinations):
+        import httpx
+
+        matrix_url = ROUTEMATRIX_DRIVING if mode == "driving" else ROUTEMATRIX_WALKING
+        matrix_params = {
+            "output": "json",
+            "ak": self.api_key,
+            "origins": "|".join(f"{lat},{lon}" for lat, lon in origins),
+            "destinations": "|".join(f"{lat},{lon}" for lat, lon in destinations),
+        }
+        print(f"开始调用百度路网矩阵API（{mode}），{len(origins)} 个起点 × {len(destinations)} 个终点")
+
+        # 被限流时直接重试：共享限流器已经降速并暂停发放令牌，这里不再各自 sleep
+        max_retries = 3
+        retry_delay = 1  # 网络异常时的重试间隔（秒）
+        resp = None
+        for retry in range(max_retries):
+            try:
+                resp = await http_clients.get("baidu", matrix_url, endpoint="routematrix", params=matrix_params)
+                print(f"百度路网矩阵API返回状态码: {resp.status_code}")
+
+                # 检查是否因并发限制导致请求失败
+                if resp.status_code == 429 or (resp.status_code == 200 and resp.json().get('status') in (401, 429)):
+                    print(f"百度路网矩阵API并发限制，第{retry+1}次重试...")
+                    continue
+                break
+            except CircuitOpenError as e:
+                # 熔断中：不再重试，直接走直线距离估算
+                print(f"百度路网矩阵API{e}，使用直线距离估算")
+                return None, ("路网矩阵接口熔断中", "circuit_open")
+            except httpx.RequestError as e:
+                print(f"百度路网矩阵API请求异常（第{retry+1}次）: {str(e)}")
+                await asyncio.sleep(retry_delay)
+                retry_delay *= 2
+            except ValueError as e:
+                # 200 但返回体不是 JSON（代理 / HTML 错误页等）
+                print(f"百度路网矩阵API返回数据JSON解析失败: {str(e)}")
+                return None, ("路网矩阵返回非JSON", "json_parse_error")
+
+        if resp is None:
+            return None, ("路网矩阵请求失败", "network_exception")
+        if resp.status_code != 200:
+            return None, (f"路网矩阵 HTTP {resp.status_code}", "http_error")
+        try:
+            matrix_json = resp.json()
+        except Exception as e:
+            print(f"百度路网矩阵API返回数据JSON解析失败: {str(e)}")
+            return None, ("路网矩阵返回非JSON", "json_parse_error")
+
+        # 百度地图API返回的status字段可能是字符串类型，需要转换为数字
+        try:
+            status_code = int(matrix_json.get("status"))
+        except (ValueError, TypeError):
+            status_code = -1
+        if status_code != 0:
+            error_msg = matrix_json.get('message', '未知错误')
+            print(f"百度路网矩阵API返回错误状态码: {matrix_json.get('status')}, 错误信息: {error_msg}")
+            return None, (f"路网矩阵返回错误: {error_msg}", "api_error")
+
+        # result 为一维列表，按「起点依次对应全部终点」的顺序排列
+        elements = matrix_json.get("result")
+        if not isinstance(elements, list):
+            return None, ("路网矩阵响应格式不符", "format_error")
+        dest_count = len(destinations)
+        matrix = [[None] * dest_count for _ in origins]
+        for k, elem in enumerate(elements[:len(origins) * dest_count]):
+            duration = elem.get("duration") if isinstance(elem, dict) else None
+            if isinstance(duration, dict) and "value" in duration:
+                try:
+                    matrix[k // dest_count][k % dest_count] = float(duration["value"])
+                except (TypeError, ValueError):
+                    continue
+        return matrix, None
+
+    async def direction_seconds(self, mode, origin, destination):
+        url = DIRECTIONLITE_TRANSIT if mode == "transit" else DIRECTIONLITE_WALKING
+        try:
+            resp = await http_clients.get(
+                "baidu", url, endpoint="directionlite",
+                params={
+                    "origin": f"{origin[0]},{origin[1]}",
+                    "destination": f"{destination[0]},{destination[1]}",
+                    "ak": self.api_key,
+                }
+            )
+            if resp.status_code != 200:
+                return None
+            data = resp.json()
+            if data.get("status") != 0 or not data.get("result") or not data["result"].get("routes"):
+                return None
+            return data["result"]["routes"][0].get("duration")
+        except Exception as e:
+            print(f"获取{mode}时间失败 (orig: {origin}, dest: {destination}): {str(e)}")
+            return None
@@ -0,0 +1,43 @@
+"""
+地图数据提供方接口
+
+推荐流程只依赖这三个方法，不直接拼百度的 URL：
+  - search_places：周边 POI 搜索，返回百度 place/v2/search 格式的 JSON
+    （{"status": 0, "results": [{"name", "address", "uid", "location": {"lat", "lng"}}, ...]}）
+  - route_matrix：起点 × 终点的时长矩阵（秒），walking / driving
+  - direction_seconds：单对起终点的时长（秒），walking / transit
+缺少其中任何一个方法的提供方在创建时就会报错（TypeError），而不是在请求中途失败。
+"""
+from abc import ABC, abstractmethod
+
+
+class ProviderError(Exception):
+    """提供方调用失败（网络错误、HTTP 错误、返回格式不符等）"""
+
+
+class RoutingProvider(ABC):
+    """地图数据提供方基类"""
+
+    # 提供方名称，用于区分缓存（不同提供方的时长不能混用）
+    name = "base"
+    # route_matrix 单次请求的起点数 × 终点数上限，None 表示不限制（超过时由调用方分块）
+    max_matrix_elements = None
+
+    def is_configured(self):
+        """是否具备调用条件（例如 API 密钥已配置）"""
+        return True
+
+    @abstractmethod
+    async def search_places(self, location, query, radius, scope=2):
+        """以 location=(lat, lon) 为中心、radius 米内搜索 query，返回百度格式的 JSON；失败抛出 ProviderError"""
+
+    @abstractmethod
+    async def route_matrix(self, mode, origins, destinations):
+        """
+        返回 (时长矩阵, 错误)：时长矩阵按 [起点][终点] 排列，单位秒，取不到的为 None；
+        整体失败时矩阵为 None，错误为 (说明, 错误类型)
+        """
+
+    @abstractmethod
+    async def direction_seconds(self, mode, origin, destination):
+        """单对起终点的时长（秒），失败返回 None"""
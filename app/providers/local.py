@@ -0,0 +1,117 @@
+"""
+本地离线提供方
+
+从文件读取 POI，用直线距离 × 绕行系数 ÷ 速度估算时长，不访问网络。
+用于压测 / 基准测试和无 API 密钥的本地联调，整个推荐流程可以离线全速运行。
+
+POI 文件支持 .json（对象数组）、.jsonl 和 .csv，字段：
+    name, address, lat, lon（或 lng）, uid（可选）, tags（可选，逗号分隔，例如 "火锅,川菜"）
+"""
+import csv
+import json
+import os
+
+from app.config import (
+    LOCAL_POI_FILE,
+    LOCAL_WALKING_KMH,
+    LOCAL_DRIVING_KMH,
+    LOCAL_TRANSIT_KMH,
+    LOCAL_DETOUR_FACTOR,
+    LOCAL_TRANSIT_WAIT_MIN,
+)
+from app.core.utils import haversine_matrix
+from app.providers.base import ProviderError, RoutingProvider
+
+# 不限定菜系的通用查询词：匹配所有 POI
+GENERIC_QUERIES = {"", "餐厅", "美食", "餐饮", "饭店"}
+MAX_RESULTS = 20
+
+
+def load_pois(path):
+    """读取 POI 文件，返回百度 place/v2/search results 格式的列表"""
+    lower = path.lower()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        if lower.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        elif lower.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = json.load(f)
+            if isinstance(rows, dict):
+                rows = rows.get("results") or rows.get("pois") or []
+
+    pois = []
+    for i, row in enumerate(rows):
+        location = row.get("location") or {}
+        lat = row.get("lat", location.get("lat"))
+        lon = row.get("lon", row.get("lng", location.get("lng")))
+        if not row.get("name") or lat is None or lon is None:
+            continue
+        tags = row.get("tags") or ""
+        if isinstance(tags, str):
+            tags = [t.strip() for t in tags.replace("，", ",").split(",") if t.strip()]
+        pois.append({
+            "name": row["name"],
+            "address": row.get("address") or "",
+            "uid": str(row.get("uid") or f"local-{i}"),
+            "location": {"lat": float(lat), "lng": float(lon)},
+            "tags": list(tags),
+        })
+    return pois
+
+
+class LocalProvider(RoutingProvider):
+    name = "local"
+
+    def __init__(self, poi_file=None, speeds_kmh=None, detour_factor=None, transit_wait_min=None):
+        self.poi_file = poi_file or LOCAL_POI_FILE
+        self.speeds_kmh = speeds_kmh or {
+            "walking": LOCAL_WALKING_KMH,
+            "driving": LOCAL_DRIVING_KMH,
+            "transit": LOCAL_TRANSIT_KMH,
+        }
+        self.detour_factor = LOCAL_DETOUR_FACTOR if detour_factor is None else detour_factor
+        self.transit_wait_min = LOCAL_TRANSIT_WAIT_MIN if transit_wait_min is None else transit_wait_min
+        # 创建时（应用启动阶段）一次性读入 POI 文件，请求中不再读文件
+        self._pois = None
+        if os.path.exists(self.poi_file):
+            self._pois = load_pois(self.poi_file)
+            print(f"已加载本地 POI {len(self._pois)} 个: {self.poi_file}")
+
+    def is_configured(self):
+        return self._pois is not None
+
+    @property
+    def pois(self):
+        if self._pois is None:
+            raise ProviderError(f"本地 POI 文件不存在: {self.poi_file}")
+        return self._pois
+
+    def _seconds(self, mode, distance_km):
+        """速度模型：直线距离 × 绕行系数 ÷ 速度，公交另加固定候车时间"""
+        seconds = distance_km * self.detour_factor / self.speeds_kmh[mode] * 3600
+        if mode == "transit":
+            seconds += self.transit_wait_min * 60
+        return seconds
+
+    async def search_places(self, location, query, radius, scope=2):
+        pois = self.pois
+        query = query.strip().lower()
+        if query not in GENERIC_QUERIES:
+            pois = [p for p in pois if query in p["name"].lower() or any(query in t.lower() for t in p["tags"])]
+        if not pois:
+            return {"status": 0, "results": []}
+
+        distances = haversine_matrix([location], [(p["location"]["lat"], p["location"]["lng"]) for p in pois])[0]
+        nearby = sorted(
+            (float(d) * 1000, i) for i, d in enumerate(distances) if d * 1000 <= radius
+        )[:MAX_RESULTS]
+        results = [{**pois[i], "detail_info": {"distance": round(meters)}} for meters, i in nearby]
+        return {"status": 0, "results": results}
+
+    async def route_matrix(self, mode, origins, destinations):
+        distances = haversine_matrix(origins, destinations)
+        return [[self._seconds(mode, float(d)) for d in row] for row in distances], None
+
+    async def direction_seconds(self, mode, origin, destination):
+        return self._seconds(mode, float(haversine_matrix([origin], [destination])[0][0]))
@@ -2,7 +2,6 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import os
-import requests
 from datetime import datetime, timedelta
 try:
     import jwt  # PyJWT库
@@ -1,38 +1,29 @@
 # app/routers/places.py
-import math
-import httpx
 import asyncio
+import json
 from fastapi import APIRouter, HTTPException, FastAPI, Depends
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Tuple, Any
-from app.core.utils import compute_center
-from app.config import BAIDU_MAPS_API_KEY
+from app.core.utils import compute_center, haversine_distance, haversine_matrix, merge_origins
 from app.database import get_db
+from app.models.team import TeamMember
+from app.models.user import User
 
 router = APIRouter()
 
-# 百度地图API URL配置
-ROUTEMATRIX_DRIVING = "http://api.map.baidu.com/routematrix/v2/driving"
-ROUTEMATRIX_WALKING = "http://api.map.baidu.com/routematrix/v2/walking"
-# 注意：百度地图routematrix/v2 API不支持transit（公共交通）模式
-# 尝试使用routematrix/v2/transit会返回404错误
-ROUTEMATRIX_TRANSIT = "http://api.map.baidu.com/routematrix/v2/transit"  # 此API不存在
-
-# 百度地图方向lite API（支持公共交通）
-DIRECTIONLITE_BASE = "http://api.map.baidu.com/directionlite/v1"
-DIRECTIONLITE_WALKING = f"{DIRECTIONLITE_BASE}/walking"
-DIRECTIONLITE_TRANSIT = f"{DIRECTIONLITE_BASE}/transit"
-
-PLACE_SEARCH = "http://api.map.baidu.com/place/v2/search"
-
 class PlaceRequest(BaseModel):
     coords: List[Tuple[float, float]] | None = None  # [[lat, lon], ...] - 已废弃，使用school_ids
     school_ids: List[int] | None = None  # 学校ID列表
+    team_id: int | None = None  # 团队ID：使用团队成员的学校坐标作为起点（同校成员合并为带权重的起点）
     budget: int | None = None
     cuisine: str | None = None
     radius: int | None = 3000  # 搜索半径，默认 3km
     preference_mode: str = "walking"  # walking, transit, driving - 仅用于显示偏好，系统会智能选择最优出行方式
+    deadline_ms: int | None = None  # 时间预算（毫秒）：到时仍未返回的矩阵 / 公交请求取消，改用直线估算
+    center_strategy: str | None = None  # centroid / median / minimax，默认取 CENTER_STRATEGY
+    multi_seed: bool | None = None  # 是否从多个中心点分别搜索并合并候选，默认取 CENTER_MULTI_SEED
+    cuisines: List[str] | None = None  # 多菜系对比（/recommend/multi）：如 ["火锅", "咖啡", "日料"]
 
 class POI(BaseModel):
     name: str
@@ -43,50 +34,363 @@ class POI(BaseModel):
     travel_mode: str | None = None  # 系统选择的出行方式
     url: str | None = None  # 百度地图链接或应用内页面链接
     uid: str | None = None  # POI 的唯一标识
+    is_estimate: bool = False  # 时长为直线距离估算（接口失败或超过截止时间）
     raw: Any | None = None
 
 def haversine_km(a, b):
-    lat1, lon1 = a; lat2, lon2 = b
-    R = 6371
-    phi1 = math.radians(lat1); phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1); dlambda = math.radians(lon2 - lon1)
-    x = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
-    return 2 * R * math.asin(math.sqrt(x))
-
-from fastapi.responses import JSONResponse
-from app.models.school import School
+    """单对坐标的距离（公里）；批量计算请用 haversine_matrix"""
+    return haversine_distance(a[0], a[1], b[0], b[1])
+
+def weighted_average(values, weights):
+    """按起点权重求平均，跳过取不到的值（None）；全部取不到时返回 None"""
+    pairs = [(v, w) for v, w in zip(values, weights) if v is not None]
+    total = sum(w for _, w in pairs)
+    return sum(v * w for v, w in pairs) / total if total else None
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.utils.school_catalog import school_catalog
+from app.core.cache import TTLCache
+from app.core.travel_cache import travel_cache
+from app.core.matrix_planner import fetch_matrix_tiles
+from app.core.singleflight import recommend_flight
+from app.providers import ProviderError, get_provider
+from app.core.utils import geohash_encode, geohash_center
+from app.config import PLACE_CACHE_TTL, PLACE_CACHE_STALE_TTL, PLACE_CACHE_MAX_ENTRIES, PLACE_CACHE_GEOHASH_PRECISION
+from app.config import TRANSIT_MAX_CONCURRENCY, POI_STORE_ENABLED, CENTER_STRATEGY, CENTER_MULTI_SEED
+from app.config import CANDIDATE_POOL_SIZE, CANDIDATE_MATRIX_BUDGET, ORIGIN_MERGE_KM
+from app.utils.poi_store import poi_store
 
 import time
 
+# 多中心点搜索时，相距不超过这个距离（公里）的中心点只搜索一次
+SEED_MIN_GAP_KM = 0.5
+# 返回的推荐数量
+TOP_N = 6
+# 步行时间下界使用的最快步速：6 km/h => 0.1 km/min（估算使用 5 km/h，矩阵时长通常更慢）
+# 下界只用直线距离 ÷ 这个步速，不按已取到的时长收紧：别的候选的绕行比例可能更小，收紧后就不再是下界
+MAX_WALKING_KM_PER_MIN = 0.1
+# 步行时间超过这个阈值（分钟）的POI改用公交时间
+WALKING_TIME_THRESHOLD = 30.0
+# 每个菜系最多对几个步行超过阈值的POI查询公交时间
+TRANSIT_TOP_N = 3
+# 多菜系对比一次最多的菜系数
+MAX_CUISINES = 5
+
+# POI 搜索结果缓存：只缓存百度返回 status == 0 的结果
+place_search_cache = TTLCache(
+    maxsize=PLACE_CACHE_MAX_ENTRIES,
+    ttl=PLACE_CACHE_TTL,
+    stale_ttl=PLACE_CACHE_STALE_TTL,
+    should_cache=lambda ps_json: isinstance(ps_json, dict) and ps_json.get("status") == 0,
+)
+
+
+async def search_places(center, query, radius, scope=2):
+    """
+    调用当前提供方的 POI 搜索并返回解析后的 JSON（百度格式）
+    开启缓存时，中心点量化到 geohash 格子中心，按 (提供方, 格子, 查询词, 半径, scope) 缓存，
+    同一格子内的请求共用一份结果。网络错误、非 200、非 JSON 时抛出 HTTPException(502)
+    """
+    provider = get_provider()
+    query = normalize_query(query)
+    cell, location = search_location(center)
+
+    async def fetch():
+        try:
+            return await provider.search_places(location, query, radius, scope)
+        except ProviderError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+
+    if cell is None:
+        return await fetch()
+    return await place_search_cache.get_or_fetch((provider.name, cell, query, radius, scope), fetch)
+
+
+def normalize_query(query):
+    return " ".join(query.split()).lower()
+
+
+def search_location(center):
+    """实际搜索的中心点：开启缓存时量化到 geohash 格子中心，返回 (格子, 中心点)；未开启时格子为 None"""
+    if PLACE_CACHE_TTL <= 0:
+        return None, center
+    cell = geohash_encode(center[0], center[1], PLACE_CACHE_GEOHASH_PRECISION)
+    return cell, geohash_center(cell)
+
+
+async def search_candidates(center, query, radius):
+    """
+    候选 POI 搜索：本地 POI 库对查询范围已覆盖且未过期时直接从本地索引返回（source=local）；
+    未覆盖的格子不超过 POI_STORE_MAX_CELL_SEARCHES 个时只实时搜索这些格子（source=mixed），
+    否则对整个范围实时搜索一次（source=live）；实时结果都写入本地库
+    """
+    if not POI_STORE_ENABLED:
+        return await search_places(center, query, radius)
+    provider_name = get_provider().name
+    query = normalize_query(query)
+    # 与实时搜索使用同一个（量化后的）中心点，同一格子内的请求命中同样的覆盖范围
+    location = search_location(center)[1]
+    results, uncovered = poi_store.lookup(provider_name, query, location, radius)
+    if not uncovered:
+        return {"status": 0, "results": results, "source": "local"}
+
+    if len(uncovered) > poi_store.max_cell_searches:
+        ps_json = await search_places(center, query, radius)
+        if ps_json.get("status") == 0:
+            await poi_store.ingest(provider_name, query, location, radius, ps_json)
+        return {**ps_json, "source": "live"}
+
+    areas = [poi_store.cell_search_area(cell) for cell in uncovered]
+    print(f"本地 POI 库有 {len(areas)} 个格子未覆盖，只搜索这些格子")
+    cell_jsons = await asyncio.gather(*(search_places(cell_center, query, cell_radius) for cell_center, cell_radius in areas))
+    for (cell_center, cell_radius), ps_json in zip(areas, cell_jsons):
+        if ps_json.get("status") != 0:
+            # 交给调用方按实时搜索的错误处理
+            return ps_json
+        await poi_store.ingest(provider_name, query, search_location(cell_center)[1], cell_radius, ps_json)
+    results, _ = poi_store.lookup(provider_name, query, location, radius)
+    return {"status": 0, "results": results or [], "source": "mixed"}
+
+
+def travel_cache_mode(provider, mode):
+    """出行时长缓存的 mode 键：非百度提供方加前缀，估算值不会混入百度的真实时长"""
+    return mode if provider.name == "baidu" else f"{provider.name}:{mode}"
+
+
+async def fetch_duration_matrix(mode, origins, destinations, timeout=None):
+    """
+    返回 origins × destinations 的时长矩阵（秒，取不到为 None）和错误信息
+    先查出行时长缓存，只对缺失的起终点对请求提供方；缺失终点相同的起点合并为一次矩阵调用，
+    超过提供方单次元素上限时再分块并发请求（见 app.core.matrix_planner）
+    timeout（秒）到时仍未返回的矩阵调用被取消，对应位置保持 None，错误类型为 deadline
+    """
+    provider = get_provider()
+    cache_mode = travel_cache_mode(provider, mode)
+    cached = await travel_cache.aget_many([(o, d) for o in origins for d in destinations], cache_mode)
+    matrix = [[cached.get((o, d)) for d in destinations] for o in origins]
+
+    groups = {}  # 缺失的终点下标 -> 起点下标列表
+    for i, row in enumerate(matrix):
+        missing = tuple(j for j, value in enumerate(row) if value is None)
+        if missing:
+            groups.setdefault(missing, []).append(i)
+    if not groups:
+        print(f"{mode}时长全部命中缓存（{len(origins)}×{len(destinations)}）")
+        return matrix, None
+
+    responses = await asyncio.gather(*(
+        fetch_matrix_tiles(
+            provider.route_matrix, mode, [origins[i] for i in rows], [destinations[j] for j in cols],
+            max_elements=provider.max_matrix_elements, timeout=timeout,
+        )
+        for cols, rows in groups.items()
+    ))
+
+    error = None
+    fetched = {}
+    for (cols, rows), (sub, sub_error) in zip(groups.items(), responses):
+        if sub_error:
+            if sub_error[1] == "deadline":
+                print(f"{mode}路网矩阵超过截止时间，已取消")
+            error = sub_error
+        for a, i in enumerate(rows):
+            for b, j in enumerate(cols):
+                if sub[a][b] is not None:
+                    matrix[i][j] = sub[a][b]
+                    fetched[(origins[i], destinations[j])] = sub[a][b]
+    await travel_cache.aput_many(fetched, cache_mode)
+    print(f"{mode}时长缓存命中 {len(cached)}/{len(origins) * len(destinations)}，请求矩阵 {len(groups)} 次")
+    return matrix, error
+
+
+async def fetch_transit_seconds(orig, dest):
+    """公交单程时长（秒），先查出行时长缓存；失败返回 None"""
+    provider = get_provider()
+    cache_mode = travel_cache_mode(provider, "transit")
+    cached = await travel_cache.aget_many([(orig, dest)], cache_mode)
+    if cached:
+        return cached[(orig, dest)]
+    seconds = await provider.direction_seconds("transit", orig, dest)
+    if seconds is None:
+        return None
+    await travel_cache.aput_many({(orig, dest): seconds}, cache_mode)
+    return seconds
+
+
+def calibrate_detour_factor(matrix, distance_km, speed_km_per_min):
+    """
+    用本次请求已取到的时长校准直线估算：实际时长之和 / 按直线距离估算的时长之和，
+    限制在 [1.0, 2.5]；没有可用时长时为 1.0（即原来的直线估算）
+    """
+    actual = estimated = 0.0
+    for i, row in enumerate(matrix):
+        for j, seconds in enumerate(row):
+            if seconds is not None and distance_km[i][j] > 0:
+                actual += seconds / 60
+                estimated += distance_km[i][j] / speed_km_per_min
+    if estimated <= 0:
+        return 1.0
+    return min(2.5, max(1.0, actual / estimated))
+
+
+def center_seeds(coords, primary, weights=None):
+    """多中心点搜索的种子：主策略的中心点，加上其余策略中与已有种子相距超过 SEED_MIN_GAP_KM 的中心点"""
+    seeds = [primary]
+    for strategy in ("median", "minimax", "centroid"):
+        seed = compute_center(coords, strategy, weights)
+        if all(haversine_km(seed, other) > SEED_MIN_GAP_KM for other in seeds):
+            seeds.append(seed)
+    return seeds
+
+
+async def search_from_seeds(seeds, query, radius, origins, weights=None):
+    """从多个中心点分别搜索，按 uid 合并候选，并按到各起点的平均直线距离排序（近的优先进入路网矩阵）"""
+    responses = await asyncio.gather(*(search_candidates(seed, query, radius) for seed in seeds))
+    succeeded = [r for r in responses if r.get("status") == 0]
+    if not succeeded:
+        return responses[0]
+    merged = {}
+    for ps_json in succeeded:
+        for item in ps_json.get("results") or []:
+            location = item.get("location") or {}
+            if "lat" not in location or "lng" not in location:
+                continue
+            merged.setdefault(item.get("uid") or (item.get("name"), location["lat"], location["lng"]), item)
+    items = list(merged.values())
+    if items:
+        coords = [(float(item["location"]["lat"]), float(item["location"]["lng"])) for item in items]
+        distance_km = haversine_matrix(origins, coords)
+        mean_km = distance_km.mean(axis=0) if weights is None else (distance_km.T @ weights) / sum(weights)
+        items = [items[i] for i in mean_km.argsort(kind="stable")]
+    sources = {ps_json.get("source", "live") for ps_json in succeeded}
+    print(f"{len(seeds)} 个中心点搜索，合并后 {len(items)} 个候选")
+    return {"status": 0, "results": items, "source": sources.pop() if len(sources) == 1 else "mixed"}
+
+
+def recommend_request_key(req: PlaceRequest):
+    """
+    规范化 PlaceRequest 作为合并键：学校 / 坐标顺序无关，菜系去空白并套用默认值
+    （结果只依赖中心点和起点集合，因此顺序不同的相同请求可以共用一次计算）
+    """
+    cuisine = (req.cuisine or "").strip().lower()
+    if not cuisine or cuisine == "??":
+        cuisine = "餐厅"
+    if req.team_id is not None:
+        origins = ("team_id", req.team_id)
+    elif req.school_ids:
+        origins = ("school_ids", tuple(sorted(set(req.school_ids))))
+    else:
+        origins = ("coords", tuple(sorted((round(float(c[0]), 6), round(float(c[1]), 6)) for c in req.coords or [])))
+    return (origins, req.budget, cuisine, int(req.radius or 3000), req.preference_mode or "walking", req.deadline_ms,
+            req.center_strategy or CENTER_STRATEGY, CENTER_MULTI_SEED if req.multi_seed is None else req.multi_seed)
+
+
 @router.post("/recommend")
 async def recommend_places(req: PlaceRequest, db: Session = Depends(get_db)):
+    """同时到达的相同推荐请求（例如队员同时打开分享链接）只计算一次，共享结果"""
+    try:
+        key = recommend_request_key(req)
+    except (TypeError, ValueError, IndexError):
+        # 坐标格式有误时不合并，交给后续校验返回 400
+        return await compute_recommendation(req, db)
+    return await recommend_flight.do(key, lambda: compute_recommendation(req, db))
+
+
+def sse_event(event, data):
+    """Server-Sent Events 格式的一条消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/recommend/stream")
+async def recommend_places_stream(req: PlaceRequest, db: Session = Depends(get_db)):
     """
-    返回按平均出行时长排序的 POI（默认取前6）
-    流程：
-     1) 从学校ID获取坐标，或用coords计算地理中心
-     2) 用百度 place/v2/search 拉取候选 POI（最多 12 个）
-     3) 系统会智能选择最优出行方式：
-        - 步行≤30分钟：使用步行矩阵API
-        - 步行>30分钟：对前3个POI使用公交lite API
-        - 公交失败时：使用驾车时间×1.1估算
-        - 全失败时：使用直线距离兜底
-    注意：当路网矩阵失败时回退为直线距离估算
+    流式推荐（text/event-stream），参数与 /recommend 相同，依次推送：
+      estimate：搜索返回后立即给出直线估算的候选
+      walking：步行矩阵算出的候选（按时长排序）
+      transit：步行超过30分钟的POI，每个POI的公交时间算出后推送一次 {"poi": ...}，前端按 uid 原地更新
+      done：与 /recommend 的 data 相同的最终结果；出错时为 error：{"status_code", "detail"}
+    流式请求不与其他请求合并，各自推送进度
     """
-    start_time = time.time()
-    print(f"开始处理推荐请求，时间: {time.strftime('%H:%M:%S')}")
-    
-    if not BAIDU_MAPS_API_KEY:
-        print(f"百度地图API密钥未配置，处理时间: {time.time() - start_time:.2f}秒")
-        raise HTTPException(status_code=500, detail="BAIDU_MAPS_API_KEY 未配置，请在 .env 中设置。")
+    return stream_recommendation(lambda progress: compute_recommendation(req, db, progress))
+
+
+def stream_recommendation(compute):
+    """把 compute(progress) 的进度和最终结果（result["data"]）包装为 SSE 响应"""
+    queue = asyncio.Queue()
 
-    # 获取坐标：优先使用school_ids，否则使用coords（向后兼容）
+    async def run():
+        try:
+            result = await compute(lambda event, data: queue.put_nowait((event, data)))
+            queue.put_nowait(("done", result["data"]))
+        except HTTPException as e:
+            queue.put_nowait(("error", {"status_code": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            print(f"流式推荐失败: {e}")
+            queue.put_nowait(("error", {"status_code": 500, "detail": str(e)}))
+        finally:
+            queue.put_nowait(None)
+
+    async def events():
+        task = asyncio.create_task(run())
+        try:
+            while (item := await queue.get()) is not None:
+                yield sse_event(*item)
+        finally:
+            # 客户端提前断开时取消计算
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def team_member_coords(db: Session, team_id):
+    """一次查询取出团队所有成员的学校坐标 [(lat, lon)]（User.lat / lon 以字符串存储，可能为空）"""
+    return (
+        db.query(User.lat, User.lon)
+        .join(TeamMember, TeamMember.user_id == User.id)
+        .filter(TeamMember.team_id == team_id)
+        .all()
+    )
+
+
+async def prepare_origins(req: PlaceRequest, db: Session, start_time):
+    """
+    推荐请求的公共准备：检查地图提供方，取起点坐标（team_id / school_ids / coords），
+    合并相同 / 相近的起点并计算中心点。返回 (provider, 起点列表, 起点权重, 中心点)
+    """
+    provider = get_provider()
+    if not provider.is_configured():
+        print(f"地图提供方 {provider.name} 未配置，处理时间: {time.time() - start_time:.2f}秒")
+        if provider.name == "baidu":
+            raise HTTPException(status_code=500, detail="BAIDU_MAPS_API_KEY 未配置，请在 .env 中设置。")
+        raise HTTPException(status_code=500, detail=f"地图提供方 {provider.name} 未配置（检查 LOCAL_POI_FILE）。")
+
+    # 获取坐标：优先使用team_id，其次school_ids，否则使用coords（向后兼容）
     cleaned_coords = []
     
-    if req.school_ids and len(req.school_ids) > 0:
+    if req.team_id is not None:
+        print(f"使用team_id获取成员坐标: {req.team_id}")
+        # 数据库查询放到线程池执行，不阻塞事件循环
+        rows = await asyncio.to_thread(team_member_coords, db, req.team_id)
+        for lat, lon in rows:
+            try:
+                cleaned_coords.append((float(lat), float(lon)))
+            except (TypeError, ValueError):
+                # 未设置学校的成员不参与计算
+                continue
+        if not cleaned_coords:
+            print(f"团队 {req.team_id} 没有可用的成员坐标，处理时间: {time.time() - start_time:.2f}秒")
+            raise HTTPException(status_code=404, detail="团队不存在或成员均未设置学校坐标")
+        print(f"团队 {len(rows)} 名成员中 {len(cleaned_coords)} 名有学校坐标")
+    elif req.school_ids and len(req.school_ids) > 0:
         print(f"使用school_ids获取坐标: {req.school_ids}")
-        # 从数据库获取学校坐标
+        # 从内存学校目录获取坐标（无需查询数据库）
         try:
-            schools = db.query(School).filter(School.id.in_(req.school_ids)).all()
+            schools = school_catalog.get_many(req.school_ids, db)
             if not schools:
                 print(f"未找到指定的学校，处理时间: {time.time() - start_time:.2f}秒")
                 raise HTTPException(status_code=404, detail="未找到指定的学校")
@@ -108,37 +412,330 @@ async def recommend_places(req: PlaceRequest, db: Session = Depends(get_db)):
                 raise HTTPException(status_code=400, detail=f"coords 项目无法转为浮点数：{item}")
     else:
         print(f"未提供school_ids或coords，处理时间: {time.time() - start_time:.2f}秒")
-        raise HTTPException(status_code=400, detail="请提供 school_ids 或 coords")
+        raise HTTPException(status_code=400, detail="请提供 team_id、school_ids 或 coords")
+
+    # 相同 / 相近的起点合并为带权重的起点：路网矩阵只请求去重后的行，平均时长按人数加权
+    member_count = len(cleaned_coords)
+    cleaned_coords, origin_weights = merge_origins(cleaned_coords, ORIGIN_MERGE_KM)
+    if len(cleaned_coords) < member_count:
+        print(f"{member_count} 个起点合并为 {len(cleaned_coords)} 个带权重的起点: {origin_weights}")
 
-    center = compute_center(cleaned_coords)
-    print(f"计算得到地理中心: {center}")
+    strategy = req.center_strategy or CENTER_STRATEGY
+    try:
+        center = compute_center(cleaned_coords, strategy, origin_weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    print(f"计算得到地理中心（{strategy}）: {center}")
     print(f"获取坐标和计算中心耗时: {time.time() - start_time:.2f}秒")
+    return provider, cleaned_coords, origin_weights, center
 
-    # POI 搜索
-    # 修复：确保如果cuisine是无效值（如"??"），也使用默认值"餐厅"
-    query = req.cuisine if (req.cuisine and req.cuisine.strip() != "??") else "餐厅"
-    params = {
-        "query": query,
-        "location": f"{center[0]},{center[1]}",
-        "radius": int(req.radius or 3000),
-        "output": "json",
-        "ak": BAIDU_MAPS_API_KEY,
-        "scope": 2,
-    }
 
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        try:
-            ps_resp = await client.get(PLACE_SEARCH, params=params)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"调用百度 POI 搜索网络错误: {e}")
+def remaining_seconds(deadline):
+    """距截止时间（time.monotonic() 时刻）的剩余秒数；deadline 为 None 表示不限时"""
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
 
-    if ps_resp.status_code != 200:
-        raise HTTPException(status_code=502, detail=f"调用百度 POI 搜索失败: HTTP {ps_resp.status_code}")
 
-    try:
-        ps_json = ps_resp.json()
-    except Exception:
-        raise HTTPException(status_code=502, detail="百度 POI 搜索返回非 JSON")
+def make_poi(item, coord, minutes, mode, is_estimate=False):
+    """由搜索结果构造 POI，附百度地图链接（可在微信中打开）"""
+    name = item.get('name')
+    return POI(
+        name=name, addr=item.get('address', ''), lat=coord[0], lon=coord[1],
+        avg_travel_time_min=minutes, travel_mode=mode,
+        url=f"https://api.map.baidu.com/place/detail?query={name}&region=上海&output=html",
+        uid=item.get('uid', ''), is_estimate=is_estimate, raw=item,
+    )
+
+
+async def evaluate_walking_matrix(origins, weights, dest_coords, avg_distance_km, groups, deadline):
+    """
+    下界剪枝的步行矩阵评估。groups 为若干组终点下标（每个菜系一组），组内已按平均步行时间下界
+    （平均直线距离 ÷ MAX_WALKING_KM_PER_MIN）从小到大排列。每轮每组取下一批 TOP_N 个候选：
+    组内凑满 TOP_N 个结果后，只有下界小于该组当前第 TOP_N 名时长的候选才可能进入前 TOP_N，否则该组停止；
+    各组本轮的批次合并去重后一次请求。每组最多评估 CANDIDATE_MATRIX_BUDGET 个候选。
+    返回 (时长矩阵 [起点][终点], 错误, 已评估的终点下标集合)
+    """
+    matrix = [[None] * len(dest_coords) for _ in origins]
+    evaluated = set()
+    error = None
+    offsets = [0] * len(groups)
+
+    def column_minutes(j):
+        seconds = weighted_average([row[j] for row in matrix], weights)
+        return seconds / 60 if seconds is not None else avg_distance_km[j] / 0.083
+
+    while True:
+        wanted = set()
+        for g, indices in enumerate(groups):
+            start = offsets[g]
+            limit = min(len(indices), CANDIDATE_MATRIX_BUDGET)
+            if start >= limit:
+                continue
+            batch = indices[start:min(start + TOP_N, limit)]
+            known = sorted(column_minutes(j) for j in indices if j in evaluated)
+            if start >= TOP_N and len(known) >= TOP_N:
+                full = len(batch)
+                batch = [j for j in batch if avg_distance_km[j] / MAX_WALKING_KM_PER_MIN < known[TOP_N - 1]]
+                # 下界递增、第 TOP_N 名只会变小：本批有候选被排除时，后面的候选也都会被排除
+                if len(batch) < full:
+                    offsets[g] = limit
+            if offsets[g] == start:
+                offsets[g] = start + TOP_N
+            wanted.update(batch)
+        batch = sorted(wanted - evaluated)
+        if not batch:
+            if not wanted:
+                break
+            continue
+        sub, error = await fetch_duration_matrix(
+            "walking", origins, [dest_coords[j] for j in batch], timeout=remaining_seconds(deadline)
+        )
+        for i, row in enumerate(sub):
+            for b, j in enumerate(batch):
+                matrix[i][j] = row[b]
+        evaluated.update(batch)
+        if error:
+            # 矩阵失败（熔断 / 超时等）时不再请求后面的批次
+            break
+    print(f"步行矩阵评估 {len(evaluated)}/{len(dest_coords)} 个候选，其余被直线下界排除")
+    return matrix, error, evaluated
+
+
+def rank_walking(indices, items, dest_coords, matrix, weights, avg_distance_km, detour_factor, evaluated):
+    """
+    把一组中已评估的候选按平均步行时长（按起点权重加权）排序，返回前 TOP_N 个 [(终点下标, POI)] 和直线估算的个数；
+    某个POI所有起点都取不到时长时，按校准后的直线距离估算（步行 5 km/h => 0.083 km/min）
+    """
+    ranked = []
+    estimated_count = 0
+    for j in indices:
+        if j not in evaluated:
+            continue
+        avg_seconds = weighted_average([row[j] for row in matrix], weights)
+        if avg_seconds is not None:
+            minutes = round(avg_seconds / 60, 1)
+        else:
+            minutes = round(avg_distance_km[j] * detour_factor / 0.083, 1)
+            estimated_count += 1
+        ranked.append((j, make_poi(items[j], dest_coords[j], minutes, "walking", is_estimate=avg_seconds is None)))
+    if ranked:
+        overall_avg_time = sum(poi.avg_travel_time_min for _, poi in ranked) / len(ranked)
+        print(f"walking方式的总体平均出行时间: {overall_avg_time:.1f}分钟")
+    ranked.sort(key=lambda pair: pair[1].avg_travel_time_min)
+    return ranked[:TOP_N], estimated_count
+
+
+async def upgrade_to_transit(origins, weights, dest_coords, avg_distance_km, pois_by_index, indices, detour_factor,
+                             deadline, on_update=None):
+    """
+    步行超过阈值的终点改用公交时间：对所有 (起点, 终点) 组合一次性并发请求公交lite API（限制同时在途数量），
+    总耗时取决于最慢的单次调用；每个终点的各起点都返回后立即更新 pois_by_index[j] 中的全部 POI
+    （同一终点在不同菜系中各有一个 POI 对象），并对每个终点调用一次 on_update(poi)。
+    公交API全部失败的终点合并请求一次驾车矩阵，按 driving×1.1 估算；
+    驾车矩阵也取不到、或超过截止时间仍未取到的，按校准后的直线距离估算（驾车 30 km/h × 1.1，is_estimate）。
+    返回是否超过了截止时间
+    """
+    semaphore = asyncio.Semaphore(TRANSIT_MAX_CONCURRENCY)
+    updated = set()
+
+    def straight_line_minutes(j):
+        # 校准后的直线距离按驾车 30 km/h（0.5 km/min）× 1.1 估算公交时间
+        return round(avg_distance_km[j] * detour_factor / 0.5 * 1.1, 1)
+
+    def apply_transit(j, minutes, is_estimate=False):
+        updated.add(j)
+        for poi in pois_by_index[j]:
+            poi.avg_travel_time_min = minutes
+            poi.travel_mode = "transit"
+            poi.is_estimate = is_estimate
+            print(f"更新POI {poi.name} 的时间为公交时间: {minutes:.1f}分钟，出行方式: 公交{'（直线估算）' if is_estimate else ''}")
+        if on_update is not None:
+            # 各菜系中的同一终点内容相同，只回调一次
+            on_update(pois_by_index[j][0])
+
+    async def fetch_pair(j, origin):
+        async with semaphore:
+            return await fetch_transit_seconds(origin, dest_coords[j])
+
+    async def fetch_poi(j):
+        durations = await asyncio.gather(*(fetch_pair(j, origin) for origin in origins))
+        avg_seconds = weighted_average(durations, weights)
+        if avg_seconds is not None:
+            apply_transit(j, round(avg_seconds / 60, 1))
+
+    tasks = [asyncio.create_task(fetch_poi(j)) for j in indices]
+    _, pending = await asyncio.wait(tasks, timeout=remaining_seconds(deadline))
+    for task in pending:
+        task.cancel()
+    timed_out = {j for j, task in zip(indices, tasks) if task in pending}
+    deadline_hit = bool(timed_out)
+    for task in tasks:
+        if task not in pending and task.exception() is not None:
+            raise task.exception()
+
+    # 公交API全部失败的终点：整个请求最多请求一次驾车矩阵（只含这些终点）
+    failed = [j for j in indices if j not in updated and j not in timed_out]
+    if failed:
+        print(f"{len(failed)} 个POI的公交API失败，使用driving×1.1")
+        driving_matrix, driving_error = await fetch_duration_matrix(
+            "driving", origins, [dest_coords[j] for j in failed], timeout=remaining_seconds(deadline)
+        )
+        if driving_error and driving_error[1] == "deadline":
+            deadline_hit = True
+        for col, j in enumerate(failed):
+            avg_seconds = weighted_average([row[col] for row in driving_matrix], weights)
+            if avg_seconds is not None:
+                # driving时间×1.1作为公交时间
+                apply_transit(j, round(avg_seconds / 60 * 1.1, 1))
+            else:
+                # 驾车矩阵也取不到（熔断 / 接口错误 / 超时）：直接按直线距离估算
+                apply_transit(j, straight_line_minutes(j), is_estimate=True)
+
+    for j in sorted(timed_out):
+        apply_transit(j, straight_line_minutes(j), is_estimate=True)
+    return deadline_hit
+
+
+async def recommend_for_queries(req: PlaceRequest, db: Session, queries, progress=None):
+    """
+    一个或多个菜系的推荐（/recommend 即只有一个菜系的情况）：
+     1) 取起点坐标（团队成员 / 学校ID / coords），合并相同 / 相近的起点，计算中心点（只做一次）
+     2) 各菜系并发搜索候选 POI（每个菜系最多 CANDIDATE_POOL_SIZE 个），多个菜系都搜到的 POI 合并为一个终点
+     3) 步行矩阵按直线下界剪枝评估，各菜系的批次合并请求；各菜系按平均步行时长取前 TOP_N
+     4) 步行超过 WALKING_TIME_THRESHOLD 分钟的POI（每个菜系前 TRANSIT_TOP_N 个，去重）改用公交时间
+    注意：路网矩阵失败时回退为直线距离估算；起终点时长优先读取出行时长缓存；平均时长按起点代表的人数加权
+    progress(event, data)：可选的进度回调，依次收到每个菜系的 estimate（直线估算的候选）、
+    walking（步行矩阵结果），二者都带 cuisine 字段；以及每个POI的 transit
+    返回 {"center", "searches": {菜系: 搜索结果}, "rankings": {菜系: [POI]}, "pool_sizes": {菜系: 候选数},
+          "note", "error_type", "is_fallback"}；所有菜系都搜索失败时 rankings 为空，由调用方处理
+    """
+    def emit(event, data):
+        if progress is not None:
+            progress(event, data)
+
+    start_time = time.time()
+    # 时间预算：从收到请求开始计时，None 表示不限时
+    deadline = time.monotonic() + req.deadline_ms / 1000 if req.deadline_ms else None
+
+    provider, cleaned_coords, origin_weights, center = await prepare_origins(req, db, start_time)
+    radius = int(req.radius or 3000)
+    multi_seed = CENTER_MULTI_SEED if req.multi_seed is None else req.multi_seed
+    seeds = center_seeds(cleaned_coords, center, origin_weights) if multi_seed else [center]
+
+    async def search(query):
+        if len(seeds) > 1:
+            return await search_from_seeds(seeds, query, radius, cleaned_coords, origin_weights)
+        return await search_candidates(center, query, radius)
+
+    searches = dict(zip(queries, await asyncio.gather(*(search(query) for query in queries))))
+    outcome = {"center": center, "searches": searches, "rankings": {}, "pool_sizes": {},
+               "note": None, "error_type": None, "is_fallback": False}
+    succeeded = [query for query in queries if searches[query].get("status") == 0]
+    if not succeeded:
+        return outcome
+
+    # 合并各菜系的候选：同一个 POI 只作为一个终点
+    items = []
+    index_by_key = {}
+    members = {}  # 菜系 -> 候选在 items 中的下标
+    for query in succeeded:
+        members[query] = []
+        seen = set()
+        for item in (searches[query].get("results") or [])[:CANDIDATE_POOL_SIZE]:
+            location = item.get("location") or {}
+            if "lat" not in location or "lng" not in location:
+                continue
+            key = (item.get("uid"), item.get("name"), location["lat"], location["lng"])
+            # 只合并不同菜系之间的相同 POI；同一菜系内的重复结果各自保留，与单菜系时一致
+            if key not in index_by_key or key in seen:
+                index_by_key[key] = len(items)
+                items.append(item)
+            seen.add(key)
+            members[query].append(index_by_key[key])
+        outcome["pool_sizes"][query] = len(members[query])
+        outcome["rankings"][query] = []
+    if len(queries) > 1:
+        total = sum(len(indices) for indices in members.values())
+        print(f"{len(members)} 个菜系共 {total} 个候选，去重后 {len(items)} 个终点")
+    if not items:
+        return outcome
+
+    # 终点坐标（与 items 一一对应），各终点到所有起点的（按人数加权）平均直线距离（公里），一次向量化算出
+    dest_coords = [(float(item['location']['lat']), float(item['location']['lng'])) for item in items]
+    distance_km = haversine_matrix(cleaned_coords, dest_coords)
+    avg_distance_km = ((distance_km.T @ origin_weights) / sum(origin_weights)).tolist()
+    # 各菜系的候选按平均直线距离（即平均步行时间的下界）从近到远排列，步行矩阵按这个顺序分批请求
+    for query in succeeded:
+        members[query].sort(key=lambda j: avg_distance_km[j])
+
+    if progress is not None:
+        # 搜索返回后立即给出直线估算（步行 5 km/h），前端先渲染，后续结果再原地更新
+        for query in succeeded:
+            estimates = [
+                make_poi(items[j], dest_coords[j], round(avg_distance_km[j] / 0.083, 1), "walking", is_estimate=True)
+                for j in members[query][:TOP_N]
+            ]
+            estimates.sort(key=lambda x: x.avg_travel_time_min)
+            emit("estimate", {"center": center, "cuisine": query, "candidates": [c.dict() for c in estimates]})
+
+    matrix, error, evaluated = await evaluate_walking_matrix(
+        cleaned_coords, origin_weights, dest_coords, avg_distance_km, [members[query] for query in succeeded], deadline
+    )
+    # 直线估算的绕行系数：按本次取到的实际步行时长 / 直线步行时长校准
+    detour_factor = calibrate_detour_factor(matrix, distance_km, 0.083)
+    deadline_hit = bool(error and error[1] == "deadline")
+
+    pois_by_index = {}  # 终点下标 -> 各菜系中对应的 POI
+    transit_indices = []  # 需要查公交时间的终点下标
+    estimated_count = 0
+    for query in succeeded:
+        ranked, estimated = rank_walking(members[query], items, dest_coords, matrix, origin_weights,
+                                         avg_distance_km, detour_factor, evaluated)
+        estimated_count += estimated
+        for j, poi in ranked:
+            pois_by_index.setdefault(j, []).append(poi)
+        # 每个菜系只对前 TRANSIT_TOP_N 个步行超过阈值的POI查公交时间，多个菜系共有的POI只查一次
+        slow = [j for j, poi in ranked if poi.avg_travel_time_min > WALKING_TIME_THRESHOLD][:TRANSIT_TOP_N]
+        transit_indices.extend(j for j in slow if j not in transit_indices)
+        outcome["rankings"][query] = [poi for _, poi in ranked]
+        emit("walking", {"center": center, "cuisine": query, "candidates": [poi.dict() for _, poi in ranked],
+                         "is_fallback": bool(error and estimated)})
+
+    if transit_indices:
+        print(f"对前 {len(transit_indices)} 个步行时间超过 {WALKING_TIME_THRESHOLD}分钟的POI使用公交lite API")
+        if await upgrade_to_transit(cleaned_coords, origin_weights, dest_coords, avg_distance_km, pois_by_index,
+                                    transit_indices, detour_factor, deadline,
+                                    on_update=lambda poi: emit("transit", {"poi": poi.dict()})):
+            deadline_hit = True
+
+    for query, candidates in outcome["rankings"].items():
+        if candidates:
+            overall_avg_time = sum(poi.avg_travel_time_min for poi in candidates) / len(candidates)
+            print(f"{query} 最终总体平均出行时间: {overall_avg_time:.1f}分钟")
+
+    if deadline_hit:
+        outcome.update(is_fallback=True, error_type="deadline",
+                       note=f"部分出行时间超过 {req.deadline_ms}ms 截止时间，已用直线距离估算（is_estimate）")
+    elif error and estimated_count:
+        print(f"{error[0]}，{estimated_count}个POI退回直线距离估算")
+        outcome.update(is_fallback=True, error_type=error[1], note=f"{error[0]}，已退回walking直线估算")
+    print(f"推荐处理时间: {time.time() - start_time:.2f}秒")
+    return outcome
+
+
+async def compute_recommendation(req: PlaceRequest, db: Session, progress=None):
+    """
+    返回按平均出行时长排序的 POI（默认取前6），即只有一个菜系的 recommend_for_queries：
+    系统会智能选择最优出行方式——步行≤30分钟用步行矩阵，步行>30分钟的前3个POI用公交lite API，
+    公交失败时用驾车时间×1.1估算，全失败时用直线距离兜底
+    progress(event, data)：可选的进度回调（流式接口使用），依次收到
+    estimate（直线估算的候选）、walking（步行矩阵结果）、transit（每个POI的公交时间）
+    """
+    print(f"开始处理推荐请求，时间: {time.strftime('%H:%M:%S')}")
+    # 修复：确保如果cuisine是无效值（如"??"），也使用默认值"餐厅"
+    query = req.cuisine if (req.cuisine and req.cuisine.strip() != "??") else "餐厅"
+    outcome = await recommend_for_queries(req, db, [query], progress)
+    center = outcome["center"]
+    ps_json = outcome["searches"][query]
 
     if ps_json.get("status") != 0:
         error_msg = ps_json.get('message', '未知错误')
@@ -194,651 +791,103 @@ async def recommend_places(req: PlaceRequest, db: Session = Depends(get_db)):
             detail={"success": False, "message": f"百度POI错误: {error_msg}", "error_code": ps_json.get('status')}
         )
 
-    raw_results = ps_json.get("results", [])[:12]
-    if not raw_results:
+    if not outcome["pool_sizes"][query]:
         return {"success": True, "data": {"center": center, "candidates": []}}
 
-    # 构造 origins / destinations
-    origins = "|".join([f"{lat},{lon}" for lat, lon in cleaned_coords])
-    destinations = "|".join([f"{float(item['location']['lat'])},{float(item['location']['lng'])}" for item in raw_results])
+    # 系统会根据距离自动选择最优出行方式
+    result_data = {
+        "center": center,
+        "candidates": [c.dict() for c in outcome["rankings"][query]],
+        "is_fallback": outcome["is_fallback"],
+        "poi_source": ps_json.get("source", "live"),
+        "note": outcome["note"] or "系统已根据距离自动选择最优出行方式",
+    }
+    if outcome["error_type"]:
+        result_data["api_error_type"] = outcome["error_type"]
+    return {"success": True, "data": result_data}
 
-    # 首先使用步行方式获取时间
-    initial_preference_mode = req.preference_mode or "walking"
-    preference_mode = initial_preference_mode
-    
-    # 步行时间阈值（分钟）
-    WALKING_TIME_THRESHOLD = 30.0
-    
-    # 定义获取最终步行时间的函数（专门用于展示给用户）
-    async def get_final_walking_time(orig, dest):
-        """
-        获取从起点到终点的最终步行时间
-        如果步行时间超过30分钟，自动切换到公交时间
-        返回: (时间秒数, 交通模式, 原始步行时间)
-        """
-        try:
-            orig_str = f"{orig[0]},{orig[1]}"
-            dest_str = f"{dest[0]},{dest[1]}"
-            
-            # 1. 调用百度步行API
-            async with httpx.AsyncClient(timeout=10) as client:
-                walk_resp = await client.get(
-                    DIRECTIONLITE_WALKING,
-                    params={"origin": orig_str, "destination": dest_str, "ak": BAIDU_MAPS_API_KEY}
-                )
-                walk_data = walk_resp.json()
-                walk_sec = walk_data["result"]["routes"][0]["duration"]
-                
-                # 2. 如果步行时间超过30分钟，切换到公交
-                if walk_sec > 30 * 60:
-                    transit_resp = await client.get(
-                        DIRECTIONLITE_TRANSIT,
-                        params={"origin": orig_str, "destination": dest_str, "ak": BAIDU_MAPS_API_KEY}
-                    )
-                    transit_data = transit_resp.json()
-                    transit_sec = transit_data["result"]["routes"][0]["duration"]
-                    return transit_sec, "transit", walk_sec
-                else:
-                    return walk_sec, "walking", walk_sec
-        except Exception as e:
-            print(f"获取最终步行时间失败: {e}")
-            # 回退：使用直线距离估算
-            distance = haversine_km(orig, dest)
-            # 步行速度: 5 km/h => 0.083 km/min
-            walk_sec = distance / 0.083 * 60
-            if walk_sec > 30 * 60:
-                # 公共交通速度: 20 km/h => 0.33 km/min
-                transit_sec = distance / 0.33 * 60
-                return transit_sec, "transit", walk_sec
-            else:
-                return walk_sec, "walking", walk_sec
-    
-    # 定义调用百度地图API的函数
-    async def call_route_matrix_api(mode):
-        """调用百度地图API并返回响应"""
-        if mode in ["driving", "walking"]:
-            # 使用原有的路网矩阵API
-            if mode == "driving":
-                matrix_url = ROUTEMATRIX_DRIVING
-            else:
-                matrix_url = ROUTEMATRIX_WALKING
-            
-            matrix_params = {
-                "output": "json",
-                "ak": BAIDU_MAPS_API_KEY,
-                "origins": origins,
-                "destinations": destinations,
-            }
 
-            # 调用路网矩阵 - 优化并发处理
-            print(f"开始调用百度路网矩阵API（{mode}），origins: {origins}, destinations: {destinations}")
-            
-            # 并发请求限制优化：实现简单的延迟重试机制
-            max_retries = 3
-            retry_delay = 1  # 初始延迟时间（秒）
-            matrix_resp = None
-            
-            for retry in range(max_retries):
-                try:
-                    async with httpx.AsyncClient(timeout=30.0) as client:
-                        matrix_resp = await client.get(matrix_url, params=matrix_params)
-                        print(f"百度路网矩阵API返回状态码: {matrix_resp.status_code}")
-                        
-                        # 检查是否因并发限制导致请求失败
-                        if matrix_resp.status_code == 429 or (matrix_resp.status_code == 200 and 
-                           matrix_resp.json().get('status') == 429):
-                            print(f"百度路网矩阵API并发限制，第{retry+1}次重试...")
-                            await asyncio.sleep(retry_delay)
-                            retry_delay *= 2  # 指数退避
-                            continue
-                        break
-                except httpx.RequestError as e:
-                    print(f"百度路网矩阵API请求异常（第{retry+1}次）: {str(e)}")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-            
-            return matrix_resp
-        elif mode == "transit":
-            # 只对超过步行时间阈值的POI使用transit
-            # 获取超过30分钟的POI索引
-            top_pois = raw_results[:6]  # 最多处理前6个POI
-            
-            # 使用连接池复用client
-            async with httpx.AsyncClient(timeout=10) as client:
-                # 定义获取单个起点到POI的公交时间的函数
-                async def fetch_transit_time(orig, poi):
-                    """获取单个起点到POI的公交时间"""
-                    orig_str = f"{orig[0]},{orig[1]}"
-                    dest_str = f"{poi[0]},{poi[1]}"
-                    
-                    try:
-                        resp = await client.get(
-                            DIRECTIONLITE_TRANSIT,
-                            params={"origin": orig_str, "destination": dest_str, "ak": BAIDU_MAPS_API_KEY}
-                        )
-                        
-                        if resp.status_code != 200:
-                            return None
-                        
-                        data = resp.json()
-                        if data.get("status") != 0 or not data.get("result") or not data["result"].get("routes"):
-                            return None
-                        
-                        # 获取导航时间（秒）
-                        route = data["result"]["routes"][0]
-                        return route.get("duration", 0)
-                    except Exception as e:
-                        print(f"获取公交时间失败 (orig: {orig}, poi: {poi}): {str(e)}")
-                        return None
-                
-                # 定义处理单个POI的函数
-                async def process_poi(poi):
-                    """处理单个POI，获取平均公交时间"""
-                    poi_coord = (float(poi['location']['lat']), float(poi['location']['lng']))
-                    
-                    # 并发获取所有起点到该POI的公交时间
-                    tasks = [fetch_transit_time(orig, poi_coord) for orig in cleaned_coords]
-                    results = await asyncio.gather(*tasks)
-                    
-                    # 过滤掉None结果
-                    valid_results = [r for r in results if r is not None]
-                    
-                    if valid_results:
-                        # 返回平均时间（秒）
-                        return sum(valid_results) / len(valid_results)
-                    else:
-                        # 如果公交API调用失败，使用驾车时间×1.1估算
-                        avg_distance = sum(haversine_km(orig, poi_coord) for orig in cleaned_coords) / len(cleaned_coords)
-                        # 驾车速度估算: 30 km/h => 0.5 km/min
-                        driving_time_est = avg_distance / 0.5 * 60  # 转换为秒
-                        return driving_time_est * 1.1  # 公交比驾车慢10%
-                
-                # 并发处理所有需要公交时间的POI
-                all_results = await asyncio.gather(*(process_poi(poi) for poi in top_pois))
-            
-            # 返回自定义的响应格式，包含所有POI的平均时间
-            return {"poi_durations": all_results}
-    
-    # 定义解析路网矩阵响应的函数
-    def parse_matrix_response(resp, mode, raw_results, cleaned_coords):
-        """解析路网矩阵响应并返回平均时长"""
-        # 步行时间阈值（分钟）
-        WALKING_TIME_THRESHOLD = 30.0
-        print(f"parse_matrix_response函数内的WALKING_TIME_THRESHOLD: {WALKING_TIME_THRESHOLD}分钟")
-        
-        # 1. 首先处理步行模式，确保使用ROUTEMATRIX_WALKING
-        if mode == "walking" and not (isinstance(resp, dict) and "poi_durations" in resp):
-            # 这是步行路网矩阵API的响应
-            if resp is None or resp.status_code != 200:
-                print("步行路网矩阵API调用失败，使用距离兜底")
-                candidates = []
-                for item in raw_results[:6]:
-                    name = item.get('name')
-                    addr = item.get('address', '')
-                    lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                    uid = item.get('uid', '')
-                    baidu_map_url = f"https://api.map.baidu.com/place/detail?query={name}&region=上海&output=html"
-                    
-                    # 使用距离估算步行时间
-                    avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                    avg_travel_time_min = round(avg_km / 0.083, 1)  # 步行5km/h
-                    
-                    candidates.append(POI(name=name, addr=addr, lat=lat, lon=lon, avg_travel_time_min=avg_travel_time_min, url=baidu_map_url, uid=uid, raw=item))
-                
-                # 计算总体平均时间
-                avg_travel_times = [c.avg_travel_time_min for c in candidates if c.avg_travel_time_min is not None]
-                overall_avg_time = sum(avg_travel_times) / len(avg_travel_times) if avg_travel_times else None
-                candidates.sort(key=lambda x: (x.avg_travel_time_min is None, x.avg_travel_time_min))
-                return candidates, "步行路网矩阵API调用失败", "network_exception", True, overall_avg_time
-            
-            try:
-                matrix_json = resp.json()
-            except Exception as e:
-                print(f"步行路网矩阵JSON解析失败: {str(e)}")
-                candidates = []
-                for item in raw_results[:6]:
-                    name = item.get('name')
-                    addr = item.get('address', '')
-                    lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                    uid = item.get('uid', '')
-                    baidu_map_url = f"https://api.map.baidu.com/place/detail?query={name}&region=上海&output=html"
-                    
-                    # 使用距离估算步行时间
-                    avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                    avg_travel_time_min = round(avg_km / 0.083, 1)  # 步行5km/h
-                    
-                    candidates.append(POI(name=name, addr=addr, lat=lat, lon=lon, avg_travel_time_min=avg_travel_time_min, url=baidu_map_url, uid=uid, raw=item))
-                
-                # 计算总体平均时间
-                avg_travel_times = [c.avg_travel_time_min for c in candidates if c.avg_travel_time_min is not None]
-                overall_avg_time = sum(avg_travel_times) / len(avg_travel_times) if avg_travel_times else None
-                candidates.sort(key=lambda x: (x.avg_travel_time_min is None, x.avg_travel_time_min))
-                return candidates, "步行路网矩阵JSON解析失败", "json_parse_error", True, overall_avg_time
-            
-            # 解析步行路网矩阵响应
-            if matrix_json.get('status') != 0 or not matrix_json.get('result'):
-                print("步行路网矩阵API返回失败状态")
-                candidates = []
-                for item in raw_results[:6]:
-                    name = item.get('name')
-                    addr = item.get('address', '')
-                    lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                    uid = item.get('uid', '')
-                    baidu_map_url = f"https://api.map.baidu.com/place/detail?query={name}&region=上海&output=html"
-                    
-                    # 使用距离估算步行时间
-                    avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                    avg_travel_time_min = round(avg_km / 0.083, 1)  # 步行5km/h
-                    
-                    candidates.append(POI(name=name, addr=addr, lat=lat, lon=lon, avg_travel_time_min=avg_travel_time_min, url=baidu_map_url, uid=uid, raw=item))
-                
-                # 计算总体平均时间
-                avg_travel_times = [c.avg_travel_time_min for c in candidates if c.avg_travel_time_min is not None]
-                overall_avg_time = sum(avg_travel_times) / len(avg_travel_times) if avg_travel_times else None
-                candidates.sort(key=lambda x: (x.avg_travel_time_min is None, x.avg_travel_time_min))
-                return candidates, "步行路网矩阵API返回失败状态", "api_error", True, overall_avg_time
-            
-            # 解析步行时间
-            candidates = []
-            avg_travel_times = []
-            result = matrix_json.get('result', {})
-            
-            # 处理百度地图API返回的result可能是列表的情况
-            if isinstance(result, list):
-                # 如果result是列表，取第一个元素
-                result = result[0] if result else {}
-            
-            elements = result.get('elements', [])
-            
-            for idx, item in enumerate(raw_results[:6]):
-                name = item.get('name')
-                addr = item.get('address', '')
-                lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                uid = item.get('uid', '')
-                baidu_map_url = f"https://api.map.baidu.com/place/detail?query={name}&region=上海&output=html"
-                
-                # 计算平均步行时间
-                total_duration = 0
-                valid_count = 0
-                
-                for origin_idx in range(len(cleaned_coords)):
-                    elem_idx = idx * len(cleaned_coords) + origin_idx
-                    if elem_idx < len(elements):
-                        element = elements[elem_idx]
-                        if element.get('status') == 0 and 'duration' in element:
-                            total_duration += element['duration']['value']
-                            valid_count += 1
-                
-                if valid_count > 0:
-                    avg_travel_time_min = round(total_duration / valid_count / 60, 1)
-                else:
-                    # 使用距离估算
-                    avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                    avg_travel_time_min = round(avg_km / 0.083, 1)  # 步行5km/h
-                
-                candidates.append(POI(name=name, addr=addr, lat=lat, lon=lon, avg_travel_time_min=avg_travel_time_min, url=baidu_map_url, uid=uid, raw=item))
-                avg_travel_times.append(avg_travel_time_min)
-            
-            # 计算总体平均时间
-            overall_avg_time = sum(avg_travel_times) / len(avg_travel_times) if avg_travel_times else None
-            print(f"{mode}方式的总体平均出行时间: {overall_avg_time:.1f}分钟")
-            
-            # 按照平均时长排序
-            candidates.sort(key=lambda x: (x.avg_travel_time_min is None, x.avg_travel_time_min))
-            return candidates, None, None, False, overall_avg_time
-        
-        # 2. 处理公交模式的自定义响应
-        if mode == "transit" and isinstance(resp, dict) and "poi_durations" in resp:
-            candidates = []
-            avg_travel_times = []
-            # 只处理与poi_durations长度相同的POI数量
-            processed_count = len(resp["poi_durations"])
-            for idx, item in enumerate(raw_results[:processed_count]):
-                name = item.get('name')
-                addr = item.get('address', '')
-                lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                uid = item.get('uid', '')
-                # 构造百度地图URL（可在微信中打开）
-                baidu_map_url = f"https://api.map.baidu.com/place/detail?query={name}&region=上海&output=html"
-
-                # 计算平均时长（分钟）
-                avg_travel_time_min = round(resp["poi_durations"][idx] / 60, 1)
-                candidates.append(POI(name=name, addr=addr, lat=lat, lon=lon, avg_travel_time_min=avg_travel_time_min, url=baidu_map_url, uid=uid, raw=item))
-                avg_travel_times.append(avg_travel_time_min)
-
-            # 计算总体平均时间
-            overall_avg_time = None
-            if avg_travel_times:
-                overall_avg_time = sum(avg_travel_times) / len(avg_travel_times)
-                print(f"{mode}方式的总体平均出行时间: {overall_avg_time:.1f}分钟")
-
-            # 按照平均时长排序
-            candidates.sort(key=lambda x: (x.avg_travel_time_min is None, x.avg_travel_time_min))
-            return candidates, None, None, False, overall_avg_time
-            
-        if resp is None:
-            # 所有重试都失败，回退到直线距离估算
-            print("所有百度路网矩阵API请求尝试均失败，回退到直线距离估算")
-            candidates = []
-            for item in raw_results:
-                lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                # 估速：步行 5 km/h => 0.083 km/min，公共交通 20 km/h => 0.33 km/min
-                if mode == "walking":
-                    avg_min = avg_km / 0.083
-                elif mode == "transit":
-                    avg_min = avg_km / 0.33
-                else:
-                    avg_min = avg_km / 0.5  # 驾车
-                candidates.append(POI(name=item.get('name'), addr=item.get('address',''), lat=lat, lon=lon, avg_travel_time_min=round(avg_min,1), raw=item))
-            candidates.sort(key=lambda x: x.avg_travel_time_min)
-            return candidates, f"路网矩阵请求失败，退回直线估算", "network_exception", True, None
-
-        if resp.status_code != 200:
-            # 记录HTTP错误状态码
-            print(f"百度路网矩阵API返回HTTP错误状态码: {resp.status_code}")
-            # 回退为直线估算
-            candidates = []
-            for item in raw_results:
-                lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                # 根据不同交通模式使用不同的估算速度
-                if mode == "walking":
-                    avg_min = avg_km / 0.083  # 步行: 5 km/h => 0.083 km/min
-                elif mode == "transit":
-                    avg_min = avg_km / 0.33  # 公共交通: 20 km/h => 0.33 km/min
-                else:
-                    avg_min = avg_km / 0.5  # 驾车: 30 km/h => 0.5 km/min
-                candidates.append(POI(name=item.get('name'), addr=item.get('address',''), lat=lat, lon=lon, avg_travel_time_min=round(avg_min,1), raw=item))
-            candidates.sort(key=lambda x: (x.avg_travel_time_min is None, x.avg_travel_time_min))
-            return candidates, f"路网矩阵 HTTP {resp.status_code}, 已退回{mode}直线估算", "http_error", True, None
+def multi_cuisine_queries(cuisines):
+    """多菜系请求的查询词：去空白、去掉无效值（"??"）并按出现顺序去重"""
+    queries = []
+    for cuisine in cuisines or []:
+        query = " ".join(str(cuisine).split())
+        if query and query != "??" and normalize_query(query) not in {normalize_query(q) for q in queries}:
+            queries.append(query)
+    return queries
 
-        try:
-            matrix_json = resp.json()
-            print(f"百度路网矩阵API返回JSON数据: {matrix_json}")
-            # 输出更详细的响应结构
-            print(f"响应结构: {list(matrix_json.keys())}")
-            print(f"status字段值: {matrix_json.get('status')}, 类型: {type(matrix_json.get('status'))}")
-            print(f"result字段值: {matrix_json.get('result')}, 类型: {type(matrix_json.get('result'))}")
-        except Exception as e:
-            # 记录JSON解析错误
-            print(f"百度路网矩阵API返回数据JSON解析失败: {str(e)}")
-            candidates = []
-            for item in raw_results:
-                lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                # 根据不同交通模式使用不同的估算速度
-                if mode == "walking":
-                    avg_min = avg_km / 0.083  # 步行: 5 km/h => 0.083 km/min
-                elif mode == "transit":
-                    avg_min = avg_km / 0.33  # 公共交通: 20 km/h => 0.33 km/min
-                else:
-                    avg_min = avg_km / 0.5  # 驾车: 30 km/h => 0.5 km/min
-                candidates.append(POI(name=item.get('name'), addr=item.get('address',''), lat=lat, lon=lon, avg_travel_time_min=round(avg_min,1), raw=item))
-            candidates.sort(key=lambda x: (x.avg_travel_time_min is None, x.avg_travel_time_min))
-            return candidates, f"路网矩阵返回非JSON，已退回{mode}直线估算", "json_parse_error", True, None
-
-        # 百度地图API返回的status字段是字符串类型，需要转换为数字
-        status = matrix_json.get("status")
-        try:
-            status_code = int(status)
-            print(f"转换后status_code: {status_code}, 类型: {type(status_code)}")
-        except (ValueError, TypeError) as e:
-            status_code = -1
-            print(f"status字段转换失败: {str(e)}, status值: {status}, 类型: {type(status)}")
-        
-        if status_code != 0:
-            # 记录API错误信息
-            error_msg = matrix_json.get('message', '未知错误')
-            print(f"百度路网矩阵API返回错误状态码: {status}, 错误信息: {error_msg}")
-            candidates = []
-            for item in raw_results:
-                lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                # 根据不同交通模式使用不同的估算速度
-                if mode == "walking":
-                    avg_min = avg_km / 0.083  # 步行: 5 km/h => 0.083 km/min
-                elif mode == "transit":
-                    avg_min = avg_km / 0.33  # 公共交通: 20 km/h => 0.33 km/min
-                else:
-                    avg_min = avg_km / 0.5  # 驾车: 30 km/h => 0.5 km/min
-                candidates.append(POI(name=item.get('name'), addr=item.get('address',''), lat=lat, lon=lon, avg_travel_time_min=round(avg_min,1), raw=item))
-            candidates.sort(key=lambda x: (x.avg_travel_time_min is None, x.avg_travel_time_min))
-            return candidates, f"路网矩阵返回错误: {error_msg}, 已退回{mode}直线估算", "api_error", True, None
-
-        # 解析 matrix elements（origin 列表，每个 origin 包含 destination 列表）
-        try:
-            # 百度地图API返回的result是一个列表，每个元素对应一个起点
-            elements = matrix_json.get('result', [])
-            print(f"成功获取result字段，elements数量: {len(elements)}")
-            print(f"elements内容: {elements}")
-        except Exception as e:
-            # 记录解析错误
-            print(f"百度路网矩阵API返回数据格式解析失败: {str(e)}, 响应结构: {list(matrix_json.keys())}")
-            candidates = []
-            for item in raw_results:
-                lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-                avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                avg_min = avg_km / 0.5
-                candidates.append(POI(name=item.get('name'), addr=item.get('address',''), lat=lat, lon=lon, avg_travel_time_min=round(avg_min,1), raw=item))
-            candidates.sort(key=lambda x: x.avg_travel_time_min)
-            return candidates, "路网矩阵响应格式不符，已退回直线估算", "format_error", True, None
-
-        # 累加 duration（秒）并统计有效条数
-        dest_count = len(raw_results)
-        dest_durations = [0.0] * dest_count
-        dest_valid_counts = [0] * dest_count
-
-        # 检查elements的结构
-        print(f"elements类型: {type(elements)}")
-        if not isinstance(elements, list):
-            print(f"elements不是列表类型，尝试直接作为结果处理")
-            elements = [elements]
-
-        for i, origin_elem in enumerate(elements):
-            print(f"第{i}个origin_elem类型: {type(origin_elem)}, 内容: {origin_elem}")
-            if not isinstance(origin_elem, list):
-                # 如果不是列表，直接作为一个结果处理
-                origin_elem = [origin_elem]
-            
-            for j, elem in enumerate(origin_elem):
-                print(f"第{i}个origin的第{j}个elem类型: {type(elem)}, 内容: {elem}")
-                if not isinstance(elem, dict):
-                    continue
-                
-                # 检查duration字段
-                duration = elem.get("duration")
-                print(f"duration字段值: {duration}, 类型: {type(duration)}")
-                
-                if isinstance(duration, dict) and 'value' in duration:
-                    try:
-                        duration_seconds = float(duration['value'])
-                        print(f"解析到有效时长: {duration_seconds}秒")
-                        if j < dest_count:
-                            dest_durations[j] += duration_seconds
-                            dest_valid_counts[j] += 1
-                            print(f"更新目的地{j}的总时长为{dest_durations[j]}秒，有效次数为{dest_valid_counts[j]}")
-                    except Exception as e:
-                        print(f"解析时长失败: {str(e)}")
-                        continue
-
-        candidates = []
-        avg_travel_times = []
-        for idx, item in enumerate(raw_results):
-            name = item.get('name')
-            addr = item.get('address', '')
-            lat = float(item['location']['lat']); lon = float(item['location']['lng'])
-            uid = item.get('uid', '')
-            # 构造百度地图URL（可在微信中打开）
-            baidu_map_url = f"https://api.map.baidu.com/place/detail?query={name}&region=上海&output=html"
-
-            # 计算平均时长（分钟），避免除零错误
-            # 注意：dest_durations是总时长，需要除以起点数量得到平均值
-            if dest_valid_counts[idx] > 0:
-                avg_travel_time_min = round(dest_durations[idx] / dest_valid_counts[idx] / 60, 1)
-                print(f"POI {name} 的原始平均步行时间: {avg_travel_time_min:.1f}分钟")
-                
-                # 如果当前是步行模式，且某个POI的步行时间超过30分钟，自动切换为公交时间
-                if mode == "walking" and avg_travel_time_min > WALKING_TIME_THRESHOLD:
-                    print(f"POI {name} 的步行时间 {avg_travel_time_min:.1f}分钟超过阈值 {WALKING_TIME_THRESHOLD}分钟，自动切换为公共交通时间")
-                    # 使用直线距离估算公共交通时间
-                    avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                    # 公共交通平均速度约20km/h（含换乘时间）
-                    avg_travel_time_min = round(avg_km / 20.0 * 60, 1)
-                    travel_mode = "transit"
-                    print(f"POI {name} 的公共交通时间（估算）: {avg_travel_time_min:.1f}分钟")
-                else:
-                    travel_mode = "walking"
-                    print(f"POI {name} 的最终交通时间: {avg_travel_time_min:.1f}分钟")
-            else:
-                # 如果没有有效时长数据，使用直线距离估算
-                avg_km = sum(haversine_km(c, (lat, lon)) for c in cleaned_coords) / len(cleaned_coords)
-                # 根据交通模式选择不同的速度估算时间
-                if mode == "walking":
-                    # 步行速度约5km/h
-                    walk_time_min = round(avg_km / 5.0 * 60, 1)
-                    # 如果步行时间超过30分钟，自动切换为公交时间
-                    if walk_time_min > WALKING_TIME_THRESHOLD:
-                        print(f"POI {name} 的步行时间（估算）{walk_time_min:.1f}分钟超过阈值 {WALKING_TIME_THRESHOLD}分钟，自动切换为公共交通时间")
-                        # 公共交通平均速度约20km/h（含换乘时间）
-                        avg_travel_time_min = round(avg_km / 20.0 * 60, 1)
-                        travel_mode = "transit"
-                    else:
-                        avg_travel_time_min = walk_time_min
-                        travel_mode = "walking"
-                elif mode == "transit":
-                    # 公共交通平均速度约20km/h（含换乘时间）
-                    avg_travel_time_min = round(avg_km / 20.0 * 60, 1)
-                    travel_mode = "transit"
-                else:
-                    # 其他模式默认使用步行速度
-                    avg_travel_time_min = round(avg_km / 5.0 * 60, 1)
-                    travel_mode = "walking"
-            
-            candidates.append(POI(name=name, addr=addr, lat=lat, lon=lon, avg_travel_time_min=avg_travel_time_min, travel_mode=travel_mode, url=baidu_map_url, uid=uid, raw=item))
-            avg_travel_times.append(avg_travel_time_min)
-
-        # 计算总体平均时间
-        overall_avg_time = None
-        if avg_travel_times:
-            overall_avg_time = sum(avg_travel_times) / len(avg_travel_times)
-            print(f"{mode}方式的总体平均出行时间: {overall_avg_time:.1f}分钟")
-
-        # 按照平均时长排序，将None值放在列表末尾
-        candidates.sort(key=lambda x: (x.avg_travel_time_min is None, x.avg_travel_time_min))
-        
-        return candidates, None, None, False, overall_avg_time
-    
-    # 实现统一策略：步行≤30分钟用ROUTEMATRIX_WALKING，步行>30分钟用TRANSIT(lite，仅前3个POI)
-    
-    # 步骤1：先使用步行矩阵API获取所有POI的真实步行时间
-    matrix_resp = await call_route_matrix_api("walking")
-    candidates, note, error_type, is_fallback, _ = parse_matrix_response(matrix_resp, "walking", raw_results, cleaned_coords)
-    
-    # 步骤2：检查每个POI，如果步行时间>30分钟，则对前3个POI使用公交lite API
-    # 收集需要使用公交计算的POI索引
-    transit_needed_indices = []
-    for idx, poi in enumerate(candidates):
-        if poi.avg_travel_time_min and poi.avg_travel_time_min > WALKING_TIME_THRESHOLD:
-            transit_needed_indices.append(idx)
-    
-    # 只对前3个需要公交的POI进行公交计算
-    transit_needed_indices = transit_needed_indices[:3]
-    
-    if transit_needed_indices:
-        print(f"对前 {len(transit_needed_indices)} 个步行时间超过 {WALKING_TIME_THRESHOLD}分钟的POI使用公交lite API")
-        
-        # 获取需要公交计算的POI详情
-        transit_pois = [raw_results[idx] for idx in transit_needed_indices]
-        
-        # 步骤3：对这些POI使用公交lite API获取真实公交时间
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            # 并发获取所有需要公交计算的POI的时间
-            async def fetch_transit_time(poi_idx, poi):
-                try:
-                    # 获取POI坐标
-                    poi_lat = float(poi['location']['lat'])
-                    poi_lon = float(poi['location']['lng'])
-                    poi_coord = f"{poi_lon},{poi_lat}"
-                    
-                    # 对每个起点计算公交时间
-                    total_duration = 0
-                    valid_count = 0
-                    
-                    for origin in cleaned_coords:
-                        origin_coord = f"{origin[1]},{origin[0]}"
-                        
-                        # 调用公交lite API，设置超时时间
-                        try:
-                            resp = await client.get(DIRECTIONLITE_TRANSIT, params={
-                                "origin": origin_coord,
-                                "destination": poi_coord,
-                                "ak": BAIDU_MAPS_API_KEY
-                            }, timeout=10.0)
-                          
-                            if resp.status_code == 200:
-                                json_data = resp.json()
-                                if json_data.get('status') == 0 and json_data.get('result'):
-                                    # 获取公交时间（秒）
-                                    transit_duration = json_data['result'].get('duration', 0)
-                                    total_duration += transit_duration
-                                    valid_count += 1
-                        except Exception as e:
-                            print(f"计算起点到POI的公交时间失败: {str(e)}")
-                            continue
-                    
-                    # 计算平均公交时间
-                    if valid_count > 0:
-                        avg_transit_time_min = round(total_duration / valid_count / 60, 1)
-                        return poi_idx, avg_transit_time_min
-                    else:
-                        # 公交API失败，尝试使用driving×1.1
-                        print(f"POI {poi['name']} 的公交API失败，尝试使用driving×1.1")
-                        
-                        # 调用driving矩阵API
-                        driving_resp = await call_route_matrix_api("driving")
-                        driving_candidates, _, _, _, _ = parse_matrix_response(driving_resp, "driving", raw_results, cleaned_coords)
-                        
-                        if driving_candidates[poi_idx].avg_travel_time_min:
-                            # driving时间×1.1作为公交时间
-                            return poi_idx, round(driving_candidates[poi_idx].avg_travel_time_min * 1.1, 1)
-                        else:
-                            return poi_idx, None
-                except Exception as e:
-                    print(f"处理POI {poi.get('name', '')} 公交时间失败: {str(e)}")
-                    return poi_idx, None
-            
-            # 并发执行所有公交时间请求
-            results = await asyncio.gather(*[fetch_transit_time(idx, poi) for idx, poi in zip(transit_needed_indices, transit_pois)])
-            
-            # 更新POI的平均时间和出行方式
-            for poi_idx, transit_time in results:
-                if transit_time:
-                    candidates[poi_idx].avg_travel_time_min = transit_time
-                    candidates[poi_idx].travel_mode = "transit"
-                    print(f"更新POI {candidates[poi_idx].name} 的时间为公交时间: {transit_time:.1f}分钟，出行方式: 公交")
-    
-    # 重新计算总体平均时间
-    avg_travel_times = [poi.avg_travel_time_min for poi in candidates if poi.avg_travel_time_min]
-    overall_avg_time = None
-    if avg_travel_times:
-        overall_avg_time = sum(avg_travel_times) / len(avg_travel_times)
-        print(f"最终总体平均出行时间: {overall_avg_time:.1f}分钟")
-    
-    # 系统会根据距离自动选择最优出行方式
-    note = "系统已根据距离自动选择最优出行方式" if not note else note
-    
-    # 移除单独获取展示用时间的逻辑，直接使用已计算的平均时间
-    # 限制返回的POI数量为6个以提高性能
-    candidates = candidates[:6]
-    
-    # 构造返回结果
-    result_data = {"center": center, "candidates": [c.dict() for c in candidates[:6]]}
-    if note:
-        result_data["note"] = note
-    if error_type:
-        result_data["api_error_type"] = error_type
-    
-    return {"success": True, "data": result_data}
 
+def checked_cuisine_queries(req: PlaceRequest):
+    """多菜系请求的查询词，数量不合法时返回 400"""
+    queries = multi_cuisine_queries(req.cuisines)
+    if not queries:
+        raise HTTPException(status_code=400, detail="请提供 cuisines（至少一个菜系）")
+    if len(queries) > MAX_CUISINES:
+        raise HTTPException(status_code=400, detail=f"cuisines 最多 {MAX_CUISINES} 个")
+    return queries
+
+
+@router.post("/recommend/multi")
+async def recommend_places_multi(req: PlaceRequest, db: Session = Depends(get_db)):
+    """
+    多菜系对比：cuisines 中每个菜系各返回一组推荐，其余参数与 /recommend 相同
+    同时到达的相同请求只计算一次
+    """
+    queries = checked_cuisine_queries(req)
+    try:
+        key = ("multi", tuple(normalize_query(q) for q in queries), recommend_request_key(req))
+    except (TypeError, ValueError, IndexError):
+        return await compute_multi_recommendation(req, db, queries)
+    return await recommend_flight.do(key, lambda: compute_multi_recommendation(req, db, queries))
+
+
+@router.post("/recommend/multi/stream")
+async def recommend_places_multi_stream(req: PlaceRequest, db: Session = Depends(get_db)):
+    """
+    多菜系流式推荐（text/event-stream），参数与 /recommend/multi 相同，事件与 /recommend/stream 相同：
+    estimate / walking 每个菜系各推送一次（带 cuisine 字段），transit 每个POI推送一次（多个菜系共有的POI只推送一次，
+    前端按 uid 更新所有菜系中的该POI），done 为与 /recommend/multi 的 data 相同的最终结果
+    """
+    async def compute(progress):
+        return await compute_multi_recommendation(req, db, checked_cuisine_queries(req), progress)
+
+    return stream_recommendation(compute)
+
+
+async def compute_multi_recommendation(req: PlaceRequest, db: Session, queries, progress=None):
+    """
+    多菜系推荐：起点和中心点只计算一次，各菜系并发搜索，重复的 POI 合并后共用步行矩阵和公交查询，
+    各菜系的排序与单独调用 /recommend 相同（同一套 recommend_for_queries）
+    progress(event, data)：可选的进度回调（流式接口使用），见 recommend_for_queries
+    返回 {"center", "results": {菜系: {"candidates", "poi_source"}}, "is_fallback", "note", ...}
+    """
+    print(f"开始处理多菜系推荐请求 {queries}，时间: {time.strftime('%H:%M:%S')}")
+    outcome = await recommend_for_queries(req, db, queries, progress)
+    searches = outcome["searches"]
+    if not outcome["rankings"]:
+        ps_json = searches[queries[0]]
+        print(f"多菜系搜索全部失败: {ps_json}")
+        raise HTTPException(
+            status_code=502,
+            detail={"success": False, "message": f"百度POI错误: {ps_json.get('message', '未知错误')}",
+                    "error_code": ps_json.get('status')}
+        )
+
+    results = {}
+    for query in queries:
+        ps_json = searches[query]
+        if query in outcome["rankings"]:
+            results[query] = {"candidates": [c.dict() for c in outcome["rankings"][query]],
+                              "poi_source": ps_json.get("source", "live")}
+        else:
+            results[query] = {"candidates": [], "error": ps_json.get("message", "未知错误"),
+                              "error_code": ps_json.get("status")}
+    result_data = {
+        "center": outcome["center"],
+        "results": results,
+        "is_fallback": outcome["is_fallback"],
+        "note": outcome["note"] or "系统已根据距离自动选择最优出行方式",
+    }
+    if outcome["error_type"]:
+        result_data["api_error_type"] = outcome["error_type"]
+    return {"success": True, "data": result_data}
@@ -1,13 +1,16 @@
 # app/routers/schedule.py
 import base64
+import hashlib
 import json
-import httpx
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from sqlalchemy.orm import Session
 from app.utils.schedule_parser import parse_schedule_file
 from app.utils.calendar_utils import is_holiday, in_teaching_week
 from app.config import DEEPSEEK_API_KEY, DEEPSEEK_API_BASE
 from app.database import get_db
+from app.core.write_queue import write_queue
+from app.core.http_client import http_clients
+from app.core.singleflight import deepseek_flight
 from app.models import User, Schedule
 from app.routers.team import get_current_user
 from app.models.team import Team, TeamMember
@@ -72,47 +75,56 @@ async def upload_schedule(
         # 使用当前用户ID或提供的user_id（用于测试）
         actual_user_id = user_id or current_user.id
         
-        # 先清空该用户的所有课程（可选：可以选择保留旧课程）
-        db.query(Schedule).filter(Schedule.user_id == actual_user_id).delete()
-        db.commit()
-        
-        # 保存解析后的课程到数据库
-        saved_courses = []
-        for course in parsed_schedule:
-            # 保存教学周信息
-            weeks_str = ",".join(map(str, course.get('weeks', [])))
-            
-            new_course = Schedule(
-                user_id=actual_user_id,
-                day=course['day'],
-                start=course['start'],
-                end=course['end'],
-                course=course.get('course', ''),
-                weeks=weeks_str
-            )
-            db.add(new_course)
-            saved_courses.append(new_course)
+        def replace_schedules(session):
+            # 先清空该用户的所有课程，再保存解析后的课程（同一事务内完成）
+            session.query(Schedule).filter(Schedule.user_id == actual_user_id).delete()
+            saved_courses = []
+            for course in parsed_schedule:
+                # 保存教学周信息
+                weeks_str = ",".join(map(str, course.get('weeks', [])))
+                
+                new_course = Schedule(
+                    user_id=actual_user_id,
+                    day=course['day'],
+                    start=course['start'],
+                    end=course['end'],
+                    course=course.get('course', ''),
+                    weeks=weeks_str
+                )
+                session.add(new_course)
+                saved_courses.append({
+                    "day": new_course.day,
+                    "start": new_course.start,
+                    "end": new_course.end,
+                    "course": new_course.course,
+                    "weeks": [int(w.strip()) for w in weeks_str.split(",") if w.strip()]
+                })
+            return saved_courses
         
-        db.commit()
+        saved_courses = await write_queue.submit(replace_schedules, db=db)
         
         # 返回保存后的课程信息
         return {
             "success": True,
-            "data": [
-                {
-                    "day": course.day,
-                    "start": course.start,
-                    "end": course.end,
-                    "course": course.course,
-                    "weeks": [int(w.strip()) for w in course.weeks.split(",") if w.strip()]
-                }
-                for course in saved_courses
-            ]
+            "data": saved_courses
         }
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    
+
+
+async def call_deepseek(payload, headers):
+    """
+    调用 DeepSeek chat/completions，返回 httpx.Response
+    同时上传的相同截图（图片和提示词都相同）只发起一次调用，共享响应
+    """
+    key = hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return await deepseek_flight.do(key, lambda: http_clients.post(
+        "deepseek", f"{DEEPSEEK_API_BASE.rstrip('/')}/chat/completions",
+        endpoint="deepseek_chat", json=payload, headers=headers
+    ))
+
+
 @router.post("/upload/screenshot")
 async def upload_screenshot(file: UploadFile = File(...)):
     """
@@ -160,11 +172,10 @@ async def upload_screenshot(file: UploadFile = File(...)):
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            resp = await client.post(f"{DEEPSEEK_API_BASE.rstrip('/')}/chat/completions", json=payload, headers=headers)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"调用 DeepSeek 网络错误: {e}")
+    try:
+        resp = await call_deepseek(payload, headers)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"调用 DeepSeek 网络错误: {e}")
 
     if resp.status_code != 200:
         # 把返回的状态和文本直接返回，便于排查 Key/权限/配额问题
@@ -265,17 +276,16 @@ async def upload_screenshots(files: List[UploadFile] = File(...)):
                 "Content-Type": "application/json"
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                try:
-                    resp = await client.post(f"{DEEPSEEK_API_BASE.rstrip('/')}/chat/completions", json=payload, headers=headers)
-                except Exception as e:
-                    results.append({
-                        "file_index": idx,
-                        "filename": file.filename,
-                        "success": False,
-                        "error": f"网络错误: {e}"
-                    })
-                    continue
+            try:
+                resp = await call_deepseek(payload, headers)
+            except Exception as e:
+                results.append({
+                    "file_index": idx,
+                    "filename": file.filename,
+                    "success": False,
+                    "error": f"网络错误: {e}"
+                })
+                continue
             
             if resp.status_code != 200:
                 results.append({
@@ -373,25 +383,29 @@ async def save_schedule(
     """
     保存用户的课表到数据库
     """
-    try:
+    user_id = current_user.id
+    
+    def replace_schedules(session):
         # 先删除用户旧的课表
-        db.query(Schedule).filter(Schedule.user_id == current_user.id).delete()
+        session.query(Schedule).filter(Schedule.user_id == user_id).delete()
         
         # 保存新课表
         for item in schedule_data:
             # 将weeks列表转换为逗号分隔的字符串
             weeks_str = ",".join(map(str, item.weeks)) if item.weeks else ""
             schedule = Schedule(
-                user_id=current_user.id,
+                user_id=user_id,
                 day=item.day,
                 start=item.start,
                 end=item.end,
                 weeks=weeks_str
             )
-            db.add(schedule)
-        
-        db.commit()
-        return {"success": True, "message": "课表保存成功", "count": len(schedule_data)}
+            session.add(schedule)
+        return len(schedule_data)
+    
+    try:
+        count = await write_queue.submit(replace_schedules, db=db)
+        return {"success": True, "message": "课表保存成功", "count": count}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
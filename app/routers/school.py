@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
 from app.database import get_db
 from app.models.school import School
+from app.utils.school_import import import_schools, iter_school_rows
+from app.utils.school_catalog import school_catalog, DEFAULT_SCHOOLS  # noqa: F401  DEFAULT_SCHOOLS 保留原导入路径
 
 router = APIRouter()
 
@@ -19,38 +21,55 @@ class SchoolResponse(BaseModel):
     class Config:
         from_attributes = True
 
-# 预定义的学校数据（上海地区主要高校）- 已更新为更准确的坐标
-DEFAULT_SCHOOLS = [
-    {"name": "上海财经大学", "lat": 31.304208, "lon": 121.506379, "city": "上海", "province": "上海"},
-    {"name": "复旦大学", "lat": 31.293647, "lon": 121.507235, "city": "上海", "province": "上海"},
-    {"name": "同济大学", "lat": 31.296882, "lon": 121.496579, "city": "上海", "province": "上海"},
-    {"name": "华东师范大学", "lat": 31.156754, "lon": 121.425737, "city": "上海", "province": "上海"},
-    {"name": "上海交通大学（徐汇）", "lat": 31.192711, "lon": 121.437543, "city": "上海", "province": "上海"},
-    {"name": "上海交通大学（闵行）", "lat": 31.121552, "lon": 121.436926, "city": "上海", "province": "上海"},
-    {"name": "上海大学（宝山）", "lat": 31.318855, "lon": 121.487706, "city": "上海", "province": "上海"},
-]
-
 @router.get("")
 def list_schools(db: Session = Depends(get_db)):
-    """获取所有学校列表"""
-    schools = db.query(School).all()
-    
-    # 如果数据库中没有学校，初始化默认学校
-    if not schools:
-        for school_data in DEFAULT_SCHOOLS:
-            school = School(**school_data)
-            db.add(school)
-        db.commit()
-        schools = db.query(School).all()
-    
-    # 转换为响应模型列表
-    school_responses = [SchoolResponse.from_orm(school) for school in schools]
-    return {"success": True, "data": school_responses}
+    """获取所有学校列表（从内存目录读取，默认学校在启动时写入）"""
+    return {"success": True, "data": school_catalog.payload(db), "version": school_catalog.version}
+
+def _with_distance(results):
+    return [{**school.to_dict(), "distance_km": round(distance, 3)} for school, distance in results]
+
+@router.get("/nearby")
+def nearby_schools(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=100),
+    max_km: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db)
+):
+    """距离指定坐标最近的 k 所学校（按距离升序）"""
+    results = school_catalog.nearest(lat, lon, k=k, max_km=max_km, db=db)
+    return {"success": True, "data": _with_distance(results)}
+
+@router.get("/within")
+def schools_within(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=500),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """指定坐标 radius_km 公里范围内的学校（按距离升序）"""
+    results = school_catalog.within(lat, lon, radius_km, limit=limit, db=db)
+    return {"success": True, "data": _with_distance(results)}
+
+@router.get("/search")
+def search_schools(
+    q: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """
+    学校名称自动补全
+    支持前缀、部分名称和缩写（如「上财」「交大」），服务端排序并截断
+    """
+    results = school_catalog.search(q, limit=limit, db=db)
+    return {"success": True, "data": [{**school.to_dict(), "match": match} for school, match in results]}
 
 @router.get("/{school_id}")
 def get_school(school_id: int, db: Session = Depends(get_db)):
     """获取学校详情"""
-    school = db.query(School).filter(School.id == school_id).first()
+    school = school_catalog.get(school_id, db)
     if not school:
         raise HTTPException(status_code=404, detail="学校不存在")
     return {"success": True, "data": SchoolResponse.from_orm(school)}
@@ -67,5 +86,24 @@ def create_school(name: str, lat: float, lon: float, city: Optional[str] = None,
     db.add(school)
     db.commit()
     db.refresh(school)
+    
+    # 学校数据变更，刷新内存目录
+    school_catalog.refresh(db)
     return {"success": True, "data": SchoolResponse.from_orm(school)}
 
+@router.post("/import")
+def bulk_import_schools(file: UploadFile = File(...), chunk_size: int = Query(500, ge=1, le=5000), db: Session = Depends(get_db)):
+    """
+    批量导入学校（管理员功能）
+    支持 .csv / .json / .jsonl，以学校名称为键批量新增或更新
+    返回新增、更新、拒绝的数量以及前若干条拒绝原因
+    """
+    try:
+        result = import_schools(iter_school_rows(file.filename or "", file.file), db, chunk_size=chunk_size)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        # 学校数据变更（中途出错时之前的块已经提交），刷新内存目录
+        school_catalog.refresh(db)
+    return {"success": True, "data": result}
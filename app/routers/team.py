@@ -1,9 +1,11 @@
+import anyio
 from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
 from app.database import get_db
+from app.core.write_queue import write_queue
 from app.models.user import User
 from app.models.team import Team, TeamMember, Invitation, TeamRole, InvitationStatus
 
@@ -429,20 +431,32 @@ def accept_invitation(invitation_id: int, current_user: User = Depends(get_curre
         db.commit()
         raise HTTPException(status_code=400, detail="邀请已过期")
     
-    # 添加为团队成员
-    member = TeamMember(
-        team_id=invitation.team_id,
-        user_id=current_user.id,
-        role=TeamRole.MEMBER
-    )
-    db.add(member)
+    user_id = current_user.id
     
-    # 更新邀请状态
-    invitation.status = InvitationStatus.ACCEPTED
-    invitation.invitee_id = current_user.id
-    invitation.responded_at = datetime.utcnow()
+    def join_team(session):
+        # 写事务内重新读取邀请，防止并发请求重复接受
+        pending = session.query(Invitation).filter(
+            Invitation.id == invitation_id,
+            Invitation.status == InvitationStatus.PENDING
+        ).first()
+        if not pending:
+            raise HTTPException(status_code=400, detail="邀请已处理")
+        
+        # 添加为团队成员
+        member = TeamMember(
+            team_id=pending.team_id,
+            user_id=user_id,
+            role=TeamRole.MEMBER
+        )
+        session.add(member)
+        
+        # 更新邀请状态
+        pending.status = InvitationStatus.ACCEPTED
+        pending.invitee_id = user_id
+        pending.responded_at = datetime.utcnow()
     
-    db.commit()
+    # 同步路由运行在线程池中，回到事件循环提交写操作
+    anyio.from_thread.run(write_queue.submit, join_team, db)
     
     return {
         "success": True,
@@ -551,30 +565,42 @@ def accept_invite(req: dict, current_user: User = Depends(get_current_user), db:
     if not team:
         raise HTTPException(status_code=404, detail="团队不存在")
     
-    # 检查用户是否已经是团队成员
-    is_member = db.query(TeamMember).filter(
-        TeamMember.team_id == team_id,
-        TeamMember.user_id == current_user.id
-    ).first()
-    
-    if is_member:
-        raise HTTPException(status_code=400, detail="您已经是团队成员")
+    user_id = current_user.id
+    user_openid = current_user.openid
     
-    # 将用户添加到团队
-    team_member = TeamMember(
-        team_id=team_id,
-        user_id=current_user.id,
-        role=TeamRole.MEMBER
-    )
-    db.add(team_member)
-    
-    # 更新邀请状态
-    invitation.status = InvitationStatus.ACCEPTED
-    invitation.invitee_id = current_user.id
-    invitation.invitee_openid = current_user.openid
-    invitation.responded_at = datetime.utcnow()
-    
-    db.commit()
+    def join_team(session):
+        # 检查用户是否已经是团队成员（在写事务内检查，避免并发重复加入）
+        is_member = session.query(TeamMember).filter(
+            TeamMember.team_id == team_id,
+            TeamMember.user_id == user_id
+        ).first()
+        
+        if is_member:
+            raise HTTPException(status_code=400, detail="您已经是团队成员")
+        
+        pending = session.query(Invitation).filter(
+            Invitation.id == invitation.id,
+            Invitation.status == InvitationStatus.PENDING
+        ).first()
+        if not pending:
+            raise HTTPException(status_code=404, detail="邀请不存在或已失效")
+        
+        # 将用户添加到团队
+        team_member = TeamMember(
+            team_id=team_id,
+            user_id=user_id,
+            role=TeamRole.MEMBER
+        )
+        session.add(team_member)
+        
+        # 更新邀请状态
+        pending.status = InvitationStatus.ACCEPTED
+        pending.invitee_id = user_id
+        pending.invitee_openid = user_openid
+        pending.responded_at = datetime.utcnow()
+    
+    # 同步路由运行在线程池中，回到事件循环提交写操作
+    anyio.from_thread.run(write_queue.submit, join_team, db)
     
     return {
         "success": True,
@@ -0,0 +1,331 @@
+"""
+本地 POI 库
+
+推荐请求反复搜索上海几所校区周边的同一片区域。这里把 POI 搜索的实时结果存下来，
+建立网格空间索引（经纬度按 POI_STORE_GRID_DEG 度划分格子）和分类索引（查询词 + 百度 tag），
+并记录每次实时搜索覆盖的范围（footprint）：格子中心落在搜索半径内的格子视为已覆盖。
+
+lookup 时，如果查询范围内的格子对该分类都已覆盖且未过期，直接从本地索引返回按距离排序的 POI；
+否则返回未覆盖的格子，由调用方对这些格子（或整个范围）做实时搜索后 ingest。
+后台任务定期重新搜索即将过期、且最近仍被用到的 footprint，使常用区域保持新鲜。
+
+数据持久化在本地 SQLite 文件中，应用启动时（start）在线程中全部载入内存；
+请求中只读写内存索引，SQLite 写入放到线程中执行，不阻塞事件循环。
+覆盖指「该范围搜索过」，不保证包含范围内的全部 POI（实时搜索本身也只返回一页结果）。
+"""
+import asyncio
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+from app.config import (
+    POI_STORE_PATH,
+    POI_STORE_TTL_HOURS,
+    POI_STORE_GRID_DEG,
+    POI_STORE_MAX_CELL_SEARCHES,
+    POI_STORE_REFRESH_INTERVAL,
+)
+from app.core.utils import haversine_distance
+
+logger = logging.getLogger(__name__)
+
+# footprint 超过 ttl 的这个比例后由后台任务提前刷新
+REFRESH_AHEAD = 0.8
+# 每轮后台刷新最多重新搜索的 footprint 数
+REFRESH_BATCH = 5
+MAX_RESULTS = 20
+METERS_PER_DEG_LAT = 111320.0
+
+
+def _categories(query, item):
+    """POI 所属分类：搜索词，加上百度 detail_info.tag 中的各段（例如 "美食;火锅"）"""
+    categories = {query}
+    tag = (item.get("detail_info") or {}).get("tag") or ""
+    categories.update(t.strip().lower() for t in tag.replace(",", ";").split(";") if t.strip())
+    return categories
+
+
+class PoiStore:
+    """网格空间索引 + 分类索引的本地 POI 库"""
+
+    def __init__(self, path, ttl_seconds, grid_deg=0.01, max_cell_searches=3,
+                 refresh_interval=300.0, clock=time.time):
+        self.path = path
+        self.ttl = ttl_seconds
+        self.grid_deg = grid_deg
+        self.max_cell_searches = max_cell_searches
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self._pois = {}  # (提供方, uid) -> {"item", "lat", "lon", "categories", "updated_at"}
+        self._grid = {}  # (提供方, 格子) -> {uid}
+        self._category_index = {}  # (提供方, 分类) -> {uid}
+        self._footprints = {}  # (提供方, 分类, lat, lon, 半径) -> {"fetched_at", "last_used"}
+        self._coverage = {}  # (提供方, 分类, 格子) -> 覆盖该格子的最近一次 footprint
+        self._loaded = False
+        self._conn = None
+        self._db_lock = threading.Lock()  # 保护 SQLite 连接（写入在线程池中执行）
+        self._task = None
+        self._stats = {"local_answers": 0, "uncovered_lookups": 0, "ingested_searches": 0,
+                       "refreshes": 0, "refresh_errors": 0}
+
+    # ---- 网格 ----
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.grid_deg), math.floor(lon / self.grid_deg))
+
+    def _cell_center(self, cell):
+        return ((cell[0] + 0.5) * self.grid_deg, (cell[1] + 0.5) * self.grid_deg)
+
+    def _cells_around(self, lat, lon, radius_m):
+        """与以 (lat, lon) 为中心、radius_m 为半径的圆的外接矩形相交的格子"""
+        dlat = radius_m / METERS_PER_DEG_LAT
+        dlon = radius_m / (METERS_PER_DEG_LAT * max(0.01, math.cos(math.radians(lat))))
+        low, high = self._cell(lat - dlat, lon - dlon), self._cell(lat + dlat, lon + dlon)
+        return [(i, j) for i in range(low[0], high[0] + 1) for j in range(low[1], high[1] + 1)]
+
+    def _cells_within(self, lat, lon, radius_m):
+        """格子中心落在圆内的格子；圆太小没有格子中心时取圆心所在的格子"""
+        cells = [
+            cell for cell in self._cells_around(lat, lon, radius_m)
+            if haversine_distance(lat, lon, *self._cell_center(cell)) * 1000 <= radius_m
+        ]
+        return cells or [self._cell(lat, lon)]
+
+    def cell_search_area(self, cell):
+        """覆盖整个格子的搜索 (中心, 半径米)：格子中心到角点的距离"""
+        center = self._cell_center(cell)
+        corner = (cell[0] * self.grid_deg, cell[1] * self.grid_deg)
+        return center, math.ceil(haversine_distance(*center, *corner) * 1000) + 50
+
+    # ---- 持久化 ----
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pois ("
+                " provider TEXT NOT NULL, uid TEXT NOT NULL, lat REAL NOT NULL, lon REAL NOT NULL,"
+                " categories TEXT NOT NULL, data TEXT NOT NULL, updated_at REAL NOT NULL,"
+                " PRIMARY KEY (provider, uid))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS footprints ("
+                " provider TEXT NOT NULL, category TEXT NOT NULL, lat REAL NOT NULL, lon REAL NOT NULL,"
+                " radius INTEGER NOT NULL, fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (provider, category, lat, lon, radius))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def load(self):
+        """从 SQLite 载入全部 POI 和搜索范围（阻塞，启动时在线程中调用）"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with self._db_lock:
+                conn = self._connection()
+                pois = conn.execute("SELECT provider, uid, lat, lon, categories, data, updated_at FROM pois").fetchall()
+                footprints = conn.execute(
+                    "SELECT provider, category, lat, lon, radius, fetched_at FROM footprints ORDER BY fetched_at"
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"读取本地 POI 库失败: {e}")
+            return
+        for provider, uid, lat, lon, categories, data, updated_at in pois:
+            self._index_poi(provider, uid, json.loads(data), lat, lon, set(json.loads(categories)), updated_at)
+        for provider, category, lat, lon, radius, fetched_at in footprints:
+            self._add_footprint((provider, category, lat, lon, radius), fetched_at, last_used=0.0)
+        logger.info(f"本地 POI 库: {len(self._pois)} 个 POI, {len(self._footprints)} 个搜索范围")
+
+    def _write(self, rows, footprint_key, fetched_at):
+        """把一次搜索的 POI 和搜索范围写入 SQLite（阻塞，在线程中调用）"""
+        try:
+            with self._db_lock:
+                conn = self._connection()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pois (provider, uid, lat, lon, categories, data, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", rows,
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO footprints (provider, category, lat, lon, radius, fetched_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)", (*footprint_key, fetched_at),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入本地 POI 库失败: {e}")
+
+    def _ensure_loaded(self):
+        # 正常情况下已在 start() 中载入；未经应用启动直接使用时（脚本）在这里同步载入
+        if not self._loaded:
+            self.load()
+
+    # ---- 索引 ----
+
+    def _index_poi(self, provider, uid, item, lat, lon, categories, updated_at):
+        key = (provider, uid)
+        old = self._pois.get(key)
+        if old is not None:
+            self._grid.get((provider, self._cell(old["lat"], old["lon"])), set()).discard(uid)
+            categories = categories | old["categories"]
+        self._pois[key] = {"item": item, "lat": lat, "lon": lon, "categories": categories, "updated_at": updated_at}
+        self._grid.setdefault((provider, self._cell(lat, lon)), set()).add(uid)
+        for category in categories:
+            self._category_index.setdefault((provider, category), set()).add(uid)
+        return self._pois[key]
+
+    def _add_footprint(self, key, fetched_at, last_used):
+        provider, category, lat, lon, radius = key
+        previous = self._footprints.get(key)
+        self._footprints[key] = {
+            "fetched_at": fetched_at,
+            "last_used": max(last_used, previous["last_used"]) if previous else last_used,
+        }
+        for cell in self._cells_within(lat, lon, radius):
+            current = self._coverage.get((provider, category, cell))
+            if current is None or self._footprints[current]["fetched_at"] <= fetched_at:
+                self._coverage[(provider, category, cell)] = key
+
+    async def ingest(self, provider, category, center, radius, ps_json):
+        """写入一次实时搜索（status == 0）的结果，并把搜索范围内的格子记为已覆盖；内存索引立即更新，SQLite 在线程中写入"""
+        self._ensure_loaded()
+        now = self.clock()
+        rows = []
+        for item in ps_json.get("results") or []:
+            location = item.get("location") or {}
+            try:
+                lat, lon = float(location["lat"]), float(location["lng"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            uid = item.get("uid") or f"{item.get('name')}@{lat:.5f},{lon:.5f}"
+            poi = self._index_poi(provider, uid, item, lat, lon, _categories(category, item), now)
+            rows.append((provider, uid, lat, lon, json.dumps(sorted(poi["categories"]), ensure_ascii=False),
+                         json.dumps(item, ensure_ascii=False), now))
+
+        key = (provider, category, round(center[0], 5), round(center[1], 5), int(radius))
+        self._add_footprint(key, now, last_used=now)
+        self._stats["ingested_searches"] += 1
+        await asyncio.to_thread(self._write, rows, key, now)
+
+    def lookup(self, provider, category, center, radius):
+        """
+        返回 (POI 列表, 未覆盖的格子)：
+        范围内的格子都已覆盖且未过期时，POI 列表为本地索引中按距离排序的结果（百度格式），未覆盖格子为空；
+        否则 POI 列表为 None，由调用方对未覆盖的格子实时搜索
+        """
+        self._ensure_loaded()
+        now = self.clock()
+        lat, lon = center
+        uncovered = []
+        used = set()
+        for cell in self._cells_within(lat, lon, radius):
+            footprint = self._coverage.get((provider, category, cell))
+            if footprint is None or now - self._footprints[footprint]["fetched_at"] > self.ttl:
+                uncovered.append(cell)
+            else:
+                used.add(footprint)
+        for footprint in used:
+            self._footprints[footprint]["last_used"] = now
+        if uncovered:
+            self._stats["uncovered_lookups"] += 1
+            return None, uncovered
+
+        in_category = self._category_index.get((provider, category), set())
+        nearby = []
+        for cell in self._cells_around(lat, lon, radius):
+            for uid in self._grid.get((provider, cell), ()):
+                if uid not in in_category:
+                    continue
+                poi = self._pois[(provider, uid)]
+                # 连续两个周期都没有再被搜到的 POI 视为已关闭
+                if now - poi["updated_at"] > 2 * self.ttl:
+                    continue
+                meters = haversine_distance(lat, lon, poi["lat"], poi["lon"]) * 1000
+                if meters <= radius:
+                    nearby.append((meters, uid))
+        nearby.sort()
+        self._stats["local_answers"] += 1
+        return [self._pois[(provider, uid)]["item"] for _, uid in nearby[:MAX_RESULTS]], []
+
+    # ---- 后台刷新 ----
+
+    async def refresh_stale(self):
+        """重新搜索即将过期、且最近一个周期内仍被用到的 footprint"""
+        from app.providers import get_provider
+
+        self._ensure_loaded()
+        provider = get_provider()
+        now = self.clock()
+        due = sorted(
+            (key for key, fp in self._footprints.items()
+             if key[0] == provider.name
+             and now - fp["fetched_at"] > self.ttl * REFRESH_AHEAD
+             and now - fp["last_used"] < self.ttl),
+            key=lambda key: self._footprints[key]["fetched_at"],
+        )[:REFRESH_BATCH]
+        for key in due:
+            _, category, lat, lon, radius = key
+            try:
+                ps_json = await provider.search_places((lat, lon), category, radius)
+            except Exception as e:
+                self._stats["refresh_errors"] += 1
+                logger.warning(f"本地 POI 库刷新失败 {key}: {e}")
+                continue
+            if ps_json.get("status") != 0:
+                self._stats["refresh_errors"] += 1
+                continue
+            await self.ingest(provider.name, category, (lat, lon), radius, ps_json)
+            self._stats["refreshes"] += 1
+
+    async def start(self):
+        """在线程中载入本地库，并启动后台刷新任务（应用启动时调用）"""
+        await asyncio.to_thread(self.load)
+        if self._task is not None and not self._task.done():
+            return
+
+        async def run():
+            while True:
+                await asyncio.sleep(self.refresh_interval)
+                try:
+                    await self.refresh_stale()
+                except Exception as e:
+                    logger.warning(f"本地 POI 库后台刷新异常: {e}")
+
+        self._task = asyncio.get_running_loop().create_task(run())
+
+    async def stop(self):
+        """停止后台刷新并关闭数据库（应用退出时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self):
+        return {
+            **self._stats,
+            "pois": len(self._pois),
+            "footprints": len(self._footprints),
+            "covered_cells": len(self._coverage),
+        }
+
+
+poi_store = PoiStore(
+    POI_STORE_PATH,
+    ttl_seconds=POI_STORE_TTL_HOURS * 3600,
+    grid_deg=POI_STORE_GRID_DEG,
+    max_cell_searches=POI_STORE_MAX_CELL_SEARCHES,
+    refresh_interval=POI_STORE_REFRESH_INTERVAL,
+)
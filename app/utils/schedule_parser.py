@@ -1,7 +1,10 @@
 import io
 import re
-import pandas as pd
-from icalendar import Calendar
+from typing import TYPE_CHECKING
+
+# pandas / icalendar 导入较慢，只在第一次解析对应格式的文件时才加载
+if TYPE_CHECKING:
+    import pandas as pd
 
 DEFAULT_WEEKS = list(range(1, 17))  # 默认整个学期（1~16周）
 
@@ -78,6 +81,7 @@ def parse_excel_simple(content: bytes):
     直接取前四列并硬编码列名为 day, start, end, course
     """
     print("🔥 USING SIMPLIFIED parse_excel VERSION 🔥")
+    import pandas as pd
     df = pd.read_excel(io.BytesIO(content), engine='openpyxl')
     # 去掉空行
     df = df.dropna(how='all')
@@ -115,6 +119,7 @@ def parse_csv(content: bytes):
     解析 CSV 格式课表
     支持多种列名格式
     """
+    import pandas as pd
     try:
         df = pd.read_csv(io.BytesIO(content), encoding='utf-8')
     except Exception as e:
@@ -212,6 +217,7 @@ def parse_ics(content: bytes):
     解析 iCalendar (.ics) 格式课表
     返回: [{"day": "周一", "start": "10:00", "end": "12:00", "course": "课程名"}, ...]
     """
+    from icalendar import Calendar
     try:
         cal = Calendar.from_ical(content)
     except Exception as e:
@@ -269,10 +275,11 @@ def parse_weeks_from_text(text: str):
             weeks.add(int(m))
     return sorted(weeks)
 
-def parse_sufe_matrix_excel(df: pd.DataFrame):
+def parse_sufe_matrix_excel(df: "pd.DataFrame"):
     """
     解析上财导出的「星期 × 节次」矩阵课表
     """
+    import pandas as pd
     print("✅ SUFE MATRIX PARSER ACTIVATED")
     schedule = []
 
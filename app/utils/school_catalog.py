@@ -0,0 +1,153 @@
+"""
+学校目录内存缓存
+
+启动时从 schools 表加载一次，之后按 id / 名称的查询都直接读内存；
+create_school、批量导入等写操作完成后调用 refresh() 重新加载并递增 version。
+每次加载生成一份不可变快照，读请求无需加锁。
+注意：多进程部署时每个进程各自持有一份目录。
+"""
+import threading
+from typing import NamedTuple, Optional
+
+from app.database import SessionLocal
+from app.models.school import School
+from app.utils.spatial_index import SpatialIndex
+from app.utils.school_search import SchoolSearchIndex
+
+# 预定义的学校数据（上海地区主要高校）- 已更新为更准确的坐标
+DEFAULT_SCHOOLS = [
+    {"name": "上海财经大学", "lat": 31.304208, "lon": 121.506379, "city": "上海", "province": "上海"},
+    {"name": "复旦大学", "lat": 31.293647, "lon": 121.507235, "city": "上海", "province": "上海"},
+    {"name": "同济大学", "lat": 31.296882, "lon": 121.496579, "city": "上海", "province": "上海"},
+    {"name": "华东师范大学", "lat": 31.156754, "lon": 121.425737, "city": "上海", "province": "上海"},
+    {"name": "上海交通大学（徐汇）", "lat": 31.192711, "lon": 121.437543, "city": "上海", "province": "上海"},
+    {"name": "上海交通大学（闵行）", "lat": 31.121552, "lon": 121.436926, "city": "上海", "province": "上海"},
+    {"name": "上海大学（宝山）", "lat": 31.318855, "lon": 121.487706, "city": "上海", "province": "上海"},
+]
+
+
+class CatalogSchool(NamedTuple):
+    """目录中的学校记录（与 ORM 对象脱离，可在任意线程中安全读取）"""
+    id: int
+    name: str
+    lat: float
+    lon: float
+    city: Optional[str] = None
+    province: Optional[str] = None
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class _Snapshot(NamedTuple):
+    version: int
+    schools: tuple
+    by_id: dict
+    by_name: dict
+    payload: list  # 预先序列化好的学校列表，list_schools 直接返回
+    spatial: SpatialIndex  # 最近学校 / 半径查询
+    search: SchoolSearchIndex  # 名称前缀 / 子串 / 缩写搜索
+
+
+class SchoolCatalog:
+    """学校目录：按 id / 名称的内存查询，数据变更后 refresh"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    @property
+    def version(self):
+        return self._snapshot.version if self._snapshot else 0
+
+    def seed_defaults(self, db):
+        """学校表为空时写入默认学校，返回写入数量"""
+        if db.query(School.id).first() is not None:
+            return 0
+        for school_data in DEFAULT_SCHOOLS:
+            db.add(School(**school_data))
+        db.commit()
+        return len(DEFAULT_SCHOOLS)
+
+    def refresh(self, db=None):
+        """从数据库重新加载目录并递增版本号"""
+        own_session = db is None
+        if own_session:
+            db = self.session_factory()
+        try:
+            rows = db.query(School).order_by(School.id).all()
+            schools = tuple(
+                CatalogSchool(id=s.id, name=s.name, lat=float(s.lat), lon=float(s.lon),
+                              city=s.city, province=s.province)
+                for s in rows
+            )
+        finally:
+            if own_session:
+                db.close()
+
+        with self._lock:
+            self._snapshot = _Snapshot(
+                version=self.version + 1,
+                schools=schools,
+                by_id={s.id: s for s in schools},
+                by_name={s.name: s for s in schools},
+                payload=[s.to_dict() for s in schools],
+                spatial=SpatialIndex(schools),
+                search=SchoolSearchIndex(schools),
+            )
+        return self._snapshot.version
+
+    def ensure_loaded(self, db=None):
+        """未加载时（例如未经过 lifespan 启动）按需加载一次"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh(db)
+            snapshot = self._snapshot
+        return snapshot
+
+    def all(self, db=None):
+        return self.ensure_loaded(db).schools
+
+    def payload(self, db=None):
+        return self.ensure_loaded(db).payload
+
+    def get(self, school_id, db=None):
+        return self.ensure_loaded(db).by_id.get(school_id)
+
+    def get_by_name(self, name, db=None):
+        return self.ensure_loaded(db).by_name.get(name)
+
+    def get_many(self, school_ids, db=None):
+        """按 id 列表查询，忽略不存在和重复的 id，保持传入顺序"""
+        by_id = self.ensure_loaded(db).by_id
+        return [by_id[i] for i in dict.fromkeys(school_ids) if i in by_id]
+
+    def nearest(self, lat, lon, k=5, max_km=None, db=None):
+        """距离 (lat, lon) 最近的 k 所学校：[(学校, 距离公里), ...]"""
+        return self.ensure_loaded(db).spatial.nearest(lat, lon, k=k, max_km=max_km)
+
+    def within(self, lat, lon, radius_km, limit=None, db=None):
+        """距离 (lat, lon) 不超过 radius_km 公里的学校：[(学校, 距离公里), ...]"""
+        return self.ensure_loaded(db).spatial.within(lat, lon, radius_km, limit=limit)
+
+    def search(self, query, limit=10, db=None):
+        """按名称搜索学校：[(学校, 匹配类型), ...]"""
+        return self.ensure_loaded(db).search.search(query, limit=limit)
+
+
+school_catalog = SchoolCatalog()
+
+
+def init_school_catalog():
+    """启动时调用：必要时写入默认学校，然后加载目录"""
+    db = SessionLocal()
+    try:
+        school_catalog.seed_defaults(db)
+        return school_catalog.refresh(db)
+    finally:
+        db.close()
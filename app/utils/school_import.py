@@ -0,0 +1,183 @@
+"""
+学校批量导入
+
+从 CSV / JSON / JSON Lines 文件流式读取学校，按块校验后以 executemany 批量 upsert
+（以唯一的 name 为键：已存在则更新坐标和城市信息，不存在则插入）。
+每块单独提交，导入完成后刷新内存学校目录。
+
+命令行：
+    python -m app.utils.school_import schools.csv [--chunk-size 500]
+CSV 表头支持 name/学校/名称, lat/纬度, lon/lng/经度, city/城市, province/省份。
+"""
+import argparse
+import codecs
+import csv
+import json
+import os
+
+from sqlalchemy import bindparam, insert, select, update
+
+from app.models.school import School
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 50
+
+COLUMN_ALIASES = {
+    "name": ["name", "学校", "学校名称", "名称"],
+    "lat": ["lat", "latitude", "纬度"],
+    "lon": ["lon", "lng", "longitude", "经度"],
+    "city": ["city", "城市"],
+    "province": ["province", "省份", "省"],
+}
+
+
+def _normalize_keys(raw):
+    """把各种表头别名统一为 name/lat/lon/city/province"""
+    lowered = {str(k).strip().lower(): v for k, v in raw.items() if k is not None}
+    row = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                row[field] = lowered[alias]
+                break
+    return row
+
+
+def validate_row(raw):
+    """校验一行数据，返回 (学校字典, None) 或 (None, 错误原因)"""
+    if not isinstance(raw, dict):
+        return None, "不是对象"
+    row = _normalize_keys(raw)
+
+    name = str(row.get("name") or "").strip()
+    if not name:
+        return None, "缺少学校名称"
+    if len(name) > 100:
+        return None, "学校名称超过100个字符"
+
+    try:
+        lat = float(row.get("lat"))
+        lon = float(row.get("lon"))
+    except (TypeError, ValueError):
+        return None, "经纬度缺失或不是数字"
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None, "经纬度超出范围"
+
+    school = {"name": name, "lat": lat, "lon": lon}
+    for field in ("city", "province"):
+        value = str(row.get(field) or "").strip()
+        if len(value) > 50:
+            return None, f"{field} 超过50个字符"
+        school[field] = value or None
+    return school, None
+
+
+def iter_school_rows(filename, stream):
+    """
+    按文件类型逐行产出原始记录（字典）
+    stream 为二进制文件对象；.csv 和 .jsonl 逐行读取，.json 需为对象数组
+    """
+    lower = filename.lower()
+    if lower.endswith(".csv"):
+        text = codecs.getreader("utf-8-sig")(stream)
+        yield from csv.DictReader(text)
+    elif lower.endswith(".jsonl"):
+        text = codecs.getreader("utf-8-sig")(stream)
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield None
+    elif lower.endswith(".json"):
+        data = json.load(codecs.getreader("utf-8-sig")(stream))
+        if isinstance(data, dict):
+            data = data.get("schools") or data.get("data") or []
+        if not isinstance(data, list):
+            raise ValueError("JSON 文件应为学校列表，或包含 schools / data 列表的对象")
+        yield from data
+    else:
+        raise ValueError("文件格式不支持，请上传 .csv、.json 或 .jsonl")
+
+
+def _upsert_chunk(db, schools):
+    """以 name 为键批量 upsert 一块学校数据，返回 (插入数, 更新数)"""
+    table = School.__table__
+    names = [s["name"] for s in schools]
+    existing = set(db.execute(select(table.c.name).where(table.c.name.in_(names))).scalars())
+
+    new_rows = [s for s in schools if s["name"] not in existing]
+    changed_rows = [{"b_" + k: v for k, v in s.items()} for s in schools if s["name"] in existing]
+
+    if new_rows:
+        db.execute(insert(table), new_rows)
+    if changed_rows:
+        db.execute(
+            update(table)
+            .where(table.c.name == bindparam("b_name"))
+            .values(lat=bindparam("b_lat"), lon=bindparam("b_lon"),
+                    city=bindparam("b_city"), province=bindparam("b_province")),
+            changed_rows
+        )
+    db.commit()
+    return len(new_rows), len(changed_rows)
+
+
+def import_schools(rows, db, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    导入学校记录
+    rows: 原始记录的可迭代对象（可以是生成器，按块消费）
+    返回 {"inserted", "updated", "rejected", "errors": [{"row", "reason"}, ...]}
+    """
+    result = {"inserted": 0, "updated": 0, "rejected": 0, "errors": []}
+    chunk = {}
+
+    def flush():
+        if not chunk:
+            return
+        inserted, updated = _upsert_chunk(db, list(chunk.values()))
+        result["inserted"] += inserted
+        result["updated"] += updated
+        chunk.clear()
+
+    for row_number, raw in enumerate(rows, start=1):
+        school, error = validate_row(raw)
+        if error:
+            result["rejected"] += 1
+            if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                result["errors"].append({"row": row_number, "reason": error})
+            continue
+        # 同一块内重名时以最后一条为准
+        chunk[school["name"]] = school
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.utils.school_import", description="批量导入学校")
+    parser.add_argument("path", help="CSV / JSON / JSONL 文件路径")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal
+    from app.utils.school_catalog import school_catalog
+
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            result = import_schools(iter_school_rows(os.path.basename(args.path), f), db, args.chunk_size)
+        school_catalog.refresh(db)
+    finally:
+        db.close()
+
+    print(f"导入完成：新增 {result['inserted']}，更新 {result['updated']}，拒绝 {result['rejected']}")
+    for error in result["errors"]:
+        print(f"  第{error['row']}行: {error['reason']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+学校名称搜索索引（自动补全）
+
+由三部分组成，随学校目录快照一起构建：
+  - 前缀树：每个节点保存经过该前缀的学校（按名称长度排序，最多 MAX_LIMIT 个）
+  - 单字 / 双字 n-gram 倒排表：用于子串匹配和缩写匹配的候选召回
+  - 名称精确匹配表
+匹配分级（越靠前排名越高）：完全匹配 > 前缀匹配 > 子串匹配 > 缩写匹配。
+缩写匹配指查询字符按顺序出现在名称中，例如「上财」→ 上海财经大学、「交大」→ 上海交通大学。
+子串匹配级别内按名称长度、匹配位置排序；缩写匹配级别内按间隔字符数、名称长度排序，
+例如「上大」→ 上海大学（宝山）排在 上海财经大学 之前。倒排表预先按名称长度排序，取够结果即可提前结束。
+"""
+import heapq
+
+MAX_LIMIT = 50
+# 凑够结果后，为了按匹配位置 / 间隔字符数排序，最多再额外校验 needed * LOOKAHEAD 个候选
+LOOKAHEAD = 4
+
+MATCH_EXACT = "exact"
+MATCH_PREFIX = "prefix"
+MATCH_SUBSTRING = "substring"
+MATCH_ABBREVIATION = "abbreviation"
+
+_FULLWIDTH = str.maketrans({"（": "(", "）": ")", "　": ""})
+
+
+def normalize(text):
+    """统一大小写、全角括号并去掉空白"""
+    return "".join(str(text).translate(_FULLWIDTH).lower().split())
+
+
+def _subsequence_gaps(query, name):
+    """query 按顺序出现在 name 中时返回跨度内多出的字符数，否则返回 None"""
+    pos = name.find(query[0])
+    if pos < 0:
+        return None
+    start = last = pos
+    for ch in query[1:]:
+        last = name.find(ch, last + 1)
+        if last < 0:
+            return None
+    return (last - start + 1) - len(query)
+
+
+class SchoolSearchIndex:
+    """对带 name 属性的学校对象建立搜索索引"""
+
+    def __init__(self, schools):
+        self._schools = list(schools)
+        self._names = [normalize(s.name) for s in self._schools]
+        # 按 (名称长度, 原始顺序) 排序后的下标，作为所有倒排表的排列顺序
+        order = sorted(range(len(self._schools)), key=lambda i: (len(self._names[i]), i))
+
+        self._exact = {}
+        self._trie = {}
+        self._unigrams = {}
+        self._bigrams = {}
+        for i in order:
+            name = self._names[i]
+            self._exact.setdefault(name, i)
+
+            node = self._trie
+            for ch in name:
+                node = node.setdefault(ch, {})
+                ids = node.setdefault("", [])
+                if len(ids) < MAX_LIMIT:
+                    ids.append(i)
+
+            for ch in set(name):
+                self._unigrams.setdefault(ch, []).append(i)
+            for gram in {name[j:j + 2] for j in range(len(name) - 1)}:
+                self._bigrams.setdefault(gram, []).append(i)
+
+    def __len__(self):
+        return len(self._schools)
+
+    def search(self, query, limit=10):
+        """返回 [(学校, 匹配类型), ...]，按匹配级别和名称长度排序"""
+        q = normalize(query)
+        limit = max(0, min(limit, MAX_LIMIT))
+        if not q or limit == 0:
+            return []
+
+        results = []
+        seen = set()
+
+        def take(ids, match):
+            for i in ids:
+                if len(results) >= limit:
+                    return
+                if i not in seen:
+                    seen.add(i)
+                    results.append((self._schools[i], match))
+
+        exact = self._exact.get(q)
+        if exact is not None:
+            take([exact], MATCH_EXACT)
+
+        node = self._trie
+        for ch in q:
+            node = node.get(ch)
+            if node is None:
+                break
+        if node is not None:
+            take(node.get("", []), MATCH_PREFIX)
+
+        if len(results) < limit:
+            take(self._scan(q, seen, limit - len(results), substring=True), MATCH_SUBSTRING)
+        if len(results) < limit and len(q) > 1:
+            take(self._scan(q, seen, limit - len(results), substring=False), MATCH_ABBREVIATION)
+        return results
+
+    def _scan(self, q, seen, needed, substring):
+        """
+        在最短的倒排表中按名称长度顺序扫描候选并校验
+        子串匹配按 (长度, 位置) 排序：已凑够 needed 个且名称变长（或同长度候选超出预看数量）后停止；
+        缩写匹配按 (间隔字符数, 长度) 排序：后面的候选最好也只是 (0, 当前长度)，
+        不可能超过当前第 needed 名时停止（或超出预看数量）
+        """
+        if substring and len(q) > 1:
+            grams = [q[j:j + 2] for j in range(len(q) - 1)]
+            postings = [self._bigrams.get(g) for g in grams]
+        else:
+            postings = [self._unigrams.get(ch) for ch in set(q)]
+        if not postings or any(p is None for p in postings):
+            return []
+        candidates = min(postings, key=len)
+
+        found = []
+        best = []  # 缩写匹配：当前最好的 needed 个 (间隔字符数, 长度, 下标)，取负后的大顶堆
+        cutoff_len = None
+        lookahead = 0
+        for i in candidates:
+            name = self._names[i]
+            if cutoff_len is not None:
+                # 同长度的名称可能有上千个，凑够之后最多再看 LOOKAHEAD 倍数量的候选
+                lookahead -= 1
+                if lookahead < 0:
+                    break
+                if substring and len(name) > cutoff_len:
+                    break
+                if not substring and (0, len(name)) >= (-best[0][0], -best[0][1]):
+                    break
+            if i in seen:
+                continue
+            if substring:
+                pos = name.find(q)
+                if pos < 0:
+                    continue
+                found.append((len(name), pos, i))
+            else:
+                gaps = _subsequence_gaps(q, name)
+                if gaps is None:
+                    continue
+                found.append((gaps, len(name), i))
+                heapq.heappush(best, (-gaps, -len(name), -i))
+                if len(best) > needed:
+                    heapq.heappop(best)
+            if cutoff_len is None and len(found) >= needed:
+                cutoff_len = len(name)
+                lookahead = needed * LOOKAHEAD
+
+        found.sort()
+        return [i for _, _, i in found[:needed]]
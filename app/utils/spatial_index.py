@@ -0,0 +1,123 @@
+"""
+学校空间索引（KD 树）
+
+经纬度先投影为单位球面上的三维坐标 (x, y, z)，在三维空间建 KD 树。
+球面上两点的弦长与大圆距离单调对应，因此用弦长做 k 近邻 / 半径查询的结果
+与按 haversine 距离排序完全一致，查询复杂度 O(log n)（半径查询另加结果数）。
+"""
+import heapq
+import math
+
+from app.core.utils import haversine_distance
+
+EARTH_RADIUS_KM = 6371
+
+
+def _to_xyz(lat, lon):
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def _chord_sq(radius_km):
+    """大圆距离（公里）对应的单位球弦长平方"""
+    angle = min(radius_km / EARTH_RADIUS_KM, math.pi)
+    return (2 * math.sin(angle / 2)) ** 2
+
+
+def _dist_sq(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+class _Node:
+    __slots__ = ("xyz", "item", "seq", "axis", "left", "right")
+
+    def __init__(self, xyz, item, seq, axis, left, right):
+        self.xyz = xyz
+        self.item = item
+        self.seq = seq
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+class SpatialIndex:
+    """
+    对带 lat / lon 属性的对象建立空间索引
+    nearest(lat, lon, k) -> [(item, distance_km), ...]
+    within(lat, lon, radius_km) -> [(item, distance_km), ...]，均按距离升序
+    """
+
+    def __init__(self, items):
+        points = [(_to_xyz(float(item.lat), float(item.lon)), item, seq) for seq, item in enumerate(items)]
+        self.size = len(points)
+        self._root = self._build(points, 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        xyz, item, seq = points[mid]
+        return _Node(xyz, item, seq, axis,
+                     self._build(points[:mid], depth + 1),
+                     self._build(points[mid + 1:], depth + 1))
+
+    def __len__(self):
+        return self.size
+
+    def nearest(self, lat, lon, k=5, max_km=None):
+        """返回距离 (lat, lon) 最近的 k 个对象，可用 max_km 限制最大距离"""
+        if k <= 0 or self._root is None:
+            return []
+        target = _to_xyz(lat, lon)
+        bound = _chord_sq(max_km) if max_km is not None else float("inf")
+        heap = []  # 最大堆：(-弦长平方, -seq, item)
+
+        def search(node):
+            if node is None:
+                return
+            d2 = _dist_sq(node.xyz, target)
+            if d2 <= bound:
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d2, -node.seq, node.item))
+                elif d2 < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d2, -node.seq, node.item))
+            diff = target[node.axis] - node.xyz[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            search(near)
+            worst = -heap[0][0] if len(heap) == k else bound
+            if diff * diff <= worst:
+                search(far)
+
+        search(self._root)
+        found = sorted(((-neg_d2, -neg_seq, item) for neg_d2, neg_seq, item in heap), key=lambda x: (x[0], x[1]))
+        return [(item, haversine_distance(lat, lon, item.lat, item.lon)) for _, _, item in found]
+
+    def within(self, lat, lon, radius_km, limit=None):
+        """返回距离 (lat, lon) 不超过 radius_km 公里的对象"""
+        if self._root is None or radius_km < 0:
+            return []
+        target = _to_xyz(lat, lon)
+        bound = _chord_sq(radius_km)
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            d2 = _dist_sq(node.xyz, target)
+            if d2 <= bound:
+                found.append((d2, node.seq, node.item))
+            diff = target[node.axis] - node.xyz[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            stack.append(near)
+            if diff * diff <= bound:
+                stack.append(far)
+
+        found.sort(key=lambda x: (x[0], x[1]))
+        if limit is not None:
+            found = found[:limit]
+        return [(item, haversine_distance(lat, lon, item.lat, item.lon)) for _, _, item in found]
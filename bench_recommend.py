@@ -0,0 +1,123 @@
+"""
+推荐接口离线基准：在上海几所默认学校周边生成随机 POI，使用 local 提供方（不访问网络）
+跑完整的 /api/places/recommend 流程，输出串行和并发下的 p50 / p99 延迟。
+用法: python bench_recommend.py [--pois 2000] [--requests 200] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+SCHOOLS = [
+    (31.304208, 121.506379),  # 上海财经大学
+    (31.293647, 121.507235),  # 复旦大学
+    (31.296882, 121.496579),  # 同济大学
+    (31.156754, 121.425737),  # 华东师范大学
+    (31.192711, 121.437543),  # 上海交通大学（徐汇）
+    (31.318855, 121.487706),  # 上海大学（宝山）
+]
+CUISINES = ["火锅", "川菜", "日料", "烧烤", "西餐", "面馆", "粤菜", "快餐"]
+
+
+def make_pois(count, rng):
+    pois = []
+    for i in range(count):
+        lat, lon = rng.choice(SCHOOLS)
+        cuisine = rng.choice(CUISINES)
+        pois.append({
+            "name": f"{cuisine}{i}号店",
+            "address": f"测试路{i}号",
+            "uid": f"bench-{i}",
+            "lat": lat + rng.uniform(-0.04, 0.04),
+            "lon": lon + rng.uniform(-0.04, 0.04),
+            "tags": cuisine,
+        })
+    return pois
+
+
+def make_requests(count, rng):
+    requests = []
+    for _ in range(count):
+        coords = rng.sample(SCHOOLS, rng.randint(2, 4))
+        requests.append({
+            "coords": [[lat + rng.uniform(-0.002, 0.002), lon + rng.uniform(-0.002, 0.002)] for lat, lon in coords],
+            "cuisine": rng.choice(CUISINES + ["餐厅"]),
+            "preference_mode": rng.choice(["walking", "transit"]),
+        })
+    return requests
+
+
+def pct(latencies, p):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+
+async def run(app, requests, concurrency):
+    import httpx
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one(body):
+            async with semaphore:
+                start = time.perf_counter()
+                resp = await client.post("/api/places/recommend", json=body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if resp.status_code != 200:
+                    print(f"请求失败: HTTP {resp.status_code} {resp.text[:200]}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(body) for body in requests))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return latencies, elapsed
+
+
+async def bench(args, requests):
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        for label, concurrency in (("串行", 1), (f"并发 {args.concurrency}", args.concurrency)):
+            latencies, elapsed = await run(app, requests, concurrency)
+            print(f"{label}: {len(latencies)} 次请求, p50 {pct(latencies, 0.5):.1f}ms, "
+                  f"p99 {pct(latencies, 0.99):.1f}ms, 吞吐 {len(latencies) / elapsed:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推荐接口离线基准（local 提供方）")
+    parser.add_argument("--pois", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    workdir = tempfile.mkdtemp(prefix="bench_recommend_")
+    poi_file = os.path.join(workdir, "pois.json")
+    with open(poi_file, "w", encoding="utf-8") as f:
+        json.dump(make_pois(args.pois, rng), f, ensure_ascii=False)
+
+    # 配置在导入 app 时读取，必须先设置环境变量
+    os.environ["ROUTING_PROVIDER"] = "local"
+    os.environ["LOCAL_POI_FILE"] = poi_file
+    os.environ["TRAVEL_CACHE_PATH"] = os.path.join(workdir, "travel_cache.db")
+    os.environ["POI_STORE_PATH"] = os.path.join(workdir, "poi_store.db")
+    print(f"POI {args.pois} 个, 请求 {args.requests} 次, 临时目录 {workdir}")
+
+    requests = make_requests(args.requests, rng)
+    # 推荐流程的打印量较大，只保留基准结果
+    results = io.StringIO()
+    with contextlib.redirect_stdout(results):
+        asyncio.run(bench(args, requests))
+    for line in results.getvalue().splitlines():
+        if line.startswith(("串行", "并发", "请求失败")):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
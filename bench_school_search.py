@@ -0,0 +1,75 @@
+"""
+学校搜索延迟基准：生成约 1 万所学校的名称，随机查询前缀、部分名称和缩写，
+输出 p50 / p99 延迟（目标 p99 < 1ms）。
+用法: python bench_school_search.py [--schools 10000] [--queries 20000]
+"""
+import argparse
+import random
+import time
+
+from app.utils.school_catalog import CatalogSchool
+from app.utils.school_search import SchoolSearchIndex
+
+CITIES = ["上海", "北京", "天津", "重庆", "南京", "杭州", "武汉", "成都", "西安", "广州", "深圳", "长沙",
+          "合肥", "济南", "青岛", "大连", "沈阳", "哈尔滨", "长春", "郑州", "福州", "厦门", "昆明", "兰州"]
+FIELDS = ["财经", "交通", "师范", "理工", "科技", "外国语", "医科", "农业", "工业", "电子科技", "政法",
+          "艺术", "体育", "海洋", "林业", "民族", "石油", "航空航天", "中医药", "传媒", "建筑", "水利"]
+SUFFIXES = ["大学", "学院", "职业技术学院", "高等专科学校"]
+CAMPUSES = ["", "", "", "（主校区）", "（东校区）", "（南校区）", "（新校区）"]
+
+
+def make_schools(count, rng):
+    names = set()
+    while len(names) < count:
+        name = rng.choice(CITIES) + rng.choice(FIELDS) + rng.choice(SUFFIXES)
+        if rng.random() < 0.8:
+            name += rng.choice(CAMPUSES) or f"（第{rng.randint(1, 40)}分校）"
+        names.add(name)
+    return [CatalogSchool(id=i + 1, name=n, lat=30.0, lon=120.0) for i, n in enumerate(sorted(names))]
+
+
+def make_queries(schools, count, rng):
+    queries = []
+    for _ in range(count):
+        name = rng.choice(schools).name
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append(name[:rng.randint(1, len(name))])  # 前缀
+        elif kind < 0.7:
+            start = rng.randint(0, len(name) - 2)
+            queries.append(name[start:start + rng.randint(2, 4)])  # 部分名称
+        else:
+            picks = sorted(rng.sample(range(len(name)), min(len(name), rng.randint(2, 3))))
+            queries.append("".join(name[i] for i in picks))  # 缩写
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="学校搜索延迟基准")
+    parser.add_argument("--schools", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    schools = make_schools(args.schools, rng)
+    t0 = time.perf_counter()
+    index = SchoolSearchIndex(schools)
+    print(f"构建索引: {len(schools)} 所学校, 耗时 {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+    queries = make_queries(schools, args.queries, rng)
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, limit=args.limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    print(f"{len(queries)} 次查询: p50 {pct(0.5):.3f}ms, p99 {pct(0.99):.3f}ms, 最大 {latencies[-1]:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+冷启动基准：在全新子进程中测量
+  1) import app.main 的耗时
+  2) 执行 lifespan（迁移等启动步骤）并响应第一个 /health 请求的耗时
+  3) 导入耗时最多的模块（python -X importtime）
+用法: python bench_startup.py [--runs 5] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import app.main
+print(time.perf_counter() - t0)
+"""
+
+STARTUP_SNIPPET = """
+import time
+t0 = time.perf_counter()
+from fastapi.testclient import TestClient
+import app.main
+with TestClient(app.main.app) as client:
+    client.get("/health")
+print(time.perf_counter() - t0)
+"""
+
+
+def run_snippet(snippet, workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", snippet], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(name, samples):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p90 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.9))]
+    print(f"{name}: 中位数 {statistics.median(samples_ms):.1f}ms, p90 {p90:.1f}ms, "
+          f"最小 {samples_ms[0]:.1f}ms ({len(samples_ms)} 次)")
+
+
+def top_imports(workdir, top):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                         cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line.split("|")
+        depth = len(module) - len(module.lstrip()) - 1
+        name = module.strip()
+        # 只看 app.main 直接导入的模块和 app.* 模块
+        if depth <= 2 or name.startswith("app."):
+            rows.append((int(cumulative_us), name))
+    rows.sort(reverse=True)
+    print("\n导入耗时最多的模块（累计）：")
+    for cumulative_us, module in rows[:top]:
+        print(f"  {cumulative_us / 1000:8.1f}ms  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="应用冷启动基准")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # 在临时目录中运行，使用全新的 SQLite 文件，模拟新容器
+    with tempfile.TemporaryDirectory() as workdir:
+        import_samples = [run_snippet(IMPORT_SNIPPET, workdir) for _ in range(args.runs)]
+        startup_samples = []
+        for _ in range(args.runs):
+            db_file = os.path.join(workdir, "school_meal.db")
+            if os.path.exists(db_file):
+                os.remove(db_file)
+            startup_samples.append(run_snippet(STARTUP_SNIPPET, workdir))
+
+        summarize("import app.main", import_samples)
+        summarize("启动到首个 /health 响应（含迁移，空库）", startup_samples)
+        top_imports(workdir, args.top)
+
+
+if __name__ == "__main__":
+    main()
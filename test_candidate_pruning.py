@@ -0,0 +1,133 @@
+"""
+候选剪枝正确性检查：同一批推荐请求分别在开启 / 关闭直线下界剪枝时运行，
+确认返回的前6名（名称和时长）完全一致，并输出剪枝节省的步行矩阵候选数。
+关闭剪枝时评估候选池内的全部候选（暴力计算）。
+两组请求：成员来自随机学校（起点分散，下界很少能排除候选），以及成员来自同校 / 相邻校区
+（起点集中，远处的候选会被排除）——后一组必须确实排除了候选，剪枝路径才算被检查到。
+使用 local 提供方（不访问网络），步行时长按每个终点不同的绕行系数（1.0 ~ 2.2）计算，
+模拟真实路网中绕行比例差异很大的情况。
+用法: python test_candidate_pruning.py [--requests 100]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import tempfile
+
+from bench_recommend import CUISINES, SCHOOLS, make_pois, make_requests
+
+# 相邻校区：上海财经大学 / 复旦大学 / 同济大学（彼此相距约 1 公里）
+NEARBY_SCHOOLS = SCHOOLS[:3]
+
+
+def make_nearby_requests(count, rng):
+    """成员来自同校或相邻校区的请求（每校 1~3 名成员）"""
+    requests = []
+    for _ in range(count):
+        schools = rng.sample(NEARBY_SCHOOLS, rng.randint(1, len(NEARBY_SCHOOLS)))
+        requests.append({
+            "coords": [
+                [lat + rng.uniform(-0.002, 0.002), lon + rng.uniform(-0.002, 0.002)]
+                for lat, lon in schools for _ in range(rng.randint(1, 3))
+            ],
+            "cuisine": rng.choice(CUISINES),
+            "preference_mode": "walking",
+        })
+    return requests
+
+
+def detour_for(destination):
+    """每个终点固定的绕行系数（同一终点两次运行取值相同）"""
+    return 1.0 + random.Random(f"{destination[0]:.6f},{destination[1]:.6f}").random() * 1.2
+
+
+async def run_all(app, requests):
+    import httpx
+
+    results = []
+    evaluated = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        for body in requests:
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                resp = await client.post("/api/places/recommend", json=body)
+            data = resp.json()["data"]
+            results.append([(c["name"], c["avg_travel_time_min"]) for c in data["candidates"]])
+            match = re.search(r"步行矩阵评估 (\d+)/", log.getvalue())
+            evaluated.append(int(match.group(1)) if match else 0)
+    return results, evaluated
+
+
+async def check(request_sets):
+    from app.main import app
+    from app.providers import get_provider
+    import app.routers.place as place
+
+    provider = get_provider()
+    route_matrix = provider.route_matrix
+
+    async def varied_route_matrix(mode, origins, destinations):
+        matrix, error = await route_matrix(mode, origins, destinations)
+        if mode == "walking":
+            speed_ratio = provider.detour_factor
+            matrix = [[seconds / speed_ratio * detour_for(d) for seconds, d in zip(row, destinations)] for row in matrix]
+        return matrix, error
+
+    provider.route_matrix = varied_route_matrix
+    max_speed = place.MAX_WALKING_KM_PER_MIN
+    ok = True
+    async with app.router.lifespan_context(app):
+        for label, requests, must_prune in request_sets:
+            place.MAX_WALKING_KM_PER_MIN = max_speed
+            pruned, evaluated = await run_all(app, requests)
+            # 下界为 0 时不剪枝：每个请求都评估预算内的全部候选
+            place.MAX_WALKING_KM_PER_MIN = float("inf")
+            unpruned, evaluated_all = await run_all(app, requests)
+
+            mismatches = [i for i, (a, b) in enumerate(zip(pruned, unpruned)) if a != b]
+            for i in mismatches[:5]:
+                print(f"请求 {i} 结果不一致:\n  剪枝   {pruned[i]}\n  不剪枝 {unpruned[i]}")
+            print(f"[{label}] {len(requests)} 个请求，剪枝与不剪枝结果不一致 {len(mismatches)} 个；"
+                  f"步行矩阵评估候选 {sum(evaluated)} / {sum(evaluated_all)}")
+            if mismatches:
+                ok = False
+            if must_prune and sum(evaluated) >= sum(evaluated_all):
+                print(f"[{label}] 没有任何候选被下界排除，剪枝路径未被检查到")
+                ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="候选剪枝正确性检查（local 提供方）")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--pois", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    workdir = tempfile.mkdtemp(prefix="check_pruning_")
+    poi_file = os.path.join(workdir, "pois.json")
+    with open(poi_file, "w", encoding="utf-8") as f:
+        json.dump(make_pois(args.pois, rng), f, ensure_ascii=False)
+
+    # 配置在导入 app 时读取，必须先设置环境变量
+    os.environ["ROUTING_PROVIDER"] = "local"
+    os.environ["LOCAL_POI_FILE"] = poi_file
+    os.environ["TRAVEL_CACHE_PATH"] = os.path.join(workdir, "travel_cache.db")
+    os.environ["POI_STORE_PATH"] = os.path.join(workdir, "poi_store.db")
+    # 本地 POI 库会在第一遍运行时积累搜索结果，第二遍的候选池就不同了
+    os.environ["POI_STORE_ENABLED"] = "false"
+
+    requests = make_requests(args.requests, rng)
+    for body in requests:
+        body["preference_mode"] = "walking"
+    nearby = make_nearby_requests(args.requests, rng)
+    ok = asyncio.run(check([("随机学校", requests, False), ("同校 / 相邻校区", nearby, True)]))
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 并发保存课表，观察开启 WRITE_COALESCE_ENABLED 前后的吞吐量
+BASE_URL = "http://localhost:8001/api"
+CONCURRENCY = 40
+
+schedule_data = [
+    {"day": "周一", "start": "08:00", "end": "09:40", "weeks": [1, 2, 3, 4]},
+    {"day": "周三", "start": "14:00", "end": "15:40", "weeks": [1, 2, 3, 4]}
+]
+
+def save_once(_):
+    response = requests.post(f"{BASE_URL}/schedule/save", json=schedule_data)
+    return response.status_code
+
+print(f"并发 {CONCURRENCY} 个 /schedule/save 请求...")
+start = time.time()
+with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+    status_codes = list(pool.map(save_once, range(CONCURRENCY)))
+elapsed = time.time() - start
+
+print(f"状态码分布: { {code: status_codes.count(code) for code in set(status_codes)} }")
+print(f"总耗时: {elapsed:.2f}秒, 吞吐量: {CONCURRENCY / elapsed:.1f} 次/秒")